@@ -0,0 +1,399 @@
+"""asyncio 기반 Bedrock 토큰 전송 엔진.
+
+aiobotocore가 설치되어 있으면 논블로킹 HTTP로 invoke_model과 start_async_invoke를
+수행하고, 없으면 boto3 호출을 스레드 풀에서 실행합니다. 요청 구성과 결과 기록은
+BedrockTokenSender의 메서드를 그대로 사용하고, 이 모듈은 전송 방식만 담당합니다.
+비동기 작업 상태 확인은 BedrockTokenSender의 작업 추적기가 일괄 처리하며, 이벤트 루프는
+그 결과만 기다립니다.
+"""
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from bedrock_token_sender import (
+    CACHE_DIR,
+    USAGE_READ_LIMIT,
+    BedrockTokenSender,
+    body_usage,
+    converse_usage,
+    header_usage,
+    print_startup,
+    print_usage,
+    read_usage,
+    retry_attempts,
+    runtime_config,
+)
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+except ImportError:  # aiobotocore 미설치 시 스레드 풀 경로 사용
+    get_session = None
+
+# 블로킹 boto3 호출(aiobotocore가 없을 때의 모델 호출, 제어 평면 호출, 출력 확인)에 쓰는 스레드 수 상한
+EXECUTOR_WORKERS = 64
+
+
+class AsyncBedrockTokenSender:
+    """하나의 이벤트 루프에서 여러 모델 호출과 비동기 작업 폴링을 함께 처리합니다.
+    
+    executor를 지정하면 블로킹 호출을 그 스레드 풀에서 실행합니다 (여러 엔진이 공유).
+    지정하지 않으면 엔진마다 EXECUTOR_WORKERS개 이하의 스레드 풀을 만듭니다.
+    """
+    
+    def __init__(self, access_key, secret_key, region, max_concurrency=64, semaphore=None, stream=False,
+                 endpoint_url=None, probe='standard', quotas=None, journal=None, delete_outputs=False,
+                 converse=False, config=None, cache_dir=CACHE_DIR, executor=None):
+        self.region = region
+        self.endpoint_url = endpoint_url
+        self.max_concurrency = max_concurrency
+        self.semaphore = semaphore
+        self._credentials = {
+            'aws_access_key_id': access_key,
+            'aws_secret_access_key': secret_key,
+        }
+        # 연결 풀, 재시도, 제한 시간은 aiobotocore와 boto3 경로 모두 같은 설정 사용
+        self.config = config or runtime_config()
+        # 요청 본문 구성, S3 버킷 설정, 모델 목록 조회, 결과 기록은 동기 구현을 재사용
+        self.sender = BedrockTokenSender(
+            access_key, secret_key, region,
+            cache_dir=cache_dir,
+            config=self.config,
+            stream=stream,
+            endpoint_url=endpoint_url,
+            probe=probe,
+            quotas=quotas,
+            journal=journal,
+            delete_outputs=delete_outputs,
+            converse=converse
+        )
+        self._client = None
+        self._client_context = None
+        self._executor = executor
+        self._owns_executor = executor is None
+    
+    async def __aenter__(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=min(self.max_concurrency, EXECUTOR_WORKERS))
+        if get_session is not None:
+            self._client_context = get_session().create_client(
+                'bedrock-runtime',
+                region_name=self.region,
+                endpoint_url=self.endpoint_url,
+                config=AioConfig().merge(self.config),
+                **self._credentials
+            )
+            self._client = await self._client_context.__aenter__()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        if self._client_context is not None:
+            await self._client_context.__aexit__(*exc_info)
+            self._client_context = None
+            self._client = None
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+    
+    async def _blocking(self, func, *args):
+        """블로킹 함수를 스레드 풀에서 실행하고 결과를 기다립니다."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+    
+    async def _call(self, operation, **kwargs):
+        """bedrock-runtime API를 이벤트 루프를 막지 않고 호출합니다."""
+        if self._client is not None:
+            return await getattr(self._client, operation)(**kwargs)
+        return await self._blocking(functools.partial(getattr(self.sender.bedrock, operation), **kwargs))
+    
+    async def _read_usage(self, response, extractor):
+        """응답에서 토큰 사용량을 읽고 본문을 닫아 연결을 풀로 돌려줍니다."""
+        if self._client is None:
+            # boto3 응답 본문 읽기는 블로킹이므로 스레드 풀에서 실행
+            return await self._blocking(read_usage, response, extractor)
+        
+        usage = header_usage(response)
+        body = response.get('body')
+        if body is None:
+            return usage
+        try:
+            if usage is None and extractor is not None:
+                usage = body_usage(await body.read(USAGE_READ_LIMIT + 1), extractor)
+        finally:
+            body.close()
+        return usage
+    
+    async def _invoke_stream(self, model_id, body, record):
+        """스트리밍으로 호출하고 첫 청크를 받으면 스트림을 닫습니다."""
+        if self._client is None:
+            # boto3 이벤트 스트림은 블로킹으로 읽히므로 호출과 첫 청크 대기를 함께 스레드 풀에서 실행
+            return await self._blocking(self.sender._invoke_stream, model_id, body, record)
+        
+        started = time.perf_counter()
+        response = await self._client.invoke_model_with_response_stream(
+            modelId=model_id,
+            body=body,
+            contentType='application/json'
+        )
+        stream = response['body']
+        try:
+            async for event in stream:
+                if 'chunk' in event:
+                    record['ttft_ms'] = round((time.perf_counter() - started) * 1000, 1)
+                    break
+        finally:
+            stream.close()
+        return response
+    
+    async def _invoke(self, model_id, body, streaming, record):
+        """패밀리별 요청 본문으로 호출합니다."""
+        if streaming:
+            return await self._invoke_stream(model_id, body, record)
+        return await self._call(
+            'invoke_model',
+            modelId=model_id,
+            body=body,
+            contentType='application/json'
+        )
+    
+    async def _converse(self, model_id, streaming, record):
+        """공통 Converse 요청으로 호출합니다. 스트리밍이면 첫 텍스트 조각을 받고 스트림을 닫습니다."""
+        request = self.sender.converse_request
+        if not streaming:
+            return await self._call('converse', modelId=model_id, **request)
+        if self._client is None:
+            return await self._blocking(self.sender._converse, model_id, streaming, record)
+        
+        started = time.perf_counter()
+        response = await self._client.converse_stream(modelId=model_id, **request)
+        stream = response['stream']
+        try:
+            async for event in stream:
+                if 'contentBlockDelta' in event:
+                    record['ttft_ms'] = round((time.perf_counter() - started) * 1000, 1)
+                    break
+        finally:
+            stream.close()
+        return response
+    
+    async def _invoke_scheduled(self, rate_key, record, invoke):
+        """BedrockTokenSender._invoke_scheduled와 같지만 할당량과 스로틀링 대기가 이벤트 루프를 막지 않습니다."""
+        sender = self.sender
+        throttles = 0
+        while True:
+            estimate = sender.scheduler.estimate(rate_key)
+            delay = sender.scheduler.reserve(rate_key, estimate)
+            if delay:
+                await asyncio.sleep(delay)
+            record['attempts'] += 1
+            try:
+                response = await invoke()
+            except ClientError as e:
+                delay = sender._throttle_delay(rate_key, e, throttles)
+                if delay is None:
+                    raise
+                throttles += 1
+                await asyncio.sleep(delay)
+                continue
+            sender._count('retry_attempts', retry_attempts(response))
+            return response, estimate
+    
+    async def _invoke_payload(self, model_id, payload, streaming, record, rate_key):
+        """BedrockTokenSender._invoke_payload와 같은 순서로 호출하고 (응답, 예약한 토큰 수, 형식 번호)를 반환합니다."""
+        sender = self.sender
+        error = None
+        for index in sender._payload_attempts(model_id, payload):
+            if index is None:
+                invoke = functools.partial(self._converse, model_id, streaming, record)
+            else:
+                invoke = functools.partial(self._invoke, model_id, payload['bodies'][index], streaming, record)
+            try:
+                response, estimate = await self._invoke_scheduled(rate_key, record, invoke)
+            except ClientError as e:
+                error = sender._attempt_failed(model_id, payload, index, e, error)
+                continue
+            sender._attempt_succeeded(model_id, payload, index, record)
+            return response, estimate, index
+        raise error
+    
+    async def send_token_to_model(self, model_id, wait=True):
+        """특정 모델에 토큰을 보내고 (성공 여부, 결과 메시지)를 반환합니다.
+        
+        wait가 False이면 비동기 모델은 작업만 시작하고 (성공 여부, 결과 메시지)가 설정될 Task를 반환합니다.
+        """
+        sender = self.sender
+        payload = sender.payloads.lookup(model_id)
+        if payload['mode'] == 'async':
+            return await self.send_async_token(model_id, wait)
+        record = sender._new_record(model_id, payload)
+        started = time.perf_counter()
+        if payload['mode'] == 'stream':
+            return await sender._sonic_call(model_id, record, started)
+        
+        actual_model_id, streaming, rate_key = sender._prepare_call(model_id, payload, record)
+        try:
+            response, estimate, index = await self._invoke_payload(
+                actual_model_id, payload, streaming, record, rate_key
+            )
+        except (BotoCoreError, ClientError) as e:
+            # 시간 초과, 연결 오류도 이 모델만 실패로 기록
+            return False, sender._record_failure(model_id, record, started, e)
+        
+        usage = None
+        if not streaming:
+            usage = converse_usage(response) if index is None else await self._read_usage(response, payload['usage'])
+        return True, sender._record_success(
+            model_id, actual_model_id, record, started, rate_key, estimate, index, usage
+        )
+    
+    async def send_async_token(self, model_id, wait=True):
+        """비동기 모델(TwelveLabs, Nova Reel) 작업을 시작하고 완료를 기다립니다.
+        
+        wait가 False이면 작업을 시작한 뒤 완료를 기다리는 Task를 반환합니다.
+        """
+        sender = self.sender
+        record, started, job, skipped = sender._begin_async(model_id)
+        if skipped:
+            return False, skipped
+        if job is None:
+            delay = sender.scheduler.reserve(sender._rate_key(model_id), 0)
+            if delay:
+                await asyncio.sleep(delay)
+            submitted = datetime.now(timezone.utc)
+            try:
+                response = await self._call('start_async_invoke', **sender._async_request(model_id))
+            except (BotoCoreError, ClientError) as e:
+                return False, sender._job_start_failed(model_id, record, started, e)
+            job = (sender._job_started(model_id, response, submitted), submitted)
+        invocation_arn, submitted = job
+        
+        outcome = asyncio.ensure_future(
+            self._job_outcome(model_id, sender.job_tracker.register(invocation_arn, submitted=submitted),
+                              record, started)
+        )
+        if wait:
+            return await outcome
+        return outcome
+    
+    async def _job_outcome(self, model_id, job, record, started):
+        """작업 추적기의 완료를 기다리고 (성공 여부, 결과 메시지)를 반환합니다."""
+        await asyncio.wait([asyncio.wrap_future(job)])
+        # 완료된 작업의 S3 출력 확인은 블로킹 호출이므로 스레드 풀에서 실행
+        return await self._blocking(self.sender._async_outcome, model_id, job, record, started)
+    
+    async def _send_limited(self, model_id, semaphore):
+        # 할당량 차례가 올 때까지는 동시 호출 슬롯을 잡지 않고 기다림
+        delay = self.sender.scheduler.ready_in(self.sender._rate_key(model_id))
+        if delay:
+            await asyncio.sleep(delay)
+        async with semaphore:
+            result = await self.send_token_to_model(model_id, wait=False)
+        if asyncio.isfuture(result):
+            # 비동기 작업은 시작만 슬롯 안에서 하고 완료는 슬롯을 놓고 기다림
+            result = await result
+        return result
+    
+    async def send_tokens_to_all_models(self):
+        """모든 모델에 동시에 토큰을 보내고 결과를 모델 목록 순서대로 출력합니다."""
+        # 제어 평면 호출은 실행당 한 번뿐이므로 스레드 풀에서 실행
+        models = await self._blocking(self.sender.get_available_models)
+        if not models:
+            print("사용 가능한 모델이 없습니다.")
+            return 0
+        # 호출마다 쓰는 profile 색인은 첫 조회가 list_inference_profiles를 호출할 수 있어 미리 불러옴
+        await self._blocking(self.sender.profile_resolver.profiles)
+        if self.sender.needs_output_bucket(models):
+            await self._blocking(self.sender.setup_s3_bucket)
+        
+        print(f"\n호출 가능한 모델 목록 ({len(models)}개):")
+        for i, model_id in enumerate(models, 1):
+            print(f"{i}. {model_id}")
+        
+        print(f"\n토큰 전송 시작...\n")
+        
+        done = self.sender._checkpointed(models)
+        if done:
+            print(f"체크포인트: 이전 실행에서 끝난 {len(done)}개 모델 건너뜀")
+        
+        semaphore = self.semaphore or asyncio.Semaphore(self.max_concurrency)
+        tasks = [
+            asyncio.ensure_future(self._send_limited(model_id, semaphore))
+            for model_id in models
+            if model_id not in done
+        ]
+        
+        success_count = sum(1 for success in done.values() if success)
+        for task in tasks:
+            success, message = await task
+            print(message)
+            if success:
+                success_count += 1
+        
+        await self._blocking(self.sender.format_cache.save)
+        await self._blocking(self.sender.flush_outputs)
+        
+        print(f"\n완료: {success_count}/{len(models)} 모델 성공")
+        print_usage(self.sender.metrics)
+        print_startup([self.sender])
+        return success_count
+
+
+async def run_sweeps(targets, max_concurrency=256, stream=False, endpoint_url=None, probe='standard',
+                     quotas=None, journal=None, delete_outputs=False, converse=False, config=None,
+                     cache_dir=CACHE_DIR):
+    """여러 (access_key, secret_key, region) 대상을 한 이벤트 루프에서 함께 처리합니다.
+    
+    max_concurrency는 모든 대상이 공유하는 동시 호출 상한입니다.
+    stream이 True이면 스트리밍을 지원하는 모델을 첫 청크까지만 스트리밍으로 호출합니다.
+    endpoint_url이 있으면 모든 AWS 호출을 그 주소로 보냅니다 (bedrock_stub_server.py 등).
+    probe는 요청 본문 설정 이름입니다 (PROBE_PROFILES).
+    quotas는 리전별 모델 할당량(load_quotas 형식)이며 대상마다 따로 적용됩니다.
+    journal(CheckpointJournal)이 있으면 이전 실행에서 끝난 모델은 건너뛰고 진행 상황을 기록합니다.
+    delete_outputs가 True이면 확인을 마친 비동기 작업 출력을 S3에서 지웁니다.
+    converse가 True이면 텍스트 모델을 공통 Converse 요청 하나로 호출합니다.
+    config는 bedrock-runtime 클라이언트 전송 설정입니다 (기본 runtime_config()).
+    cache_dir은 모델 카탈로그, inference profile, 형식 캐시를 저장할 디렉터리입니다.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    # 블로킹 호출용 스레드 풀은 모든 대상이 공유 (대상마다 max_concurrency개씩 만들지 않음)
+    executor = ThreadPoolExecutor(max_workers=min(max_concurrency, EXECUTOR_WORKERS))
+    
+    async def sweep(access_key, secret_key, region):
+        engine = AsyncBedrockTokenSender(
+            access_key, secret_key, region,
+            max_concurrency=max_concurrency,
+            semaphore=semaphore,
+            stream=stream,
+            endpoint_url=endpoint_url,
+            probe=probe,
+            quotas=quotas,
+            journal=journal,
+            delete_outputs=delete_outputs,
+            converse=converse,
+            config=config,
+            cache_dir=cache_dir,
+            executor=executor
+        )
+        async with engine:
+            return await engine.send_tokens_to_all_models()
+    
+    try:
+        return await asyncio.gather(*(sweep(*target) for target in targets))
+    finally:
+        executor.shutdown(wait=False)
+
+
+def main():
+    # 사용자 입력 받기
+    access_key = input("AWS Access Key ID: ")
+    secret_key = input("AWS Secret Access Key: ")
+    region = input("AWS Region (예: us-east-1): ")
+    
+    asyncio.run(run_sweeps([(access_key, secret_key, region)]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""로컬 스텁 서버를 사용한 토큰 전송 루프 벤치마크.
+
+모델 수별로 스텁 서버를 띄우고 BedrockTokenSender 전체 실행을 두 번(캐시 없음/캐시 있음)
+측정합니다. 실제 Bedrock 호출이나 비용은 발생하지 않습니다.
+
+    python bedrock_benchmark.py --sizes 50 500 5000 --workers 32 --throttle-rate 0.02
+"""
+import argparse
+import contextlib
+import io
+import json
+import shutil
+import tempfile
+import time
+
+from bedrock_stub_server import BedrockStub, load_config, simulated_models, start_server
+from bedrock_token_sender import PROBE_PROFILES, BedrockTokenSender, ProbeMetrics, load_quotas
+
+# 스텁 서버에서 모델 호출로 집계할 요청
+INVOKE_OPERATIONS = ('InvokeModel', 'InvokeModelWithResponseStream', 'Converse', 'ConverseStream', 'StartAsyncInvoke')
+
+
+def run_once(endpoint_url, stub, cache_dir, workers, stream=False, probe='standard', quotas=None,
+             service_quotas=False, converse=False):
+    """한 번의 전체 실행을 측정하고 결과를 반환합니다."""
+    metrics = ProbeMetrics()
+    stub.reset_counts()
+    started = time.perf_counter()
+    # 진행 메시지는 측정에 필요 없으므로 버림
+    with contextlib.redirect_stdout(io.StringIO()):
+        sender = BedrockTokenSender(
+            'AKIASTUBBENCHMARK', 'stub', 'us-east-1',
+            cache_dir=cache_dir,
+            metrics=metrics,
+            stream=stream,
+            endpoint_url=endpoint_url,
+            probe=probe,
+            quotas=quotas,
+            service_quotas=service_quotas,
+            converse=converse
+        )
+        results = sender.send_tokens_to_all_models(max_workers=workers, list_models=False)
+    wall = time.perf_counter() - started
+    
+    requests = dict(stub.requests)
+    invoke_calls = sum(requests.get(operation, 0) for operation in INVOKE_OPERATIONS)
+    records = metrics.records()
+    attempts = sum(record['attempts'] or 0 for record in records)
+    invoked = sum(1 for record in records if record['attempts'])
+    return {
+        'models': len(results),
+        'success': sum(1 for result in results if result['success']),
+        'throttled': sum(1 for result in results if result['throttled']),
+        # 할당량 초과로 스케줄러가 속도를 낮추고 다시 시도한 횟수
+        'backoffs': sender.stats['backoffs'],
+        'wall_s': round(wall, 3),
+        'invoke_calls': invoke_calls,
+        'calls_per_s': round(invoke_calls / wall, 1) if wall else None,
+        # 요청 형식 대체로 늘어난 시도 (모델당 1회를 넘는 시도)
+        'format_attempts': attempts - invoked,
+        # botocore 재시도로 늘어난 HTTP 호출
+        'retry_calls': invoke_calls - attempts,
+        'retry_overhead': round((invoke_calls - attempts) / attempts, 3) if attempts else 0.0,
+        'control_calls': sum(requests.values()) - invoke_calls,
+    }
+
+
+def benchmark(size, workers, behavior=None, overrides=None, seed=0, stream=False, probe='standard',
+              quotas=None, service_quotas=False, converse=False):
+    """모델 size개로 캐시 없는 실행과 캐시 있는 실행을 차례로 측정합니다."""
+    stub = BedrockStub(simulated_models(size), behavior, overrides, seed=seed)
+    server, endpoint_url = start_server(stub)
+    cache_dir = tempfile.mkdtemp(prefix='bedrock-benchmark-')
+    options = dict(stream=stream, probe=probe, quotas=quotas, service_quotas=service_quotas, converse=converse)
+    try:
+        return {
+            'cold': run_once(endpoint_url, stub, cache_dir, workers, **options),
+            'warm': run_once(endpoint_url, stub, cache_dir, workers, **options),
+        }
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def print_report(reports):
+    print(f"{'모델':>6} {'실행':>5} {'성공':>6} {'시간(s)':>8} {'호출':>7} {'호출/s':>8} "
+          f"{'형식 대체':>8} {'재시도':>7} {'재시도 비율':>10} {'스로틀 대기':>9} {'제어 호출':>8}")
+    for size, report in reports:
+        for run in ('cold', 'warm'):
+            result = report[run]
+            print(
+                f"{size:>6} {run:>5} {result['success']:>6} {result['wall_s']:>8.2f} "
+                f"{result['invoke_calls']:>7} {result['calls_per_s']:>8} {result['format_attempts']:>8} "
+                f"{result['retry_calls']:>7} {result['retry_overhead']:>10.1%} {result['backoffs']:>9} "
+                f"{result['control_calls']:>8}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="스텁 서버 기반 토큰 전송 벤치마크")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 5000], help="시뮬레이션 모델 수")
+    parser.add_argument('--workers', type=int, default=32, help="동시 실행 수")
+    parser.add_argument('--config', help="스텁 동작 설정 파일 (bedrock_stub_server.py 형식)")
+    parser.add_argument('--latency-ms', type=float, help="모델 응답 지연 시간 (기본 50)")
+    parser.add_argument('--jitter-ms', type=float, help="지연 시간 무작위 범위")
+    parser.add_argument('--error-rate', type=float, help="AccessDeniedException 비율")
+    parser.add_argument('--throttle-rate', type=float, help="ThrottlingException 비율")
+    parser.add_argument('--async-duration', type=float, help="비동기 작업 소요 시간(초)")
+    parser.add_argument('--rpm', type=int, help="스텁 모델별 분당 요청 할당량")
+    parser.add_argument('--stream', action='store_true', help="스트리밍 호출 사용")
+    parser.add_argument('--probe', choices=sorted(PROBE_PROFILES), default='standard', help="요청 본문 설정")
+    parser.add_argument('--converse', action='store_true', help="텍스트 모델을 Converse API로 호출")
+    parser.add_argument('--quotas', help="송신 측 모델별 할당량 파일 (bedrock_token_sender.py --quotas 형식)")
+    parser.add_argument('--service-quotas', action='store_true', help="스텁의 Service Quotas 할당량으로 호출 속도 조절")
+    parser.add_argument('--seed', type=int, default=0, help="오류/스로틀링 난수 시드")
+    parser.add_argument('--output', help="결과를 저장할 JSON 파일")
+    args = parser.parse_args()
+    
+    config = load_config(args.config) if args.config else {}
+    behavior = dict(config.get('behavior', {}))
+    for key in ('latency_ms', 'jitter_ms', 'error_rate', 'throttle_rate', 'async_duration', 'rpm'):
+        value = getattr(args, key)
+        if value is not None:
+            behavior[key] = value
+    
+    reports = []
+    for size in args.sizes:
+        print(f"모델 {size}개 측정 중...")
+        reports.append((size, benchmark(
+            size, args.workers,
+            behavior=behavior,
+            overrides=config.get('overrides'),
+            seed=args.seed,
+            stream=args.stream,
+            probe=args.probe,
+            quotas=load_quotas(args.quotas) if args.quotas else None,
+            service_quotas=args.service_quotas,
+            converse=args.converse
+        )))
+    
+    print()
+    print_report(reports)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({str(size): report for size, report in reports}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
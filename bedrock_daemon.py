@@ -0,0 +1,514 @@
+"""Bedrock 모델 가용성 상시 점검 데몬.
+
+하나의 BedrockTokenSender를 계속 사용해 클라이언트 연결, 모델 카탈로그, 형식 캐시, 호출 속도
+스케줄러를 유지하고 모델마다 정해진 간격으로 다시 호출합니다. 점검 시각은 간격 안에 고르게
+흩어 한꺼번에 몰리지 않게 하고, 카탈로그를 주기적으로 다시 확인해 모델을 추가하거나 제외합니다.
+모델별 현재 상태와 최근 지연 시간 기록은 로컬 HTTP 엔드포인트로 제공합니다.
+
+    python bedrock_daemon.py --region us-east-1 --interval 300 --port 8788
+    curl http://127.0.0.1:8788/status
+"""
+import argparse
+import heapq
+import json
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+
+from bedrock_token_sender import (
+    PROBE_PROFILES,
+    BedrockTokenSender,
+    load_prices,
+    load_quotas,
+    percentile,
+    prometheus_labels,
+    runtime_config,
+)
+
+# 모델별 기본 점검 간격(초)
+PROBE_INTERVAL = 300
+# 비동기 모델(영상 생성 등)은 호출 비용이 크므로 기본 간격을 길게 둠
+ASYNC_PROBE_INTERVAL = 6 * 3600
+# 카탈로그와 계정의 모델 사용 가능 여부를 다시 확인하는 간격(초)
+CATALOG_REFRESH_INTERVAL = 3600
+# 모델별로 보관할 최근 점검 결과 수
+HISTORY_SIZE = 120
+DAEMON_PORT = 8788
+
+
+class ProbeStatus:
+    """모델별 마지막 점검 결과와 최근 점검 기록을 보관합니다.
+    
+    BedrockTokenSender의 metrics 자리에 넣어 호출 기록을 받습니다. ProbeMetrics와 달리
+    기록을 계속 쌓지 않고 모델마다 최근 history개만 남깁니다.
+    """
+    
+    def __init__(self, history=HISTORY_SIZE):
+        self.history = history
+        self._models = {}
+        self._lock = threading.Lock()
+    
+    def track(self, model_id, interval):
+        """점검 대상 모델을 추가합니다."""
+        with self._lock:
+            self._models.setdefault(model_id, {
+                'interval': interval,
+                'last': None,
+                'last_success': None,
+                'consecutive_failures': 0,
+                'probes': 0,
+                'history': deque(maxlen=self.history),
+            })
+    
+    def forget(self, model_id):
+        with self._lock:
+            self._models.pop(model_id, None)
+    
+    def add(self, record):
+        """호출 기록으로 모델 상태를 갱신합니다. 제외된 모델의 늦은 결과(비동기 작업)는 버립니다."""
+        entry = {
+            'at': record['started_at'],
+            'status': record['status'],
+            'wall_ms': record['wall_ms'],
+            'ttft_ms': record['ttft_ms'],
+            'error_code': record['error_code'],
+        }
+        with self._lock:
+            state = self._models.get(record['model_id'])
+            if state is None:
+                return
+            state['history'].append(entry)
+            state['last'] = entry
+            state['probes'] += 1
+            if entry['status'] == 'success':
+                state['last_success'] = entry['at']
+                state['consecutive_failures'] = 0
+            elif entry['status'] == 'failed':
+                # 스로틀링은 모델이 응답하고 있다는 뜻이므로 연속 실패로 세지 않음
+                state['consecutive_failures'] += 1
+    
+    def model_ids(self):
+        with self._lock:
+            return sorted(self._models)
+    
+    def report(self, model_id, history=False):
+        """모델 상태 요약을 반환합니다. 점검 대상이 아니면 None."""
+        with self._lock:
+            state = self._models.get(model_id)
+            if state is None:
+                return None
+            entries = list(state['history'])
+            last = state['last'] or {}
+            report = {
+                'model_id': model_id,
+                'status': last.get('status', 'pending'),
+                'interval_s': state['interval'],
+                'last_probe': last.get('at'),
+                'last_success': state['last_success'],
+                'consecutive_failures': state['consecutive_failures'],
+                'error_code': last.get('error_code'),
+                'wall_ms': last.get('wall_ms'),
+                'ttft_ms': last.get('ttft_ms'),
+                'probes': state['probes'],
+            }
+        walls = sorted(entry['wall_ms'] for entry in entries
+                       if entry['status'] == 'success' and entry['wall_ms'] is not None)
+        report['p50_ms'] = percentile(walls, 50)
+        report['p95_ms'] = percentile(walls, 95)
+        report['availability'] = (
+            round(sum(1 for entry in entries if entry['status'] == 'success') / len(entries), 4)
+            if entries else None
+        )
+        if history:
+            report['history'] = entries
+        return report
+
+
+class ProbeDaemon:
+    """모델마다 정해진 간격으로 토큰을 보내는 상시 점검 루프입니다.
+    
+    점검 일정은 (예정 시각, 모델 ID) 힙으로 관리하고, 예정 시각이 된 모델만 작업자 풀에 넘깁니다.
+    처음 받은 모델은 간격 안에 같은 간격으로 배치하고, 나중에 추가된 모델은 모델 ID 해시로
+    위치를 정해 기존 모델의 일정을 흔들지 않습니다. 이전 점검이 끝나지 않은 모델은 그 차례를
+    건너뜁니다.
+    """
+    
+    def __init__(self, sender, interval=PROBE_INTERVAL, intervals=None, workers=8,
+                 catalog_interval=CATALOG_REFRESH_INTERVAL, history=HISTORY_SIZE):
+        self.sender = sender
+        self.interval = interval
+        # 모델 ID 접두사별 점검 간격 (가장 긴 접두사 우선, 예: {'anthropic.': 60})
+        self.intervals = intervals or {}
+        self.workers = workers
+        self.catalog_interval = catalog_interval
+        self.status = ProbeStatus(history)
+        # 호출 기록이 계속 쌓이지 않도록 상태 보관소로 받음
+        sender.metrics = self.status
+        self.started_at = None
+        self.catalog_checked = None
+        self.skipped = 0
+        self._due = {}
+        self._heap = []
+        self._running = set()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._executor = None
+        self._threads = []
+    
+    def interval_for(self, model_id):
+        """모델의 점검 간격(초)을 반환합니다."""
+        matches = [prefix for prefix in self.intervals if model_id.startswith(prefix)]
+        if matches:
+            return self.intervals[max(matches, key=len)]
+        if self.sender.payloads.lookup(model_id)['mode'] == 'async':
+            return max(self.interval, ASYNC_PROBE_INTERVAL)
+        return self.interval
+    
+    def sync(self, models):
+        """점검 대상을 models로 맞추고 (추가된 모델, 제외된 모델)을 반환합니다."""
+        now = time.monotonic()
+        current = set(models)
+        with self._cond:
+            initial = not self._due
+            added = [model_id for model_id in models if model_id not in self._due]
+            removed = sorted(model_id for model_id in self._due if model_id not in current)
+            for model_id in removed:
+                # 힙에 남은 항목은 꺼낼 때 건너뜀
+                del self._due[model_id]
+                self.status.forget(model_id)
+            for position, model_id in enumerate(added):
+                interval = self.interval_for(model_id)
+                if initial:
+                    phase = position / len(added)
+                else:
+                    phase = zlib.crc32(model_id.encode('utf-8')) / 2 ** 32
+                self.status.track(model_id, interval)
+                self._schedule(model_id, now + interval * phase)
+            self._cond.notify()
+        return added, removed
+    
+    def _schedule(self, model_id, due):
+        self._due[model_id] = due
+        heapq.heappush(self._heap, (due, model_id))
+    
+    def refresh_models(self, force=True):
+        """카탈로그, 모델 사용 가능 여부, inference profile 색인을 다시 확인해 점검 대상을 갱신합니다."""
+        if force:
+            try:
+                self.sender.model_catalog.refresh()
+            except (BotoCoreError, ClientError) as e:
+                self._log(f"모델 카탈로그 갱신 실패 (이전 목록 사용): {e}")
+            # 새 profile이 생기거나 바뀐 모델도 재시작 없이 반영
+            self.sender.profile_resolver.refresh()
+        models = self.sender.get_available_models()
+        self.catalog_checked = time.time()
+        if not models:
+            # 목록을 받지 못한 경우 점검 대상을 비우지 않음
+            self._log("호출 가능한 모델을 확인하지 못해 기존 점검 대상을 유지합니다.")
+            return [], []
+        if self.sender.s3_bucket is None and self.sender.needs_output_bucket(models):
+            self.sender.setup_s3_bucket()
+        added, removed = self.sync(models)
+        if added or removed:
+            self._log(f"점검 대상 {len(models)}개 (추가 {len(added)}개, 제외 {len(removed)}개)")
+        return added, removed
+    
+    def start(self):
+        """점검 대상을 불러오고 스케줄러와 카탈로그 갱신 스레드를 시작합니다."""
+        self.started_at = time.time()
+        if self.sender.service_quotas:
+            self._log(f"Service Quotas 할당량 {self.sender.load_service_quotas()}개 적용")
+        self.refresh_models(force=False)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bedrock-probe')
+        self._threads = [
+            threading.Thread(target=self._run, name='bedrock-daemon', daemon=True),
+            threading.Thread(target=self._refresh_loop, name='bedrock-catalog', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+    
+    def stop(self):
+        """새 점검을 멈추고 진행 중인 점검이 끝나길 기다린 뒤 캐시를 저장합니다."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+        for thread in self._threads:
+            thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        self.sender.format_cache.save()
+        self.sender.flush_outputs()
+    
+    def _run(self):
+        while not self._stop.is_set():
+            with self._cond:
+                due_models = []
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    due, model_id = heapq.heappop(self._heap)
+                    if self._due.get(model_id) != due:
+                        continue
+                    # 간격을 due 기준으로 더해 점검 시각이 밀리지 않게 하되, 늦어졌으면 지금부터 다시 셈
+                    interval = self.interval_for(model_id)
+                    next_due = due + interval
+                    self._schedule(model_id, next_due if next_due > now else now + interval)
+                    if model_id in self._running:
+                        self.skipped += 1
+                        continue
+                    self._running.add(model_id)
+                    due_models.append(model_id)
+                if not due_models:
+                    timeout = self._heap[0][0] - now if self._heap else None
+                    self._cond.wait(timeout)
+                    continue
+            for model_id in due_models:
+                self._executor.submit(self._probe, model_id)
+    
+    def _refresh_loop(self):
+        while not self._stop.wait(self.catalog_interval):
+            try:
+                self.refresh_models()
+                self.sender.format_cache.save()
+                self.sender.flush_outputs()
+            except Exception as e:
+                # 한 번의 갱신 실패로 갱신 스레드가 끝나지 않도록 기록만 하고 다음 주기에 다시 시도
+                self._log(f"카탈로그 갱신 실패 (다음 주기에 다시 시도): {type(e).__name__}: {e}")
+    
+    def _probe(self, model_id):
+        """모델을 한 번 점검합니다. 비동기 모델은 작업만 시작하고 완료는 작업 추적기에 맡깁니다."""
+        started = time.time()
+        result = None
+        with self.sender.capture_output() as lines:
+            try:
+                result = self.sender.send_token_to_model(model_id, wait=False)
+            except BotoCoreError as e:
+                # 연결 실패 등 ClientError가 아닌 오류도 가용성 실패로 기록
+                self.status.add({
+                    'model_id': model_id,
+                    'started_at': started,
+                    'status': 'failed',
+                    'wall_ms': round((time.time() - started) * 1000, 1),
+                    'ttft_ms': None,
+                    'error_code': type(e).__name__,
+                })
+                lines.append(f"✗ {model_id}: 실패 - {type(e).__name__}")
+            finally:
+                # 비동기 작업의 완료 메시지는 다른 스레드에서 추가되므로 지금까지 모인 줄만 출력
+                printed = len(lines)
+                for line in lines[:printed]:
+                    self._log(line)
+                if not isinstance(result, Future):
+                    self._finished(model_id)
+        if isinstance(result, Future):
+            
+            def done(future):
+                # 완료 메시지는 작업을 시작한 호출의 출력 버퍼에 뒤늦게 추가됨
+                for line in lines[printed:]:
+                    self._log(line)
+                self._finished(model_id)
+            
+            result.add_done_callback(done)
+    
+    def _finished(self, model_id):
+        with self._cond:
+            self._running.discard(model_id)
+    
+    def _log(self, message):
+        self.sender._print(f"[{datetime.now().strftime('%H:%M:%S')}] {message.lstrip()}")
+    
+    def next_probe(self, model_id):
+        """다음 점검 예정 시각(epoch 초)을 반환합니다."""
+        with self._cond:
+            due = self._due.get(model_id)
+        if due is None:
+            return None
+        return round(time.time() + due - time.monotonic(), 3)
+    
+    def model_report(self, model_id, history=True):
+        report = self.status.report(model_id, history=history)
+        if report is not None:
+            report['next_probe'] = self.next_probe(model_id)
+        return report
+    
+    def status_report(self):
+        """데몬과 모든 점검 대상의 현재 상태를 반환합니다."""
+        models = [
+            report for report in (self.model_report(model_id, history=False)
+                                  for model_id in self.status.model_ids())
+            if report is not None
+        ]
+        counts = {}
+        for report in models:
+            counts[report['status']] = counts.get(report['status'], 0) + 1
+        with self._cond:
+            running, skipped = len(self._running), self.skipped
+        return {
+            'region': self.sender.region,
+            'started_at': self.started_at,
+            'uptime_s': round(time.time() - self.started_at, 1) if self.started_at else None,
+            'catalog_checked': self.catalog_checked,
+            'model_count': len(models),
+            'statuses': counts,
+            'running': running,
+            'skipped': skipped,
+            'stats': dict(self.sender.stats),
+            'models': models,
+        }
+    
+    def prometheus(self):
+        """모델별 현재 상태를 Prometheus 텍스트 노출 형식으로 반환합니다."""
+        reports = self.status_report()['models']
+        gauges = (
+            ('bedrock_probe_up', 'Whether the last probe of the model succeeded.',
+             lambda report: None if report['status'] == 'pending' else int(report['status'] == 'success')),
+            ('bedrock_probe_last_duration_seconds', 'Wall time of the last probe.',
+             lambda report: None if report['wall_ms'] is None else report['wall_ms'] / 1000),
+            ('bedrock_probe_p95_duration_seconds', 'p95 wall time of recent successful probes.',
+             lambda report: None if report['p95_ms'] is None else report['p95_ms'] / 1000),
+            ('bedrock_probe_availability_ratio', 'Share of recent probes that succeeded.',
+             lambda report: report['availability']),
+            ('bedrock_probe_consecutive_failures', 'Failed probes since the last success.',
+             lambda report: report['consecutive_failures']),
+            ('bedrock_probe_last_timestamp_seconds', 'Start time of the last probe.',
+             lambda report: report['last_probe']),
+        )
+        lines = []
+        for name, description, value_of in gauges:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} gauge")
+            for report in reports:
+                value = value_of(report)
+                if value is not None:
+                    labels = [('target', self.sender.label or ''), ('region', self.sender.region),
+                              ('model', report['model_id'])]
+                    lines.append(f"{name}{prometheus_labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    """GET /status, /status/<모델 ID>, /metrics, /healthz 요청에 답합니다."""
+    
+    protocol_version = 'HTTP/1.1'
+    daemon = None
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _send(self, status, body, content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _json(self, data, status=200):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode('utf-8'))
+    
+    def do_GET(self):
+        path = unquote(urlsplit(self.path).path).rstrip('/')
+        if path in ('', '/status'):
+            self._json(self.daemon.status_report())
+        elif path.startswith('/status/'):
+            report = self.daemon.model_report(path[len('/status/'):])
+            if report is None:
+                self._json({'message': '점검 대상이 아닌 모델입니다.'}, status=404)
+            else:
+                self._json(report)
+        elif path == '/metrics':
+            self._send(200, self.daemon.prometheus().encode('utf-8'), 'text/plain; version=0.0.4')
+        elif path == '/healthz':
+            self._send(200, b'ok', 'text/plain')
+        else:
+            self._json({'message': f"알 수 없는 경로: {path}"}, status=404)
+
+
+class StatusServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def start_status_server(daemon, host='127.0.0.1', port=DAEMON_PORT):
+    """상태 엔드포인트를 백그라운드 스레드에서 시작하고 (서버, 주소)를 반환합니다."""
+    handler = type('BoundStatusHandler', (StatusHandler,), {'daemon': daemon})
+    server = StatusServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name='bedrock-status', daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def load_intervals(path):
+    """모델 ID 접두사별 점검 간격 파일(JSON)을 읽습니다.
+    
+    {"anthropic.": 60, "amazon.nova-reel": 86400}
+    """
+    with open(path, encoding='utf-8') as f:
+        return {prefix: float(seconds) for prefix, seconds in json.load(f).items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bedrock 모델 가용성 상시 점검 데몬")
+    parser.add_argument('--region', required=True, help="점검할 리전")
+    parser.add_argument('--profile', help="AWS 프로필 이름 (없으면 기본 자격 증명 사용)")
+    parser.add_argument('--label', help="출력과 지표에 붙일 대상 이름")
+    parser.add_argument('--interval', type=float, default=PROBE_INTERVAL, help="모델별 점검 간격(초)")
+    parser.add_argument('--intervals', help="모델 ID 접두사별 점검 간격 파일 (JSON)")
+    parser.add_argument('--catalog-interval', type=float, default=CATALOG_REFRESH_INTERVAL,
+                        help="모델 카탈로그 재확인 간격(초)")
+    parser.add_argument('--workers', type=int, default=8, help="동시 점검 수")
+    parser.add_argument('--history', type=int, default=HISTORY_SIZE, help="모델별로 보관할 최근 점검 결과 수")
+    parser.add_argument('--host', default='127.0.0.1', help="상태 엔드포인트 주소")
+    parser.add_argument('--port', type=int, default=DAEMON_PORT, help="상태 엔드포인트 포트")
+    parser.add_argument('--stream', action='store_true', help="스트리밍 지원 모델은 첫 청크까지만 받는 스트리밍 호출 사용")
+    parser.add_argument('--probe', choices=sorted(PROBE_PROFILES), default='cheapest', help="요청 본문 설정")
+    parser.add_argument('--converse', action='store_true', help="텍스트 모델을 Converse API로 호출")
+    parser.add_argument('--prices', help="모델별 1,000 토큰당 가격 파일 (JSON)")
+    parser.add_argument('--quotas', help="모델별 RPM/TPM 할당량 파일 (JSON)")
+    parser.add_argument('--service-quotas', action='store_true', help="Service Quotas의 모델별 할당량으로 호출 속도 조절")
+    parser.add_argument('--delete-outputs', action='store_true', help="확인을 마친 비동기 작업 출력을 S3에서 삭제")
+    parser.add_argument('--endpoint-url', help="모든 AWS 호출을 보낼 주소 (예: 로컬 스텁 서버)")
+    args = parser.parse_args()
+    
+    session = None
+    if args.profile:
+        session = boto3.session.Session(profile_name=args.profile)
+    sender = BedrockTokenSender(
+        None, None, args.region,
+        session=session,
+        label=args.label,
+        config=runtime_config(),
+        prices=load_prices(args.prices) if args.prices else None,
+        stream=args.stream,
+        endpoint_url=args.endpoint_url,
+        probe=args.probe,
+        quotas=load_quotas(args.quotas) if args.quotas else None,
+        service_quotas=args.service_quotas,
+        delete_outputs=args.delete_outputs,
+        converse=args.converse
+    )
+    daemon = ProbeDaemon(
+        sender,
+        interval=args.interval,
+        intervals=load_intervals(args.intervals) if args.intervals else None,
+        workers=args.workers,
+        catalog_interval=args.catalog_interval,
+        history=args.history
+    )
+    daemon.start()
+    server, url = start_status_server(daemon, args.host, args.port)
+    print(f"점검 데몬 실행 중: {url}/status (모델 {len(daemon.status.model_ids())}개, 간격 {args.interval:g}초)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("\n종료 중...")
+    finally:
+        server.shutdown()
+        daemon.stop()
+
+if __name__ == "__main__":
+    main()
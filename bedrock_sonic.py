@@ -0,0 +1,150 @@
+"""Nova Sonic 양방향 스트리밍 호출.
+
+Nova Sonic은 invoke_model을 지원하지 않고 InvokeModelWithBidirectionalStream만 지원합니다.
+boto3에는 이 API가 없어 실험적 SDK(aws_sdk_bedrock_runtime, Python 3.12 이상)를 사용하며,
+설치되어 있지 않으면 available()이 False를 반환합니다.
+"""
+import asyncio
+import json
+import time
+import uuid
+
+try:
+    from aws_sdk_bedrock_runtime.client import (
+        BedrockRuntimeClient,
+        InvokeModelWithBidirectionalStreamOperationInput,
+    )
+    from aws_sdk_bedrock_runtime.config import Config, HTTPAuthSchemeResolver, SigV4AuthScheme
+    from aws_sdk_bedrock_runtime.models import (
+        BidirectionalInputPayloadPart,
+        InvokeModelWithBidirectionalStreamInputChunk,
+    )
+    from smithy_aws_core.credentials_resolvers import StaticCredentialsResolver
+    from smithy_aws_core.identity import AWSCredentialsIdentity
+except ImportError:  # 양방향 스트리밍 SDK 미설치 시 Nova Sonic 스킵
+    BedrockRuntimeClient = None
+
+# 첫 출력 이벤트를 기다리는 최대 시간 (초)
+SONIC_TIMEOUT = 30
+
+# 모델이 응답을 시작했음을 나타내는 출력 이벤트
+SONIC_OUTPUT_EVENTS = ('contentStart', 'textOutput', 'audioOutput')
+
+
+def available():
+    """양방향 스트리밍 SDK가 설치되어 있는지 확인합니다."""
+    return BedrockRuntimeClient is not None
+
+
+def _session_events(prompt_name, system_name, content_name):
+    """텍스트 한 턴을 보내는 최소 세션 시작 이벤트 목록을 만듭니다."""
+    return [
+        {"event": {"sessionStart": {
+            "inferenceConfiguration": {"maxTokens": 16, "topP": 0.9, "temperature": 0.7}
+        }}},
+        {"event": {"promptStart": {
+            "promptName": prompt_name,
+            "textOutputConfiguration": {"mediaType": "text/plain"},
+            "audioOutputConfiguration": {
+                "mediaType": "audio/lpcm",
+                "sampleRateHertz": 24000,
+                "sampleSizeBits": 16,
+                "channelCount": 1,
+                "voiceId": "matthew",
+                "encoding": "base64",
+                "audioType": "SPEECH"
+            }
+        }}},
+        {"event": {"contentStart": {
+            "promptName": prompt_name,
+            "contentName": system_name,
+            "type": "TEXT",
+            "interactive": False,
+            "role": "SYSTEM",
+            "textInputConfiguration": {"mediaType": "text/plain"}
+        }}},
+        {"event": {"textInput": {
+            "promptName": prompt_name,
+            "contentName": system_name,
+            "content": "Reply in one word."
+        }}},
+        {"event": {"contentEnd": {"promptName": prompt_name, "contentName": system_name}}},
+        {"event": {"contentStart": {
+            "promptName": prompt_name,
+            "contentName": content_name,
+            "type": "TEXT",
+            "interactive": True,
+            "role": "USER",
+            "textInputConfiguration": {"mediaType": "text/plain"}
+        }}},
+        {"event": {"textInput": {
+            "promptName": prompt_name,
+            "contentName": content_name,
+            "content": "Hello"
+        }}},
+        {"event": {"contentEnd": {"promptName": prompt_name, "contentName": content_name}}},
+    ]
+
+
+async def _send(stream, event):
+    chunk = InvokeModelWithBidirectionalStreamInputChunk(
+        value=BidirectionalInputPayloadPart(bytes_=json.dumps(event).encode('utf-8'))
+    )
+    await stream.input_stream.send(chunk)
+
+
+async def _first_output(access_key, secret_key, session_token, region, model_id, endpoint_url=None):
+    client = BedrockRuntimeClient(config=Config(
+        endpoint_uri=endpoint_url or f"https://bedrock-runtime.{region}.amazonaws.com",
+        region=region,
+        aws_credentials_identity_resolver=StaticCredentialsResolver(
+            credentials=AWSCredentialsIdentity(
+                access_key_id=access_key,
+                secret_access_key=secret_key,
+                session_token=session_token
+            )
+        ),
+        http_auth_scheme_resolver=HTTPAuthSchemeResolver(),
+        http_auth_schemes={"aws.auth#sigv4": SigV4AuthScheme(service="bedrock")}
+    ))
+    stream = await client.invoke_model_with_bidirectional_stream(
+        InvokeModelWithBidirectionalStreamOperationInput(model_id=model_id)
+    )
+    prompt_name = str(uuid.uuid4())
+    started = time.perf_counter()
+    try:
+        for event in _session_events(prompt_name, str(uuid.uuid4()), str(uuid.uuid4())):
+            await _send(stream, event)
+        
+        _, output = await stream.await_output()
+        while True:
+            result = await output.receive()
+            if result is None:
+                # 출력 없이 스트림이 끝남
+                return None
+            if result.value is None or not result.value.bytes_:
+                continue
+            event = json.loads(result.value.bytes_.decode('utf-8')).get('event', {})
+            # 첫 출력 이벤트로 모델 동작이 확인되면 나머지 응답은 받지 않음
+            if any(name in event for name in SONIC_OUTPUT_EVENTS):
+                return round((time.perf_counter() - started) * 1000, 1)
+    finally:
+        try:
+            await _send(stream, {"event": {"promptEnd": {"promptName": prompt_name}}})
+            await _send(stream, {"event": {"sessionEnd": {}}})
+        finally:
+            await stream.input_stream.close()
+
+
+async def probe(access_key, secret_key, session_token, region, model_id, timeout=SONIC_TIMEOUT,
+                endpoint_url=None):
+    """Nova Sonic에 텍스트 한 턴을 보내고 첫 출력 이벤트까지의 시간(ms)을 반환합니다.
+    
+    첫 출력 이벤트를 받으면 세션을 바로 종료합니다. 출력 없이 스트림이 끝나면 None을
+    반환하고, 시간 내에 응답이 없으면 asyncio.TimeoutError가 발생합니다.
+    endpoint_url이 있으면 리전 기본 주소 대신 그 주소로 연결합니다 (VPC 엔드포인트 등).
+    """
+    return await asyncio.wait_for(
+        _first_output(access_key, secret_key, session_token, region, model_id, endpoint_url),
+        timeout
+    )
@@ -0,0 +1,696 @@
+"""벤치마크용 로컬 Bedrock 스텁 서버.
+
+BedrockTokenSender가 사용하는 bedrock, bedrock-runtime, s3, sts, service-quotas API를 하나의 HTTP 서버에서
+흉내 냅니다. 요청 서명의 서비스 이름(Credential scope)으로 서비스를 구분하며, 모델별 지연 시간,
+오류율, 스로틀링 비율, 분당 요청 할당량, 비동기 작업 소요 시간을 설정할 수 있습니다.
+비동기 작업 결과는 메모리의 S3 객체로 기록되어 출력 확인과 삭제를 흉내 낼 수 있습니다.
+배치 추론 작업은 S3에 올린 입력(멀티파트 업로드 포함)을 읽어 레코드별 출력을 만듭니다.
+
+    python bedrock_stub_server.py --port 8787 --models 500
+    python bedrock_token_sender.py --endpoint-url http://127.0.0.1:8787
+"""
+import argparse
+import base64
+import collections
+import json
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape, unescape
+
+# 모델별 기본 동작
+# latency_ms: 응답(스트리밍은 첫 청크)까지의 지연 시간, jitter_ms: 지연 시간에 더할 무작위 범위
+# error_rate: AccessDeniedException 비율 (배치 작업은 레코드 오류 비율), throttle_rate: ThrottlingException 비율
+# validation_formats: ValidationException으로 거부할 앞쪽 요청 형식 수 (대체 형식 시도 재현)
+# async_duration: 비동기/배치 작업 완료까지의 시간(초), stream_chunks: 스트리밍 응답 청크 수
+# converse: Converse API 지원 여부 (False면 Converse 요청을 ValidationException으로 거부)
+# rpm: 모델별 분당 요청 할당량 (0이면 제한 없음, 초과하면 ThrottlingException이며 Service Quotas로도 조회됨)
+DEFAULT_BEHAVIOR = {
+    'latency_ms': 50,
+    'jitter_ms': 0,
+    'error_rate': 0.0,
+    'throttle_rate': 0.0,
+    'validation_formats': 0,
+    'async_duration': 3,
+    'stream_chunks': 5,
+    'converse': True,
+    'rpm': 0,
+}
+
+STUB_ACCOUNT_ID = '123456789012'
+
+# bedrock-runtime 모델 호출 경로(/model/{id}/...)의 마지막 부분 → 요청 수 집계 이름
+RUNTIME_OPERATIONS = {
+    'invoke': 'InvokeModel',
+    'invoke-with-response-stream': 'InvokeModelWithResponseStream',
+    'converse': 'Converse',
+    'converse-stream': 'ConverseStream',
+}
+
+# 시뮬레이션 모델 ID 템플릿 (요청 형식 레지스트리의 여러 패밀리에 고르게 분포)
+SIMULATED_MODELS = (
+    ('anthropic', 'Anthropic', 'anthropic.claude-sim-{n}-v1:0', 'TEXT', True),
+    ('meta', 'Meta', 'meta.llama3-sim-{n}-instruct-v1:0', 'TEXT', True),
+    ('amazon', 'Amazon', 'amazon.nova-sim-{n}-v1:0', 'TEXT', True),
+    ('mistral', 'Mistral AI', 'mistral.mistral-sim-{n}-v1:0', 'TEXT', True),
+    ('amazon', 'Amazon', 'amazon.titan-embed-sim-{n}-v2:0', 'EMBEDDING', False),
+    ('cohere', 'Cohere', 'cohere.command-r-sim-{n}-v1:0', 'TEXT', True),
+    ('ai21', 'AI21 Labs', 'ai21.jamba-sim-{n}-v1:0', 'TEXT', True),
+    ('deepseek', 'DeepSeek', 'deepseek.r1-sim-{n}-v1:0', 'TEXT', True),
+    ('cohere', 'Cohere', 'cohere.embed-sim-{n}-v3', 'EMBEDDING', False),
+    ('twelvelabs', 'TwelveLabs', 'twelvelabs.marengo-embed-sim-{n}-v1:0', 'EMBEDDING', False),
+)
+
+
+def simulated_models(count):
+    """count개의 시뮬레이션 모델 요약(list_foundation_models 형식)을 만듭니다."""
+    models = []
+    for n in range(count):
+        _, provider, template, output, streaming = SIMULATED_MODELS[n % len(SIMULATED_MODELS)]
+        models.append({
+            'modelId': template.format(n=f"{n:05d}"),
+            'modelName': f"Simulated {n}",
+            'providerName': provider,
+            'inputModalities': ['TEXT'],
+            'outputModalities': [output],
+            'responseStreamingSupported': streaming,
+            'inferenceTypesSupported': ['ON_DEMAND'],
+            'modelLifecycle': {'status': 'ACTIVE'},
+        })
+    return models
+
+
+def _event_message(event_type, payload):
+    """application/vnd.amazon.eventstream 형식의 이벤트 메시지 하나를 만듭니다."""
+    headers = b''
+    for name, value in ((':event-type', event_type), (':content-type', 'application/json'),
+                        (':message-type', 'event')):
+        name, value = name.encode('utf-8'), value.encode('utf-8')
+        headers += struct.pack('>B', len(name)) + name + b'\x07' + struct.pack('>H', len(value)) + value
+    prelude = struct.pack('>II', 16 + len(headers) + len(payload), len(headers))
+    message = prelude + struct.pack('>I', zlib.crc32(prelude)) + headers + payload
+    return message + struct.pack('>I', zlib.crc32(message))
+
+
+def _timestamp(value):
+    return datetime.fromtimestamp(value, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+class StubError(Exception):
+    def __init__(self, status, code, message):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+class BedrockStub:
+    """스텁 서버의 상태(모델 카탈로그, 버킷, 비동기 작업, 요청 수)를 관리합니다.
+    
+    overrides는 모델 ID 접두사 → 동작 설정이며 가장 긴 접두사가 적용됩니다.
+    seed를 지정하면 오류/스로틀링 발생 순서를 재현할 수 있습니다.
+    """
+    
+    def __init__(self, models, behavior=None, overrides=None, seed=None, account_id=STUB_ACCOUNT_ID):
+        self.models = models
+        self.model_ids = frozenset(model['modelId'] for model in models)
+        self.behavior = dict(DEFAULT_BEHAVIOR, **(behavior or {}))
+        self.overrides = overrides or {}
+        self.account_id = account_id
+        self.buckets = set()
+        # 버킷별 객체 {키: 내용}과 수명 주기 설정
+        self.objects = {}
+        self.lifecycle = {}
+        self.jobs = {}
+        # 배치 추론 작업과 진행 중인 멀티파트 업로드 {업로드 ID: {파트 번호: 내용}}
+        self.batch_jobs = {}
+        self.uploads = {}
+        self.rejected = {}
+        self.requests = {}
+        self.calls = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def behavior_for(self, model_id):
+        """모델에 적용할 동작 설정을 반환합니다."""
+        matches = [prefix for prefix in self.overrides if model_id.startswith(prefix)]
+        if not matches:
+            return self.behavior
+        return dict(self.behavior, **self.overrides[max(matches, key=len)])
+    
+    def count(self, operation):
+        with self._lock:
+            self.requests[operation] = self.requests.get(operation, 0) + 1
+    
+    def reset_counts(self):
+        with self._lock:
+            self.requests = {}
+    
+    def _roll(self):
+        with self._lock:
+            return self._random.random()
+    
+    def _check_quota(self, model_id, behavior):
+        """최근 60초 동안의 요청 수가 rpm을 넘으면 ThrottlingException을 발생시킵니다."""
+        if not behavior['rpm']:
+            return
+        now = time.monotonic()
+        with self._lock:
+            calls = self.calls.setdefault(model_id, collections.deque())
+            while calls and now - calls[0] >= 60:
+                calls.popleft()
+            if len(calls) >= behavior['rpm']:
+                raise StubError(429, 'ThrottlingException', 'Too many requests, please wait before trying again.')
+            calls.append(now)
+    
+    def service_quotas(self):
+        """rpm이 설정된 모델의 할당량을 ListServiceQuotas 형식으로 반환합니다."""
+        quotas = []
+        for model in self.models:
+            rpm = self.behavior_for(model['modelId'])['rpm']
+            if rpm:
+                quotas.append({
+                    'ServiceCode': 'bedrock',
+                    'QuotaCode': f"L-{len(quotas):08X}",
+                    'QuotaName': f"On-demand model inference requests per minute for "
+                                 f"{model['providerName']} {model['modelName']}",
+                    'Value': float(rpm),
+                    'Unit': 'None',
+                    'Adjustable': True,
+                })
+        return quotas
+    
+    def check_invoke(self, model_id, body, converse=False):
+        """호출 결과를 정하고 지연 시간(초)을 반환합니다. 실패해야 하면 StubError가 발생합니다.
+        
+        Converse 요청은 모든 모델이 같은 형식이므로 validation_formats를 적용하지 않습니다.
+        """
+        if model_id not in self.model_ids:
+            raise StubError(404, 'ResourceNotFoundException', f"Model {model_id} not found")
+        behavior = self.behavior_for(model_id)
+        if converse and not behavior['converse']:
+            raise StubError(400, 'ValidationException', "This action doesn't support the model that you provided.")
+        self._check_quota(model_id, behavior)
+        roll = self._roll()
+        if roll < behavior['throttle_rate']:
+            raise StubError(429, 'ThrottlingException', 'Too many requests, please wait before trying again.')
+        if roll < behavior['throttle_rate'] + behavior['error_rate']:
+            raise StubError(403, 'AccessDeniedException', "You don't have access to the model.")
+        if behavior['validation_formats'] and not converse:
+            # 같은 모델에 대해 처음 보는 본문 형식을 validation_formats개까지 거부
+            with self._lock:
+                rejected = self.rejected.setdefault(model_id, [])
+                if body in rejected or len(rejected) < behavior['validation_formats']:
+                    if body not in rejected:
+                        rejected.append(body)
+                    raise StubError(400, 'ValidationException', 'Malformed input request.')
+        latency = behavior['latency_ms'] + self._roll() * behavior['jitter_ms']
+        return latency / 1000
+    
+    def start_job(self, model_id, body):
+        if model_id not in self.model_ids:
+            raise StubError(404, 'ResourceNotFoundException', f"Model {model_id} not found")
+        behavior = self.behavior_for(model_id)
+        self._check_quota(model_id, behavior)
+        if self._roll() < behavior['throttle_rate']:
+            raise StubError(429, 'ThrottlingException', 'Too many requests, please wait before trying again.')
+        invocation_id = uuid.uuid4().hex[:12]
+        arn = f"arn:aws:bedrock:us-east-1:{self.account_id}:async-invoke/{invocation_id}"
+        now = time.time()
+        # 실제 서비스처럼 요청한 출력 경로 아래 작업 ID 경로에 결과를 씀
+        uri = body.get('outputDataConfig', {}).get('s3OutputDataConfig', {}).get('s3Uri', '')
+        output_uri = f"{uri.rstrip('/')}/{invocation_id}"
+        bucket, _, prefix = output_uri[len('s3://'):].partition('/')
+        with self._lock:
+            self.jobs[arn] = {
+                'invocationArn': arn,
+                'modelArn': f"arn:aws:bedrock:us-east-1::foundation-model/{model_id}",
+                'submitTime': now,
+                'endTime': now + behavior['async_duration'],
+                'outputDataConfig': {'s3OutputDataConfig': {'s3Uri': output_uri}},
+            }
+            objects = self.objects.setdefault(bucket, {})
+            objects[f"{prefix}/output.json"] = json.dumps({'data': [{'embedding': [0.0] * 256}]}).encode('utf-8')
+            objects[f"{prefix}/manifest.json"] = json.dumps({'modelId': model_id}).encode('utf-8')
+        return arn
+    
+    def job_summary(self, job):
+        done = time.time() >= job['endTime']
+        summary = {
+            'invocationArn': job['invocationArn'],
+            'modelArn': job['modelArn'],
+            'status': 'Completed' if done else 'InProgress',
+            'submitTime': _timestamp(job['submitTime']),
+            'lastModifiedTime': _timestamp(min(time.time(), job['endTime'])),
+            'outputDataConfig': job['outputDataConfig'],
+        }
+        if done:
+            summary['endTime'] = _timestamp(job['endTime'])
+        return summary
+    
+    def start_batch_job(self, request):
+        """배치 추론 작업을 만들고 입력 파일마다 레코드별 출력(<파일>.out)과 manifest.json.out을 씁니다."""
+        model_id = request['modelId']
+        if model_id not in self.model_ids:
+            raise StubError(404, 'ResourceNotFoundException', f"Model {model_id} not found")
+        behavior = self.behavior_for(model_id)
+        job_id = uuid.uuid4().hex[:12]
+        arn = f"arn:aws:bedrock:us-east-1:{self.account_id}:model-invocation-job/{job_id}"
+        input_uri = request['inputDataConfig']['s3InputDataConfig']['s3Uri']
+        output_uri = request['outputDataConfig']['s3OutputDataConfig']['s3Uri']
+        input_bucket, _, input_prefix = input_uri[len('s3://'):].partition('/')
+        output_bucket, _, output_prefix = output_uri[len('s3://'):].partition('/')
+        output_prefix = f"{output_prefix.rstrip('/')}/{job_id}".lstrip('/')
+        
+        with self._lock:
+            inputs = sorted(
+                (key, data) for key, data in self.objects.get(input_bucket, {}).items()
+                if key.startswith(input_prefix)
+            )
+        counts = {'total': 0, 'errors': 0}
+        outputs = {}
+        for key, data in inputs:
+            lines = []
+            for line in data.decode('utf-8').splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                counts['total'] += 1
+                if self._roll() < behavior['error_rate']:
+                    counts['errors'] += 1
+                    record['error'] = {'errorCode': 400, 'errorMessage': 'Malformed input request.'}
+                else:
+                    # 여러 패밀리의 사용량 필드를 함께 담아 어떤 모델이든 사용량을 읽을 수 있게 함
+                    record['modelOutput'] = {
+                        'stub': True,
+                        'usage': {'input_tokens': 8, 'output_tokens': 4, 'inputTokens': 8, 'outputTokens': 4,
+                                  'prompt_tokens': 8, 'completion_tokens': 4},
+                        'prompt_token_count': 8,
+                        'generation_token_count': 4,
+                        'inputTextTokenCount': 8,
+                        'results': [{'tokenCount': 4}],
+                        'meta': {'billed_units': {'input_tokens': 8, 'output_tokens': 4}},
+                    }
+                lines.append(json.dumps(record))
+            outputs[f"{output_prefix}/{key.rsplit('/', 1)[-1]}.out"] = ('\n'.join(lines) + '\n').encode('utf-8')
+        outputs[f"{output_prefix}/manifest.json.out"] = json.dumps({
+            'totalRecordCount': counts['total'],
+            'processedRecordCount': counts['total'],
+            'successRecordCount': counts['total'] - counts['errors'],
+            'errorRecordCount': counts['errors'],
+        }).encode('utf-8')
+        
+        if counts['errors'] == counts['total']:
+            # 입력이 없거나 모든 레코드가 실패
+            status = 'Failed'
+        elif counts['errors']:
+            status = 'PartiallyCompleted'
+        else:
+            status = 'Completed'
+        now = time.time()
+        with self._lock:
+            self.objects.setdefault(output_bucket, {}).update(outputs)
+            self.batch_jobs[arn] = {
+                'jobArn': arn,
+                'jobName': request['jobName'],
+                'modelId': model_id,
+                'roleArn': request['roleArn'],
+                'status': status,
+                'submitTime': now,
+                'endTime': now + behavior['async_duration'],
+                'inputDataConfig': request['inputDataConfig'],
+                'outputDataConfig': request['outputDataConfig'],
+                'counts': counts,
+            }
+        return arn
+    
+    def batch_summary(self, job):
+        done = time.time() >= job['endTime']
+        summary = {
+            'jobArn': job['jobArn'],
+            'jobName': job['jobName'],
+            'modelId': job['modelId'],
+            'roleArn': job['roleArn'],
+            'status': job['status'] if done else 'InProgress',
+            'submitTime': _timestamp(job['submitTime']),
+            'lastModifiedTime': _timestamp(min(time.time(), job['endTime'])),
+            'inputDataConfig': job['inputDataConfig'],
+            'outputDataConfig': job['outputDataConfig'],
+        }
+        if done:
+            summary['endTime'] = _timestamp(job['endTime'])
+            summary['totalRecordCount'] = job['counts']['total']
+            summary['errorRecordCount'] = job['counts']['errors']
+        return summary
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 동시 실행 수가 클 때 연결이 거부되지 않도록 대기열을 늘림
+    request_queue_size = 256
+    
+    def handle_error(self, request, client_address):
+        # 클라이언트가 연결을 먼저 닫는 것은 정상 동작 (스트리밍 조기 종료, 연결 풀 정리)
+        pass
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 헤더와 본문을 따로 쓰므로 Nagle 알고리즘이 켜져 있으면 응답마다 지연이 생김
+    disable_nagle_algorithm = True
+    stub = None
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _service(self):
+        match = re.search(r'Credential=[^/]+/[^/]+/[^/]+/([^/]+)/', self.headers.get('Authorization', ''))
+        return match.group(1) if match else None
+    
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+    
+    def _send(self, status, body=b'', content_type='application/json', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('x-amzn-RequestId', str(uuid.uuid4()))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+    
+    def _json(self, data, status=200, headers=None):
+        self._send(status, json.dumps(data).encode('utf-8'), headers=headers)
+    
+    def _handle(self):
+        body = self._body()
+        service = self._service()
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        query = {key: values[0] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+        try:
+            if service == 'sts':
+                return self._sts()
+            if service == 's3':
+                return self._s3(path, query, body)
+            if service == 'servicequotas':
+                return self._service_quotas()
+            if path.startswith('/model/') or path.startswith('/async-invoke'):
+                return self._runtime(path, query, body)
+            return self._control(path, query, body)
+        except StubError as e:
+            self._json({'message': str(e)}, e.status, headers={'x-amzn-ErrorType': e.code})
+    
+    do_GET = do_POST = do_PUT = do_HEAD = do_DELETE = _handle
+    
+    def _sts(self):
+        self.stub.count('GetCallerIdentity')
+        xml = (
+            '<GetCallerIdentityResponse xmlns="https://sts.amazonaws.com/doc/2011-06-15/">'
+            '<GetCallerIdentityResult>'
+            f'<Arn>arn:aws:iam::{self.stub.account_id}:user/stub</Arn>'
+            '<UserId>AIDASTUB</UserId>'
+            f'<Account>{self.stub.account_id}</Account>'
+            '</GetCallerIdentityResult>'
+            '<ResponseMetadata><RequestId>stub</RequestId></ResponseMetadata>'
+            '</GetCallerIdentityResponse>'
+        )
+        self._send(200, xml.encode('utf-8'), content_type='text/xml')
+    
+    def _s3(self, path, query, body):
+        stub = self.stub
+        bucket, _, key = path.lstrip('/').partition('/')
+        if key:
+            return self._s3_object(bucket, key, query, body)
+        if self.command == 'HEAD':
+            stub.count('HeadBucket')
+            self._send(200 if bucket in stub.buckets else 404)
+        elif self.command == 'PUT' and 'lifecycle' in query:
+            stub.count('PutBucketLifecycleConfiguration')
+            stub.lifecycle[bucket] = body.decode('utf-8')
+            self._send(200, content_type='application/xml')
+        elif self.command == 'PUT':
+            stub.count('CreateBucket')
+            stub.buckets.add(bucket)
+            self._send(200, content_type='application/xml', headers={'Location': f"/{bucket}"})
+        elif self.command == 'POST' and 'delete' in query:
+            stub.count('DeleteObjects')
+            keys = [unescape(key) for key in re.findall(r'<Key>(.*?)</Key>', body.decode('utf-8'))]
+            with stub._lock:
+                objects = stub.objects.get(bucket, {})
+                for key in keys:
+                    objects.pop(key, None)
+            self._xml('<DeleteResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/"></DeleteResult>')
+        elif self.command == 'GET' and query.get('list-type') == '2':
+            stub.count('ListObjectsV2')
+            self._list_objects(bucket, query.get('prefix', ''))
+        else:
+            self._send(501)
+    
+    def _xml(self, xml):
+        self._send(200, xml.encode('utf-8'), content_type='application/xml')
+    
+    def _list_objects(self, bucket, prefix):
+        # 스텁 객체 수가 많지 않으므로 페이지를 나누지 않음
+        with self.stub._lock:
+            objects = sorted(
+                (key, len(data)) for key, data in self.stub.objects.get(bucket, {}).items()
+                if key.startswith(prefix)
+            )
+        contents = ''.join(
+            f'<Contents><Key>{escape(key)}</Key><Size>{size}</Size><ETag>"stub"</ETag>'
+            f'<LastModified>{_timestamp(time.time())}</LastModified><StorageClass>STANDARD</StorageClass></Contents>'
+            for key, size in objects
+        )
+        self._xml(
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f'<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(objects)}</KeyCount>'
+            f'<MaxKeys>1000</MaxKeys><IsTruncated>false</IsTruncated>{contents}</ListBucketResult>'
+        )
+    
+    def _s3_object(self, bucket, key, query, body):
+        if self.command != 'GET':
+            return self._s3_write(bucket, key, query, body)
+        self.stub.count('GetObject')
+        data = self.stub.objects.get(bucket, {}).get(key)
+        if data is None:
+            return self._send(404, b'<Error><Code>NoSuchKey</Code></Error>', content_type='application/xml')
+        match = re.match(r'bytes=(\d+)-(\d*)$', self.headers.get('Range', ''))
+        if match is None:
+            return self._send(200, data, content_type='application/octet-stream')
+        start = int(match.group(1))
+        end = min(int(match.group(2) or len(data) - 1), len(data) - 1)
+        self._send(206, data[start:end + 1], content_type='application/octet-stream', headers={
+            'Content-Range': f"bytes {start}-{end}/{len(data)}",
+        })
+    
+    def _s3_write(self, bucket, key, query, body):
+        """PutObject와 멀티파트 업로드(생성, 파트 업로드, 완료, 취소)를 처리합니다."""
+        stub = self.stub
+        if self.command == 'PUT' and 'uploadId' in query:
+            stub.count('UploadPart')
+            with stub._lock:
+                parts = stub.uploads.get(query['uploadId'])
+                if parts is None:
+                    raise StubError(404, 'NoSuchUpload', 'The specified upload does not exist.')
+                parts[int(query['partNumber'])] = body
+            return self._send(200, content_type='application/xml', headers={'ETag': f'"{zlib.crc32(body):08x}"'})
+        if self.command == 'PUT':
+            stub.count('PutObject')
+            with stub._lock:
+                stub.objects.setdefault(bucket, {})[key] = body
+            return self._send(200, content_type='application/xml', headers={'ETag': f'"{zlib.crc32(body):08x}"'})
+        if self.command == 'POST' and 'uploads' in query:
+            stub.count('CreateMultipartUpload')
+            upload_id = uuid.uuid4().hex
+            with stub._lock:
+                stub.uploads[upload_id] = {}
+            return self._xml(
+                '<InitiateMultipartUploadResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                f'<Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key><UploadId>{upload_id}</UploadId>'
+                '</InitiateMultipartUploadResult>'
+            )
+        if self.command == 'POST' and 'uploadId' in query:
+            stub.count('CompleteMultipartUpload')
+            numbers = [int(number) for number in re.findall(r'<PartNumber>(\d+)</PartNumber>', body.decode('utf-8'))]
+            with stub._lock:
+                parts = stub.uploads.pop(query['uploadId'], None)
+                if parts is None:
+                    raise StubError(404, 'NoSuchUpload', 'The specified upload does not exist.')
+                stub.objects.setdefault(bucket, {})[key] = b''.join(parts[number] for number in numbers)
+            return self._xml(
+                '<CompleteMultipartUploadResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                f'<Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key><ETag>"stub-{len(numbers)}"</ETag>'
+                '</CompleteMultipartUploadResult>'
+            )
+        if self.command == 'DELETE' and 'uploadId' in query:
+            stub.count('AbortMultipartUpload')
+            with stub._lock:
+                stub.uploads.pop(query['uploadId'], None)
+            return self._send(204)
+        return self._send(501)
+    
+    def _service_quotas(self):
+        operation = self.headers.get('X-Amz-Target', '').rsplit('.', 1)[-1]
+        if operation != 'ListServiceQuotas':
+            raise StubError(400, 'UnknownOperationException', operation)
+        self.stub.count(operation)
+        # 스텁 모델 수가 많지 않으므로 페이지를 나누지 않음
+        self._send(200, json.dumps({'Quotas': self.stub.service_quotas()}).encode('utf-8'),
+                   content_type='application/x-amz-json-1.1')
+    
+    def _control(self, path, query, body):
+        if path == '/foundation-models':
+            self.stub.count('ListFoundationModels')
+            return self._json({'modelSummaries': self.stub.models})
+        if path.startswith('/foundation-model-availability/'):
+            self.stub.count('GetFoundationModelAvailability')
+            return self._json({
+                'modelId': path.rsplit('/', 1)[-1],
+                'agreementAvailability': {'status': 'AVAILABLE'},
+                'authorizationStatus': 'AUTHORIZED',
+                'entitlementAvailability': 'AVAILABLE',
+                'regionAvailability': 'AVAILABLE',
+            })
+        if path == '/inference-profiles':
+            self.stub.count('ListInferenceProfiles')
+            return self._json({'inferenceProfileSummaries': []})
+        if path == '/model-invocation-job' and self.command == 'POST':
+            self.stub.count('CreateModelInvocationJob')
+            return self._json({'jobArn': self.stub.start_batch_job(json.loads(body))})
+        if path == '/model-invocation-jobs':
+            self.stub.count('ListModelInvocationJobs')
+            since = query.get('submitTimeAfter')
+            since = datetime.fromisoformat(since.replace('Z', '+00:00')).timestamp() if since else 0
+            with self.stub._lock:
+                jobs = [job for job in self.stub.batch_jobs.values() if job['submitTime'] >= since]
+            return self._json({'invocationJobSummaries': [self.stub.batch_summary(job) for job in jobs]})
+        if path.startswith('/model-invocation-job/'):
+            self.stub.count('GetModelInvocationJob')
+            job = self.stub.batch_jobs.get(path[len('/model-invocation-job/'):])
+            if job is None:
+                raise StubError(404, 'ResourceNotFoundException', 'Model invocation job not found')
+            return self._json(self.stub.batch_summary(job))
+        raise StubError(404, 'UnknownOperationException', path)
+    
+    def _runtime(self, path, query, body):
+        stub = self.stub
+        if path == '/async-invoke' and self.command == 'POST':
+            stub.count('StartAsyncInvoke')
+            request = json.loads(body)
+            return self._json({'invocationArn': stub.start_job(request['modelId'], request)})
+        if path == '/async-invoke':
+            stub.count('ListAsyncInvokes')
+            since = query.get('submitTimeAfter')
+            since = datetime.fromisoformat(since.replace('Z', '+00:00')).timestamp() if since else 0
+            with stub._lock:
+                jobs = [job for job in stub.jobs.values() if job['submitTime'] >= since]
+            return self._json({'asyncInvokeSummaries': [stub.job_summary(job) for job in jobs]})
+        if path.startswith('/async-invoke/'):
+            stub.count('GetAsyncInvoke')
+            job = stub.jobs.get(path[len('/async-invoke/'):])
+            if job is None:
+                raise StubError(404, 'ResourceNotFoundException', 'Async invocation not found')
+            return self._json(stub.job_summary(job))
+        
+        model_id, operation = path[len('/model/'):].rsplit('/', 1)
+        stub.count(RUNTIME_OPERATIONS[operation])
+        converse = operation.startswith('converse')
+        delay = stub.check_invoke(model_id, body, converse)
+        time.sleep(delay)
+        if operation == 'converse':
+            return self._json({
+                'output': {'message': {'role': 'assistant', 'content': [{'text': 'Hi'}]}},
+                'stopReason': 'max_tokens',
+                'usage': {'inputTokens': 8, 'outputTokens': 4, 'totalTokens': 12},
+                'metrics': {'latencyMs': round(delay * 1000)},
+            })
+        if operation == 'invoke':
+            return self._json({'stub': True, 'modelId': model_id}, headers={
+                'x-amzn-bedrock-input-token-count': '8',
+                'x-amzn-bedrock-output-token-count': '4',
+            })
+        
+        chunks = stub.behavior_for(model_id)['stream_chunks']
+        if converse:
+            start = _event_message('messageStart', b'{"role": "assistant"}')
+            delta = _event_message('contentBlockDelta', b'{"contentBlockIndex": 0, "delta": {"text": "Hi"}}')
+            messages = [start] + [delta] * chunks
+        else:
+            payload = json.dumps({'bytes': base64.b64encode(b'{"stub": true}').decode('ascii')}).encode('utf-8')
+            messages = [_event_message('chunk', payload)] * chunks
+        self._stream(messages, delay)
+    
+    def _stream(self, messages, delay):
+        """이벤트 메시지를 조금씩 나눠 보내 생성 중인 스트림을 흉내 냅니다."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/vnd.amazon.eventstream')
+        self.send_header('Content-Length', str(sum(len(message) for message in messages)))
+        self.end_headers()
+        try:
+            for index, message in enumerate(messages):
+                if index:
+                    time.sleep(delay / 4)
+                self.wfile.write(message)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 첫 청크만 받고 연결을 닫음
+            self.close_connection = True
+
+
+def start_server(stub, host='127.0.0.1', port=0):
+    """스텁 서버를 백그라운드 스레드에서 시작하고 (서버, 엔드포인트 URL)을 반환합니다.
+    
+    port가 0이면 빈 포트를 사용합니다. 종료할 때는 server.shutdown()을 호출합니다.
+    """
+    handler = type('BoundStubHandler', (StubHandler,), {'stub': stub})
+    server = StubServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name='bedrock-stub', daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def load_config(path):
+    """스텁 설정 파일(JSON)을 읽습니다.
+    
+    {"behavior": {"latency_ms": 80, "throttle_rate": 0.05},
+     "overrides": {"anthropic.": {"latency_ms": 300}},
+     "models": 500}
+    models는 시뮬레이션 모델 수 또는 list_foundation_models 형식의 모델 요약 목록입니다.
+    """
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 Bedrock 스텁 서버")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--models', type=int, default=50, help="시뮬레이션 모델 수")
+    parser.add_argument('--config', help="동작 설정 파일 (JSON)")
+    parser.add_argument('--seed', type=int, help="오류/스로틀링 난수 시드")
+    args = parser.parse_args()
+    
+    config = load_config(args.config) if args.config else {}
+    models = config.get('models', args.models)
+    if isinstance(models, int):
+        models = simulated_models(models)
+    stub = BedrockStub(models, config.get('behavior'), config.get('overrides'), seed=args.seed)
+    server, endpoint_url = start_server(stub, args.host, args.port)
+    print(f"스텁 서버 실행 중: {endpoint_url} (모델 {len(models)}개)")
+    print(f"python bedrock_token_sender.py --endpoint-url {endpoint_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
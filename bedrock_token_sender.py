@@ -1,562 +1,3341 @@
+import time
+
+# 모듈 로드 시작 시각 (짧은 실행에서는 boto3/botocore 로드 시간이 대부분을 차지함)
+_MODULE_STARTED = time.perf_counter()
+
+import argparse
+import asyncio
 import boto3
+import csv
+import functools
+import hashlib
 import json
-import time
-from botocore.exceptions import ClientError
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta, timezone
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError, NoCredentialsError
 
-class BedrockTokenSender:
-    def __init__(self, access_key, secret_key, region):
-        self.region = region
-        self.bedrock = boto3.client(
-            'bedrock-runtime',
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-            region_name=region
-        )
-        self.bedrock_client = boto3.client(
-            'bedrock',
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-            region_name=region
-        )
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-            region_name=region
-        )
-        self.sts_client = boto3.client(
-            'sts',
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-            region_name=region
-        )
-        self.s3_bucket = None
+import bedrock_sonic
+
+# 모듈 로드에 걸린 시간 (ms)
+IMPORT_MS = round((time.perf_counter() - _MODULE_STARTED) * 1000, 1)
+
+# 모델 패밀리(프로바이더)별 기본 동시 실행 제한
+# 비동기 모델은 S3 출력 부담이 커서 낮게 유지합니다.
+DEFAULT_FAMILY_LIMITS = {
+    'twelvelabs': 2,
+}
+
+# 비동기 작업 상태 확인 간격(초): 변화가 없으면 최대 간격까지 지수적으로 증가
+ASYNC_POLL_INITIAL_INTERVAL = 2
+ASYNC_POLL_MAX_INTERVAL = 30
+ASYNC_POLL_BACKOFF = 1.5
+# 비동기 작업 최대 대기 시간(초)
+ASYNC_JOB_TIMEOUT = 600
+
+# bedrock-runtime 클라이언트 전송 설정 기본값
+# 기본 botocore 설정(연결 10개, legacy 재시도)은 동시 실행 시 병목이 됩니다.
+TRANSPORT_DEFAULTS = {
+    'max_pool_connections': 50,
+    'retry_mode': 'adaptive',
+    'max_attempts': 5,
+    'connect_timeout': 5,
+    'read_timeout': 120,
+    'tcp_keepalive': True,
+}
+
+# 실패가 아닌 할당량 초과로 따로 집계하는 오류 코드
+THROTTLING_ERROR_CODES = frozenset([
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'ServiceQuotaExceededException',
+])
+
+# 자격 증명 만료 등 다른 자격 증명으로 다시 실행하면 성공할 수 있는 오류 코드
+CREDENTIAL_ERROR_CODES = frozenset([
+    'ExpiredToken',
+    'ExpiredTokenException',
+    'RequestExpired',
+    'UnrecognizedClientException',
+    'InvalidClientTokenId',
+    'InvalidSignatureException',
+])
+
+# 스로틀링 시 같은 형식으로 다시 시도할 횟수와 첫 대기 시간(초, 시도마다 두 배)
+THROTTLE_RETRIES = 3
+THROTTLE_BACKOFF = 1.0
+# 스로틀링 후 모델별 호출 속도를 줄이는 비율과 최저 속도 (할당량 대비)
+THROTTLE_RATE_FACTOR = 0.5
+THROTTLE_MIN_RATE_FACTOR = 0.1
+# 토큰 버킷이 한 번에 허용하는 호출량 (초 단위 할당량의 배수)
+RATE_BURST_SECONDS = 5
+# 사용량을 아직 모르는 모델의 호출당 예상 토큰 수 (TPM 할당량 계산용)
+DEFAULT_TOKEN_ESTIMATE = 32
+
+# Service Quotas 이름에서 모델별 RPM/TPM 할당량을 찾는 패턴
+# 예: "On-demand model inference requests per minute for Anthropic Claude 3 Haiku"
+SERVICE_QUOTA_PATTERN = re.compile(
+    r'^(?P<scope>on-demand|cross-region)\b.*?\b(?P<unit>requests|tokens) per minute for (?P<model>.+)$',
+    re.IGNORECASE
+)
+
+# 비동기 작업 출력 경로 (버킷 안 접두사)와 setup_s3_bucket이 만든 버킷의 출력 보관 기간(일)
+OUTPUT_PREFIX = 'bedrock-output/'
+OUTPUT_RETENTION_DAYS = 7
+# 출력 확인 시 객체마다 ranged GET으로 읽는 앞부분 크기, DeleteObjects 요청당 최대 키 수
+OUTPUT_PROBE_BYTES = 1024
+DELETE_BATCH_SIZE = 1000
+
+# 배치 추론 (create_model_invocation_job) 입력/출력을 둘 S3 경로
+BATCH_PREFIX = 'bedrock-batch/'
+# 멀티파트 업로드 파트 크기 (S3는 마지막 파트를 제외하고 5MiB 이상 필요)
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+# 배치 입력 파일 하나의 최대 레코드 수 (Bedrock 제한 50,000)와 작업당 최소 레코드 수
+BATCH_MAX_RECORDS_PER_FILE = 50000
+BATCH_MIN_RECORDS = 100
+# 배치 작업 제한 시간(시간)과 상태 확인 간격(초)
+BATCH_JOB_TIMEOUT_HOURS = 24
+BATCH_POLL_INITIAL_INTERVAL = 30
+BATCH_POLL_MAX_INTERVAL = 300
+# 대기열에서 기다리는 시간까지 고려해 작업 제한 시간의 두 배까지 추적
+BATCH_JOB_TIMEOUT = 2 * BATCH_JOB_TIMEOUT_HOURS * 3600
+# 배치 요청의 출력 토큰 상한 키 (--batch-max-tokens)
+BATCH_TOKEN_KEYS = ('max_tokens', 'max_gen_len', 'max_new_tokens', 'maxTokenCount')
+
+# 로컬 캐시 디렉터리와 성공한 요청 형식 캐시 유효 기간(초)
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'bedrock-token-sender')
+FORMAT_CACHE_TTL = 7 * 24 * 3600
+
+# 모델 카탈로그 캐시 유효 기간(초). 지나면 list_foundation_models로 변경 사항을 확인합니다.
+MODEL_CATALOG_TTL = 24 * 3600
+
+# 토큰 전송 대상 조건: 프로비저닝 없이 호출 가능한 추론 유형, 호출 가능한 수명 주기 상태
+CALLABLE_INFERENCE_TYPES = frozenset(['ON_DEMAND', 'INFERENCE_PROFILE'])
+CALLABLE_LIFECYCLES = frozenset(['ACTIVE', 'LEGACY'])
+
+# get_foundation_model_availability 동시 호출 수
+AVAILABILITY_WORKERS = 8
+
+# Cross-region inference profile 접두사
+GEO_PREFIXES = ('us.', 'eu.', 'apac.', 'us-gov.', 'global.')
+
+# Inference profile 목록 캐시 유효 기간(초)
+PROFILE_CACHE_TTL = 24 * 3600
+
+# 리전 접두사별 inference profile 권역
+REGION_GEOGRAPHIES = (
+    ('us-gov-', 'us-gov'),
+    ('us-', 'us'),
+    ('ca-', 'us'),
+    ('eu-', 'eu'),
+    ('ap-', 'apac'),
+)
+
+# list_inference_profiles를 쓸 수 없을 때 사용하는 기본 cross-region 모델 목록
+STATIC_PROFILE_REGIONS = {'ap-northeast-2': 'apac', 'us-east-1': 'us'}
+STATIC_PROFILE_MODELS = frozenset([
+    'amazon.nova-pro-v1:0',
+    'amazon.nova-lite-v1:0',
+    'amazon.nova-micro-v1:0',
+    'anthropic.claude-3-sonnet-20240229-v1:0',
+    'anthropic.claude-3-5-sonnet-20241022-v2:0',
+    'anthropic.claude-3-7-sonnet-20250219-v1:0',
+    'anthropic.claude-sonnet-4-20250514-v1:0',
+    'meta.llama3-1-8b-instruct-v1:0',
+    'meta.llama3-1-70b-instruct-v1:0',
+    'meta.llama3-2-11b-instruct-v1:0',
+    'meta.llama3-2-90b-instruct-v1:0',
+    'meta.llama3-2-1b-instruct-v1:0',
+    'meta.llama3-2-3b-instruct-v1:0',
+    'meta.llama3-3-70b-instruct-v1:0',
+    'meta.llama4-scout-17b-instruct-v1:0',
+    'meta.llama4-maverick-17b-instruct-v1:0',
+    'deepseek.r1-v1:0',
+    'amazon.nova-premier-v1:0',
+    'amazon.titan-image-generator-v1:0',
+    'amazon.titan-embed-image-v1:0',
+    'stability.stable-diffusion-xl-v1:0',
+    'mistral.pixtral-large-2502-v1:0',
+    'cohere.embed-english-v3:0:512',
+    'cohere.embed-multilingual-v3:0:512',
+    'amazon.nova-canvas-v1:0',
+    'amazon.nova-reel-v1:0',
+    'amazon.nova-reel-v1:1',
+    'amazon.nova-sonic-v1:0',
+    'anthropic.claude-3-opus-20240229-v1:0',
+    'anthropic.claude-opus-4-20250514-v1:0',
+])
+STATIC_PROFILE_EXTRA_MODELS = {
+    'us': frozenset(['anthropic.claude-3-5-haiku-20241022-v1:0']),
+}
+
+
+def base_model_id(model_id):
+    """Cross-region inference profile ID에서 권역 접두사를 뗀 기본 모델 ID를 반환합니다."""
+    for prefix in GEO_PREFIXES:
+        if model_id.startswith(prefix):
+            return model_id[len(prefix):]
+    return model_id
+
+
+def model_family(model_id):
+    """모델 ID에서 패밀리(프로바이더 이름)를 추출합니다."""
+    return base_model_id(model_id).split('.', 1)[0]
+
+
+def runtime_config(**overrides):
+    """bedrock-runtime 클라이언트용 botocore 설정을 만듭니다.
     
-    def setup_s3_bucket(self):
-        """계정 ID 기반으로 S3 버킷을 생성합니다."""
+    TRANSPORT_DEFAULTS의 키(max_pool_connections, retry_mode, max_attempts,
+    connect_timeout, read_timeout, tcp_keepalive)를 덮어쓸 수 있습니다.
+    adaptive 재시도 모드는 스로틀링 응답에 맞춰 클라이언트 측 요청 속도를 조절합니다.
+    """
+    options = dict(TRANSPORT_DEFAULTS)
+    options.update((key, value) for key, value in overrides.items() if value is not None)
+    return Config(
+        max_pool_connections=options['max_pool_connections'],
+        retries={'mode': options['retry_mode'], 'max_attempts': options['max_attempts']},
+        connect_timeout=options['connect_timeout'],
+        read_timeout=options['read_timeout'],
+        tcp_keepalive=options['tcp_keepalive']
+    )
+
+
+# 세션의 클라이언트 생성은 스레드 안전하지 않으므로 모든 LazyClient가 이 잠금 안에서 생성
+_CLIENT_LOCK = threading.Lock()
+
+
+class LazyClient:
+    """처음 사용할 때 boto3 클라이언트를 만드는 대리 객체입니다.
+    
+    클라이언트마다 서비스 모델 JSON을 읽어 생성 비용이 크므로, 실제로 호출하는 서비스의
+    클라이언트만 만듭니다. 생성 후에는 모든 속성 접근을 클라이언트에 그대로 넘깁니다.
+    """
+    
+    def __init__(self, session, service_name, **options):
+        self.session = session
+        self.service_name = service_name
+        self.options = options
+        # 클라이언트 생성에 걸린 시간 (ms), 생성하지 않았으면 None
+        self.created_ms = None
+        self._client = None
+    
+    def _get(self):
+        if self._client is None:
+            with _CLIENT_LOCK:
+                if self._client is None:
+                    started = time.perf_counter()
+                    self._client = self.session.client(self.service_name, **self.options)
+                    self.created_ms = round((time.perf_counter() - started) * 1000, 1)
+        return self._client
+    
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+
+def format_size(num_bytes):
+    """바이트 수를 KB/MB 단위 문자열로 바꿉니다."""
+    if num_bytes < 1024 * 1024:
+        return f"{num_bytes / 1024:.1f}KB"
+    return f"{num_bytes / 1024 / 1024:.1f}MB"
+
+
+def is_throttling_error(error):
+    """할당량 초과(스로틀링) 오류인지 확인합니다."""
+    return isinstance(error, ClientError) and error.response['Error']['Code'] in THROTTLING_ERROR_CODES
+
+
+def is_transient_error(error):
+    """모델과 관계없이 다시 실행하면 성공할 수 있는 오류(연결/응답 시간 초과 등 BotoCoreError, 자격 증명 만료)인지 확인합니다."""
+    if isinstance(error, BotoCoreError):
+        return True
+    return isinstance(error, ClientError) and error.response['Error']['Code'] in CREDENTIAL_ERROR_CODES
+
+
+def error_code(error):
+    """ClientError는 오류 코드, 그 밖의 예외(ReadTimeoutError 등 BotoCoreError)는 예외 이름을 반환합니다."""
+    if isinstance(error, ClientError):
+        return error.response['Error']['Code']
+    return type(error).__name__
+
+
+def retry_attempts(response):
+    """응답(또는 ClientError.response)에서 botocore가 재시도한 횟수를 읽습니다."""
+    return response.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+
+
+# 자주 쓰는 요청 본문
+_CHAT_MESSAGES = {
+    "messages": [{"role": "user", "content": "Hello"}],
+    "max_tokens": 10
+}
+_PROMPT = {
+    "prompt": "Hello",
+    "max_tokens": 10
+}
+_LLAMA3_PROMPT = {
+    "prompt": "<|begin_of_text|><|start_header_id|>user<|end_header_id|>\n\nHello<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n",
+    "max_gen_len": 10
+}
+_TEXT_IMAGE = {
+    "taskType": "TEXT_IMAGE",
+    "textToImageParams": {
+        "text": "Hello world"
+    },
+    "imageGenerationConfig": {
+        "numberOfImages": 1,
+        "height": 512,
+        "width": 512
+    }
+}
+
+# 모델 패밀리별 요청 형식 레지스트리
+# pattern: 모델 ID(대소문자 무시)에서 찾을 정규식. 위에서부터 처음 일치하는 패밀리를 사용합니다.
+# modality: 출력 모달리티 (PROBE_PROFILES에서 최소 비용 설정을 고르는 기준)
+# mode: sync(invoke_model), async(start_async_invoke), stream(양방향 스트리밍 API 필요)
+# usage: 응답 본문에서 토큰 사용량을 읽는 방식 (USAGE_EXTRACTORS 키, 없으면 응답 헤더만 사용)
+# streaming: invoke_model_with_response_stream 지원 여부 (--stream 사용 시 스트리밍 호출)
+# formats: 시도할 요청 본문 순서 (첫 번째가 기본 형식, 나머지는 실패 시 대체 형식)
+PAYLOAD_FORMATS = [
+    {'family': 'claude', 'pattern': r'claude', 'modality': 'text', 'mode': 'sync', 'usage': 'anthropic', 'streaming': True, 'formats': [
+        {
+            "messages": [{"role": "user", "content": "Hello"}],
+            "max_tokens": 10,
+            "anthropic_version": "bedrock-2023-05-31"
+        },
+    ]},
+    {'family': 'nova-canvas', 'pattern': r'nova.*canvas', 'modality': 'image', 'mode': 'sync', 'formats': [
+        _TEXT_IMAGE,
+    ]},
+    {'family': 'nova-reel', 'pattern': r'nova.*reel', 'modality': 'video', 'mode': 'async', 'formats': [
+        {
+            "taskType": "TEXT_VIDEO",
+            "textToVideoParams": {
+                "text": "Hello world"
+            },
+            "videoGenerationConfig": {
+                "durationSeconds": 6,
+                "fps": 24,
+                "dimension": "1280x720"
+            }
+        },
+    ]},
+    {'family': 'nova-sonic', 'pattern': r'nova.*sonic', 'modality': 'speech', 'mode': 'stream', 'formats': []},
+    {'family': 'nova', 'pattern': r'nova', 'modality': 'text', 'mode': 'sync', 'usage': 'nova', 'streaming': True, 'formats': [
+        {
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {"text": "Hello"}
+                    ]
+                }
+            ],
+            "inferenceConfig": {
+                "max_new_tokens": 10
+            }
+        },
+        _CHAT_MESSAGES,
+    ]},
+    {'family': 'titan-embed', 'pattern': r'titan-embed', 'modality': 'embedding', 'mode': 'sync', 'usage': 'titan-embed', 'formats': [
+        {"inputText": "Hello world"},
+    ]},
+    {'family': 'marengo-embed', 'pattern': r'marengo-embed', 'modality': 'embedding', 'mode': 'async', 'formats': [
+        {
+            "inputType": "text",
+            "inputText": "Hello world"
+        },
+    ]},
+    {'family': 'titan-image', 'pattern': r'titan.*image-generator', 'modality': 'image', 'mode': 'sync', 'formats': [
+        _TEXT_IMAGE,
+    ]},
+    {'family': 'titan', 'pattern': r'titan', 'modality': 'text', 'mode': 'sync', 'usage': 'titan', 'streaming': True, 'formats': [
+        {
+            "inputText": "Hello",
+            "textGenerationConfig": {"maxTokenCount": 10}
+        },
+    ]},
+    {'family': 'llama-chat', 'pattern': r'llama(?:3-[123]|4)', 'modality': 'text', 'mode': 'sync', 'usage': 'llama', 'streaming': True, 'formats': [
+        {
+            "prompt": "Hello",
+            "max_gen_len": 10,
+            "temperature": 0.1
+        },
+        {
+            "messages": [{"role": "user", "content": "Hello"}],
+            "max_tokens": 10,
+            "temperature": 0.1
+        },
+        _LLAMA3_PROMPT,
+    ]},
+    {'family': 'llama', 'pattern': r'llama', 'modality': 'text', 'mode': 'sync', 'usage': 'llama', 'streaming': True, 'formats': [
+        {
+            "prompt": "Hello",
+            "max_gen_len": 10,
+            "temperature": 0.1
+        },
+        _LLAMA3_PROMPT,
+        _CHAT_MESSAGES,
+    ]},
+    {'family': 'jamba', 'pattern': r'jamba', 'modality': 'text', 'mode': 'sync', 'usage': 'openai', 'streaming': True, 'formats': [
+        _CHAT_MESSAGES,
+        _PROMPT,
+    ]},
+    {'family': 'cohere-embed', 'pattern': r'cohere.*embed', 'modality': 'embedding', 'mode': 'sync', 'usage': 'cohere-embed', 'formats': [
+        {
+            "texts": ["Hello world"],
+            "input_type": "search_document"
+        },
+        {
+            "texts": ["Hello world"],
+            "input_type": "classification"
+        },
+        {
+            "texts": ["Hello world"]
+        },
+    ]},
+    {'family': 'cohere-command-r', 'pattern': r'cohere.*command-r', 'modality': 'text', 'mode': 'sync', 'usage': 'cohere', 'streaming': True, 'formats': [
+        {
+            "message": "Hello",
+            "max_tokens": 10
+        },
+        _PROMPT,
+    ]},
+    {'family': 'cohere', 'pattern': r'cohere', 'modality': 'text', 'mode': 'sync', 'formats': [
+        _PROMPT,
+    ]},
+    {'family': 'stable-diffusion', 'pattern': r'stable-diffusion', 'modality': 'image', 'mode': 'sync', 'formats': [
+        {
+            "text_prompts": [{"text": "Hello world"}],
+            "cfg_scale": 10,
+            "seed": 0,
+            "steps": 50
+        },
+    ]},
+    {'family': 'deepseek', 'pattern': r'deepseek', 'modality': 'text', 'mode': 'sync', 'usage': 'openai', 'streaming': True, 'formats': [
+        {
+            "messages": [{"role": "user", "content": "Hello"}],
+            "max_tokens": 10,
+            "temperature": 0.1
+        },
+        {
+            "prompt": "Hello",
+            "max_tokens": 10,
+            "temperature": 0.1
+        },
+    ]},
+    {'family': 'pixtral', 'pattern': r'pixtral', 'modality': 'text', 'mode': 'sync', 'usage': 'openai', 'streaming': True, 'formats': [
+        _CHAT_MESSAGES,
+    ]},
+    {'family': 'default', 'pattern': r'', 'modality': 'text', 'mode': 'sync', 'formats': [
+        _PROMPT,
+    ]},
+]
+
+
+# 호출 확인용 요청 설정. 모달리티별로 본문에 이미 있는 키의 값만 바꿉니다.
+# 패밀리 이름 항목이 있으면 그 패밀리는 모달리티 항목 대신 패밀리 항목을 사용합니다.
+# cheapest: 모델이 동작하는지만 확인하는 가장 싼 요청
+#   텍스트는 출력 토큰 1개, 이미지는 허용 최소 크기(320×320)와 최소 단계(10),
+#   임베딩은 가장 짧은 입력. Nova Reel은 6초 1280×720 24fps만 허용되어 그대로 유지.
+#   Titan Image Generator는 정해진 해상도만 허용되어 가장 작은 정사각형(512×512) 사용
+PROBE_PROFILES = {
+    'standard': {},
+    'cheapest': {
+        'text': {
+            'max_tokens': 1,
+            'max_gen_len': 1,
+            'max_new_tokens': 1,
+            'maxTokenCount': 1,
+            'maxTokens': 1,
+        },
+        'image': {
+            'text': "Hi",
+            'height': 320,
+            'width': 320,
+            'numberOfImages': 1,
+            'steps': 10,
+        },
+        'titan-image': {
+            'text': "Hi",
+            'height': 512,
+            'width': 512,
+            'numberOfImages': 1,
+        },
+        'video': {
+            'text': "Hi",
+            'durationSeconds': 6,
+            'fps': 24,
+            'dimension': "1280x720",
+        },
+        'embedding': {
+            'inputText': "Hi",
+            'texts': ["Hi"],
+        },
+    },
+}
+
+
+def probe_body(body, overrides):
+    """본문에 이미 있는 키 중 overrides에 있는 키의 값을 바꾼 사본을 반환합니다 (중첩 포함)."""
+    if isinstance(body, dict):
+        return {
+            key: overrides[key] if key in overrides else probe_body(value, overrides)
+            for key, value in body.items()
+        }
+    if isinstance(body, list):
+        return [probe_body(value, overrides) for value in body]
+    return body
+
+
+# 요청 형식에서 프롬프트 자리에 쓰인 확인용 문구
+PROBE_TEXTS = frozenset(["Hello", "Hello world", "Hi"])
+
+
+def prompt_body(body, prompt):
+    """본문의 확인용 문구를 prompt로 바꾼 사본을 반환합니다 (Llama 3 템플릿 안의 문구 포함)."""
+    if isinstance(body, dict):
+        return {key: prompt_body(value, prompt) for key, value in body.items()}
+    if isinstance(body, list):
+        return [prompt_body(value, prompt) for value in body]
+    if isinstance(body, str):
+        if body in PROBE_TEXTS:
+            return prompt
+        if '<|eot_id|>' in body:
+            return body.replace("Hello", prompt)
+    return body
+
+
+def read_prompts(path):
+    """프롬프트 파일(JSON Lines)을 한 줄씩 읽어 (레코드 ID, 항목)을 돌려줍니다.
+    
+    한 줄은 문자열 또는 {"recordId": "...", "prompt": "..."} / {"modelInput": {...}} 객체입니다.
+    modelInput이 있으면 모든 모델에 그 본문을 그대로 보냅니다. 레코드 ID가 없으면 줄 번호로 만듭니다.
+    """
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {'prompt': item}
+            yield item.get('recordId') or f"REC{number:08d}", item
+
+
+class PayloadRegistry:
+    """요청 형식 표를 한 번 컴파일해 모델 ID별 호출 방식과 직렬화된 본문을 제공합니다.
+    
+    모든 패턴은 우선순위를 유지하는 하나의 정규식으로 합쳐지고, 본문은 생성 시 한 번만
+    JSON 직렬화됩니다. 모델 ID별 조회 결과는 캐시되어 반복 호출 시 사전 조회 한 번으로 끝납니다.
+    probe를 넘기면 패밀리별 또는 모달리티별 값 덮어쓰기(PROBE_PROFILES 항목)를 적용한 본문을 사용합니다.
+    """
+    
+    def __init__(self, entries, probe=None):
+        self._entries = {}
+        probe = probe or {}
+        alternatives = []
+        for entry in entries:
+            family = entry['family']
+            group = '_' + re.sub(r'\W', '_', family)
+            overrides = probe.get(family, probe.get(entry['modality']))
+            formats = [probe_body(fmt, overrides) for fmt in entry['formats']] if overrides else entry['formats']
+            self._entries[group] = {
+                'family': family,
+                'modality': entry['modality'],
+                'mode': entry['mode'],
+                'usage': entry.get('usage'),
+                'streaming': entry.get('streaming', False),
+                'formats': formats,
+                'bodies': tuple(
+                    json.dumps(fmt).encode('utf-8') for fmt in formats
+                ),
+            }
+            # 전방 탐색으로 ID 어디에 있든 일치시키고, 대안 순서로 우선순위를 보장
+            alternatives.append(f"(?P<{group}>(?=.*(?:{entry['pattern']})))")
+        self._pattern = re.compile('|'.join(alternatives), re.IGNORECASE)
+        self._cache = {}
+    
+    def lookup(self, model_id):
+        """모델 ID에 해당하는 레지스트리 항목(family, modality, mode, usage, streaming, formats, bodies)을 반환합니다."""
+        entry = self._cache.get(model_id)
+        if entry is None:
+            match = self._pattern.match(model_id)
+            entry = self._entries[match.lastgroup]
+            self._cache[model_id] = entry
+        return entry
+
+
+# 호출 설정별 레지스트리 (본문은 프로세스당 한 번만 직렬화)
+PAYLOAD_REGISTRIES = {
+    name: PayloadRegistry(PAYLOAD_FORMATS, overrides)
+    for name, overrides in PROBE_PROFILES.items()
+}
+PAYLOADS = PAYLOAD_REGISTRIES['standard']
+
+# Converse 모드에서 모든 텍스트 모델이 공유하는 요청 (모델 ID만 다름)
+CONVERSE_REQUEST = {
+    "messages": [{"role": "user", "content": [{"text": "Hello"}]}],
+    "inferenceConfig": {"maxTokens": 10},
+}
+CONVERSE_REQUESTS = {
+    name: probe_body(CONVERSE_REQUEST, overrides['text']) if 'text' in overrides else CONVERSE_REQUEST
+    for name, overrides in PROBE_PROFILES.items()
+}
+
+
+def converse_usage(response):
+    """Converse 응답의 usage에서 (입력 토큰, 출력 토큰)을 읽습니다. 없으면 None."""
+    usage = response.get('usage')
+    if not usage:
+        return None
+    return usage['inputTokens'], usage['outputTokens']
+
+
+# 토큰 사용량 응답 헤더 (모든 invoke_model 응답에 공통)
+USAGE_HEADERS = ('x-amzn-bedrock-input-token-count', 'x-amzn-bedrock-output-token-count')
+# 헤더가 없을 때 사용량을 찾기 위해 읽을 응답 본문 최대 크기 (바이트)
+USAGE_READ_LIMIT = 64 * 1024
+
+# 응답 본문에서 (입력 토큰, 출력 토큰)을 읽는 패밀리별 방식
+USAGE_EXTRACTORS = {
+    'anthropic': lambda data: (data['usage']['input_tokens'], data['usage']['output_tokens']),
+    'nova': lambda data: (data['usage']['inputTokens'], data['usage']['outputTokens']),
+    'llama': lambda data: (data['prompt_token_count'], data['generation_token_count']),
+    'openai': lambda data: (data['usage']['prompt_tokens'], data['usage']['completion_tokens']),
+    'cohere': lambda data: (
+        data['meta']['billed_units']['input_tokens'],
+        data['meta']['billed_units']['output_tokens']
+    ),
+    'cohere-embed': lambda data: (data['meta']['billed_units']['input_tokens'], 0),
+    'titan': lambda data: (
+        data['inputTextTokenCount'],
+        sum(result['tokenCount'] for result in data['results'])
+    ),
+    'titan-embed': lambda data: (data['inputTextTokenCount'], 0),
+}
+
+
+def header_usage(response):
+    """응답 헤더에서 (입력 토큰, 출력 토큰)을 읽습니다. 헤더가 없으면 None."""
+    headers = response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+    counts = [headers.get(name) for name in USAGE_HEADERS]
+    if None in counts:
+        return None
+    try:
+        return int(counts[0]), int(counts[1])
+    except ValueError:
+        return None
+
+
+def body_usage(data, extractor):
+    """읽은 응답 본문에서 (입력 토큰, 출력 토큰)을 읽습니다. 읽을 수 없으면 None."""
+    if extractor is None or len(data) > USAGE_READ_LIMIT:
+        return None
+    try:
+        return USAGE_EXTRACTORS[extractor](json.loads(data))
+    except (ValueError, KeyError, TypeError, IndexError):
+        return None
+
+
+def read_usage(response, extractor):
+    """invoke_model 응답에서 토큰 사용량을 읽고 응답 본문을 닫습니다.
+    
+    헤더를 먼저 확인하고, 없을 때만 본문을 USAGE_READ_LIMIT까지 읽습니다. 임베딩 모델
+    (titan-embed, cohere-embed)도 헤더가 없으면 본문을 읽으며, USAGE_READ_LIMIT보다 큰 본문은
+    사용량 없이 닫습니다. 본문 방식(extractor)이 없는 이미지 모델 등은 본문을 읽지 않습니다.
+    """
+    body = response.get('body')
+    try:
+        usage = header_usage(response)
+        if usage is None and extractor is not None and body is not None:
+            usage = body_usage(body.read(USAGE_READ_LIMIT + 1), extractor)
+        return usage
+    finally:
+        if body is not None:
+            body.close()
+
+
+def load_prices(path):
+    """모델별 1,000 토큰당 가격 파일(JSON)을 읽습니다.
+    
+    {"anthropic.claude-3-haiku": {"input": 0.00025, "output": 0.00125}, ...}
+    키는 모델 ID 접두사이며 가장 긴 접두사가 적용됩니다.
+    """
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def estimate_cost(prices, model_id, input_tokens, output_tokens):
+    """가격표로 예상 비용(USD)을 계산합니다. 가격 정보가 없으면 None."""
+    if not prices:
+        return None
+    matches = [key for key in prices if model_id.startswith(key)]
+    if not matches:
+        return None
+    price = prices[max(matches, key=len)]
+    return (input_tokens * price.get('input', 0) + output_tokens * price.get('output', 0)) / 1000
+
+
+# 호출 기록 필드 (CSV 열 순서)
+RECORD_FIELDS = (
+    'target', 'region', 'model_id', 'family', 'profile', 'mode', 'status',
+    'format_index', 'attempts', 'error_code', 'wall_ms', 'started_at',
+    'input_tokens', 'output_tokens', 'cost_usd', 'ttft_ms', 'output_bytes',
+)
+
+
+def percentile(values, q):
+    """정렬된 값 목록에서 nearest-rank 방식의 백분위 값을 반환합니다."""
+    if not values:
+        return None
+    rank = max(1, int(-(-q * len(values) // 100)))
+    return values[min(rank, len(values)) - 1]
+
+
+def prometheus_labels(labels):
+    """[(이름, 값), ...]을 Prometheus 레이블 문자열({name="value",...})로 바꿉니다."""
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+class ProbeMetrics:
+    """모델 호출마다 구조화된 기록을 모으고 지연 시간 통계를 계산합니다.
+    
+    기록은 JSON Lines/CSV로 저장하거나 Prometheus 텍스트 형식으로 내보낼 수 있습니다.
+    여러 대상(계정 × 리전)이 하나의 인스턴스를 공유할 수 있습니다.
+    """
+    
+    def __init__(self):
+        self._records = []
+        self._lock = threading.Lock()
+    
+    def add(self, record):
+        with self._lock:
+            self._records.append(record)
+    
+    def records(self):
+        with self._lock:
+            return list(self._records)
+    
+    def summary(self, key=('region', 'model_id')):
+        """key 필드별 호출 수, 상태별 개수, 시도 횟수, 토큰 수와 비용, p50/p95 지연 시간(ms)을 반환합니다."""
+        groups = {}
+        for record in self.records():
+            group = groups.setdefault(tuple(record.get(field) for field in key), {
+                'count': 0,
+                'attempts': 0,
+                'statuses': {},
+                'durations': [],
+                'input_tokens': 0,
+                'output_tokens': 0,
+                'cost_usd': 0.0,
+            })
+            group['count'] += 1
+            group['attempts'] += record.get('attempts') or 0
+            group['input_tokens'] += record.get('input_tokens') or 0
+            group['output_tokens'] += record.get('output_tokens') or 0
+            group['cost_usd'] += record.get('cost_usd') or 0
+            group['statuses'][record['status']] = group['statuses'].get(record['status'], 0) + 1
+            if record.get('wall_ms') is not None:
+                group['durations'].append(record['wall_ms'])
+        
+        for group in groups.values():
+            durations = sorted(group.pop('durations'))
+            group['sum_ms'] = sum(durations)
+            group['p50_ms'] = percentile(durations, 50)
+            group['p95_ms'] = percentile(durations, 95)
+        return groups
+    
+    def slowest(self, limit=5):
+        """p95 지연 시간이 가장 긴 (리전, 모델) 목록을 반환합니다."""
+        ranked = [
+            (group['p95_ms'], region, model_id, group)
+            for (region, model_id), group in self.summary().items()
+            if group['p95_ms'] is not None and group['attempts']
+        ]
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return ranked[:limit]
+    
+    def totals(self):
+        """전체 실행의 입력/출력 토큰 수와 예상 비용 합계를 반환합니다."""
+        totals = {'input_tokens': 0, 'output_tokens': 0, 'cost_usd': 0.0}
+        for record in self.records():
+            for key in totals:
+                totals[key] += record.get(key) or 0
+        return totals
+    
+    def write_jsonl(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in self.records():
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    
+    def write_csv(self, path):
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RECORD_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            for record in self.records():
+                writer.writerow(record)
+    
+    def prometheus(self):
+        """Prometheus 텍스트 노출 형식 문자열을 만듭니다."""
+        summary = self.summary(('target', 'region', 'model_id'))
+        lines = [
+            '# HELP bedrock_probe_duration_seconds Wall time of Bedrock model probes.',
+            '# TYPE bedrock_probe_duration_seconds summary',
+        ]
+        for (target, region, model_id), group in sorted(summary.items(), key=lambda item: [str(v) for v in item[0]]):
+            labels = [('target', target or ''), ('region', region), ('model', model_id)]
+            for quantile, value in (('0.5', group['p50_ms']), ('0.95', group['p95_ms'])):
+                if value is not None:
+                    lines.append(
+                        f"bedrock_probe_duration_seconds{prometheus_labels(labels + [('quantile', quantile)])} "
+                        f"{value / 1000:.6f}"
+                    )
+            lines.append(f"bedrock_probe_duration_seconds_sum{prometheus_labels(labels)} {group['sum_ms'] / 1000:.6f}")
+            lines.append(f"bedrock_probe_duration_seconds_count{prometheus_labels(labels)} {group['count']}")
+        
+        lines.append('# HELP bedrock_probe_total Bedrock model probes by outcome.')
+        lines.append('# TYPE bedrock_probe_total counter')
+        for (target, region, model_id), group in sorted(summary.items(), key=lambda item: [str(v) for v in item[0]]):
+            for status, count in sorted(group['statuses'].items()):
+                labels = [('target', target or ''), ('region', region), ('model', model_id), ('status', status)]
+                lines.append(f"bedrock_probe_total{prometheus_labels(labels)} {count}")
+        
+        lines.append('# HELP bedrock_probe_attempts_total invoke_model/start_async_invoke calls made by probes.')
+        lines.append('# TYPE bedrock_probe_attempts_total counter')
+        for (target, region, model_id), group in sorted(summary.items(), key=lambda item: [str(v) for v in item[0]]):
+            labels = [('target', target or ''), ('region', region), ('model', model_id)]
+            lines.append(f"bedrock_probe_attempts_total{prometheus_labels(labels)} {group['attempts']}")
+        
+        lines.append('# HELP bedrock_probe_tokens_total Tokens reported by Bedrock for probes.')
+        lines.append('# TYPE bedrock_probe_tokens_total counter')
+        for (target, region, model_id), group in sorted(summary.items(), key=lambda item: [str(v) for v in item[0]]):
+            for direction in ('input', 'output'):
+                labels = [('target', target or ''), ('region', region), ('model', model_id), ('direction', direction)]
+                lines.append(f"bedrock_probe_tokens_total{prometheus_labels(labels)} {group[direction + '_tokens']}")
+        
+        lines.append('# HELP bedrock_probe_cost_usd_total Estimated probe cost from the local price table.')
+        lines.append('# TYPE bedrock_probe_cost_usd_total counter')
+        for (target, region, model_id), group in sorted(summary.items(), key=lambda item: [str(v) for v in item[0]]):
+            labels = [('target', target or ''), ('region', region), ('model', model_id)]
+            lines.append(f"bedrock_probe_cost_usd_total{prometheus_labels(labels)} {group['cost_usd']:.8f}")
+        return '\n'.join(lines) + '\n'
+    
+    def write_prometheus(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+
+
+class FormatCache:
+    """(리전, 실제 모델 ID)별로 성공한 요청 형식 번호를 디스크에 저장합니다.
+    
+    다음 실행에서는 저장된 형식을 먼저 시도해 실패가 예정된 왕복 호출을 건너뜁니다.
+    패밀리가 바뀌었거나 유효 기간이 지난 항목은 무시하고, 저장된 형식이 검증 오류로
+    실패하면 항목을 지웁니다. 같은 파일은 shared()로 프로세스 안에서 인스턴스 하나를 공유하고,
+    저장할 때는 디스크의 항목을 다시 읽어 바뀐 항목만 합치므로 다른 프로세스의 기록도 남습니다.
+    """
+    
+    # 캐시 파일별 인스턴스 (같은 프로세스의 모든 대상이 공유)
+    _shared = {}
+    _shared_lock = threading.Lock()
+    # 읽고 합쳐 쓰는 저장 과정은 인스턴스와 관계없이 한 번에 하나만 실행
+    _save_lock = threading.Lock()
+    
+    @classmethod
+    def shared(cls, path, ttl=FORMAT_CACHE_TTL):
+        """path를 쓰는 공유 인스턴스를 반환합니다."""
+        with cls._shared_lock:
+            cache = cls._shared.get(path)
+            if cache is None:
+                cache = cls._shared[path] = cls(path, ttl)
+            return cache
+    
+    def __init__(self, path, ttl=FORMAT_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = None
+        # 마지막 저장 이후 바뀐 항목 (None은 삭제)
+        self._changes = {}
+    
+    def _read(self):
         try:
-            account_id = self.sts_client.get_caller_identity()['Account']
-            bucket_name = f"bedrock-output-{account_id}-{self.region}"
-            
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _load(self):
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+    
+    def get(self, region, model_id, payload):
+        """유효한 캐시 항목이 있으면 형식 번호를, 없으면 None을 반환합니다."""
+        with self._lock:
+            entry = self._load().get(f"{region}|{model_id}")
+        if (entry is None
+                or entry['family'] != payload['family']
+                or entry['index'] >= len(payload['bodies'])
+                or time.time() - entry['updated'] > self.ttl):
+            return None
+        return entry['index']
+    
+    def order(self, region, model_id, payload):
+        """시도할 형식 번호 순서를 반환합니다. 캐시된 형식이 있으면 맨 앞에 둡니다."""
+        order = list(range(len(payload['bodies'])))
+        cached = self.get(region, model_id, payload)
+        if cached:
+            order.remove(cached)
+            order.insert(0, cached)
+        return order
+    
+    def record(self, region, model_id, payload, index):
+        """성공한 형식 번호를 기록합니다."""
+        key = f"{region}|{model_id}"
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(key)
+            if (entry is not None and entry['family'] == payload['family']
+                    and entry['index'] == index
+                    and time.time() - entry['updated'] < self.ttl / 2):
+                return
+            entries[key] = self._changes[key] = {
+                'family': payload['family'],
+                'index': index,
+                'updated': time.time(),
+            }
+    
+    def invalidate(self, region, model_id):
+        """캐시 항목을 지웁니다."""
+        key = f"{region}|{model_id}"
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._changes[key] = None
+    
+    def save(self):
+        """바뀐 항목을 디스크의 최신 항목에 합쳐 임시 파일에 쓴 뒤 교체해 원자적으로 저장합니다."""
+        with self._save_lock, self._lock:
+            if not self._changes:
+                return
+            entries = self._read()
+            for key, entry in self._changes.items():
+                if entry is None:
+                    entries.pop(key, None)
+                else:
+                    entries[key] = entry
+            directory = os.path.dirname(self.path)
             try:
-                self.s3_client.head_bucket(Bucket=bucket_name)
-                print(f"S3 버킷 사용: {bucket_name}")
-            except ClientError:
-                create_config = {}
-                if self.region != 'us-east-1':
-                    create_config['CreateBucketConfiguration'] = {'LocationConstraint': self.region}
-                
-                self.s3_client.create_bucket(
-                    Bucket=bucket_name,
-                    **create_config
-                )
-                print(f"S3 버킷 생성: {bucket_name}")
-            
-            self.s3_bucket = bucket_name
-            return bucket_name
-        except ClientError as e:
-            print(f"S3 버킷 설정 실패: {e}")
+                os.makedirs(directory, exist_ok=True)
+                # 스레드와 프로세스마다 다른 임시 파일을 사용
+                fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + '.', suffix='.tmp',
+                                                 dir=directory)
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        json.dump(entries, f, ensure_ascii=False, indent=1, sort_keys=True)
+                    os.replace(temp_path, self.path)
+                except OSError:
+                    os.unlink(temp_path)
+                    raise
+            except OSError as e:
+                print(f"형식 캐시 저장 실패: {e}")
+                return
+            self._entries = entries
+            self._changes = {}
+
+
+class CheckpointJournal:
+    """스윕 진행 상황을 JSON Lines 파일에 추가 기록해 중단된 실행을 이어서 할 수 있게 합니다.
+    
+    모델 호출이 끝날 때마다 호출 기록을 한 줄씩 쓰고, 비동기 작업은 시작하자마자
+    invocationArn을 씁니다. 다시 실행하면 결과가 있는 모델은 호출하지 않고, 결과 없이
+    시작만 기록된 비동기 작업은 새로 시작하지 않고 같은 작업을 다시 추적합니다.
+    스로틀링이나 진행중(시간 초과) 결과, 네트워크 오류나 자격 증명 만료로 인한 실패는
+    완료로 보지 않아 다음 실행에서 다시 시도합니다.
+    """
+    
+    # 완료로 보지 않는 호출 상태
+    RETRY_STATUSES = frozenset(['throttled', 'pending'])
+    
+    def __init__(self, path):
+        self.path = path
+        self._results = {}
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self._truncated = False
+        self._load()
+    
+    @staticmethod
+    def _key(entry):
+        return (entry.get('target'), entry['region'], entry['model_id'])
+    
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError:
+            return
+        # 마지막 줄이 잘렸으면 다음 기록이 그 줄에 이어 붙지 않도록 줄을 바꿔야 함
+        self._truncated = bool(lines) and not lines[-1].endswith('\n')
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # 기록 도중 중단되어 잘린 줄
+                continue
+            key = self._key(entry)
+            if 'invocation_arn' in entry:
+                self._jobs[key] = entry
+            elif entry['status'] not in self.RETRY_STATUSES:
+                self._results[key] = entry
+                self._jobs.pop(key, None)
+    
+    def _append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+                if self._truncated:
+                    self._file.write('\n')
+            self._file.write(line)
+            # 프로세스가 죽어도 기록이 남도록 줄마다 내보냄
+            self._file.flush()
+    
+    def result(self, target, region, model_id):
+        """이전 실행에서 끝난 모델의 호출 기록을 반환합니다. 없으면 None."""
+        return self._results.get((target, region, model_id))
+    
+    def job(self, target, region, model_id):
+        """이전 실행에서 시작했지만 결과가 기록되지 않은 비동기 작업을 반환합니다. 없으면 None."""
+        key = (target, region, model_id)
+        if key in self._results:
             return None
+        return self._jobs.get(key)
     
-    def get_available_models(self):
-        """실제 호출 가능한 Bedrock 모델 ID를 가져옵니다."""
+    def record_result(self, record, final=True):
+        """끝난 모델 호출 기록을 추가합니다.
+        
+        다음 실행에서 다시 시도할 상태이거나 final이 False(일시적 오류로 인한 실패)이면 기록하지 않습니다.
+        """
+        if final and record['status'] not in self.RETRY_STATUSES:
+            self._append(record)
+    
+    def record_job(self, target, region, model_id, invocation_arn, submitted):
+        """시작한 비동기 작업을 추가합니다. submitted는 작업 시작 시각(UTC datetime)입니다."""
+        self._append({
+            'target': target,
+            'region': region,
+            'model_id': model_id,
+            'invocation_arn': invocation_arn,
+            'submitted': submitted.isoformat(),
+        })
+    
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def region_geography(region):
+    """리전이 속한 inference profile 권역(us, eu, apac 등)을 반환합니다."""
+    for prefix, geography in REGION_GEOGRAPHIES:
+        if region.startswith(prefix):
+            return geography
+    return None
+
+
+class InferenceProfileResolver:
+    """리전에서 사용할 수 있는 시스템 inference profile로 모델 ID를 변환합니다.
+    
+    list_inference_profiles 결과로 기본 모델 ID → profile ID 색인을 리전당 한 번 만들고,
+    디스크에 캐시해 같은 리전의 모든 호출과 다음 실행이 공유합니다. 리전 권역의 profile을
+    우선 사용하고, 없으면 global profile을 사용합니다.
+    """
+    
+    # 캐시 파일별 색인 (같은 프로세스에서 같은 리전을 처리하는 모든 인스턴스가 공유)
+    _shared = {}
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, client, region, cache_dir=CACHE_DIR, ttl=PROFILE_CACHE_TTL):
+        self.client = client
+        self.region = region
+        self.path = os.path.join(cache_dir, f"profiles-{region}.json")
+        self.ttl = ttl
+    
+    def resolve(self, model_id):
+        """모델에 사용할 inference profile ID를 반환합니다. 없으면 모델 ID를 그대로 반환합니다."""
+        return self.profiles().get(model_id, model_id)
+    
+    def profiles(self):
+        """기본 모델 ID → inference profile ID 색인을 반환합니다."""
+        profiles = self._shared.get(self.path)
+        if profiles is None:
+            with self._shared_lock:
+                profiles = self._shared.get(self.path)
+                if profiles is None:
+                    profiles = self._load_cached()
+                    if profiles is None:
+                        profiles = self._discover()
+                    self._shared[self.path] = profiles
+        return profiles
+    
+    def refresh(self):
+        """유효 기간과 관계없이 profile 목록을 다시 받아 색인을 갱신합니다.
+        
+        목록을 받지 못하면 지금 쓰는 색인을 유지합니다.
+        """
+        with self._shared_lock:
+            self._shared[self.path] = self._discover(self._shared.get(self.path))
+    
+    def _load_cached(self):
         try:
-            response = self.bedrock_client.list_foundation_models()
-            
-            available_models = []
-            for model in response['modelSummaries']:
-                model_id = model['modelId']
-                
-                # 호출 불가능한 모델 제외
-                skip_patterns = [
-                    ':mm',  # 멀티모달 버전
-                    ':512', # 토큰 제한 버전
-                    'titan-image-generator-v1:0',  # 버전 표기 문제
-                    'titan-embed-image-v1:0',      # 버전 표기 문제
-                    'stable-diffusion-xl-v1:0'     # 버전 표기 문제
-                ]
-                
-                if model_id.endswith('k') or any(pattern in model_id for pattern in skip_patterns):
-                    continue
-                    
-                available_models.append(model_id)
-                
-            return available_models
-        except ClientError as e:
-            print(f"모델 목록 가져오기 실패: {e}")
-            return []
+            with open(self.path, encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - cached.get('updated', 0) > self.ttl:
+            return None
+        return cached['profiles']
     
-    def send_token_to_model(self, model_id):
-        """특정 모델에 토큰을 보냅니다."""
+    def _discover(self, previous=None):
+        """list_inference_profiles로 색인을 만들고 캐시에 저장합니다.
+        
+        목록을 받지 못하면 previous를, previous도 없으면 기본 목록을 사용합니다.
+        """
+        geography = region_geography(self.region)
+        candidates = {}
         try:
-            # 리전에 따른 cross-region inference profile 매핑
-            if self.region == 'ap-northeast-2':
-                cross_region_mapping = {
-                    'amazon.nova-pro-v1:0': 'apac.amazon.nova-pro-v1:0',
-                    'amazon.nova-lite-v1:0': 'apac.amazon.nova-lite-v1:0',
-                    'amazon.nova-micro-v1:0': 'apac.amazon.nova-micro-v1:0',
-                    'anthropic.claude-3-sonnet-20240229-v1:0': 'apac.anthropic.claude-3-sonnet-20240229-v1:0',
-                    'anthropic.claude-3-5-sonnet-20241022-v2:0': 'apac.anthropic.claude-3-5-sonnet-20241022-v2:0',
-                    'anthropic.claude-3-7-sonnet-20250219-v1:0': 'apac.anthropic.claude-3-7-sonnet-20250219-v1:0',
-                    'anthropic.claude-sonnet-4-20250514-v1:0': 'apac.anthropic.claude-sonnet-4-20250514-v1:0',
-                    'meta.llama3-1-8b-instruct-v1:0': 'apac.meta.llama3-1-8b-instruct-v1:0',
-                    'meta.llama3-1-70b-instruct-v1:0': 'apac.meta.llama3-1-70b-instruct-v1:0',
-                    'meta.llama3-2-11b-instruct-v1:0': 'apac.meta.llama3-2-11b-instruct-v1:0',
-                    'meta.llama3-2-90b-instruct-v1:0': 'apac.meta.llama3-2-90b-instruct-v1:0',
-                    'meta.llama3-2-1b-instruct-v1:0': 'apac.meta.llama3-2-1b-instruct-v1:0',
-                    'meta.llama3-2-3b-instruct-v1:0': 'apac.meta.llama3-2-3b-instruct-v1:0',
-                    'meta.llama3-3-70b-instruct-v1:0': 'apac.meta.llama3-3-70b-instruct-v1:0',
-                    'meta.llama4-scout-17b-instruct-v1:0': 'apac.meta.llama4-scout-17b-instruct-v1:0',
-                    'meta.llama4-maverick-17b-instruct-v1:0': 'apac.meta.llama4-maverick-17b-instruct-v1:0',
-                    'deepseek.r1-v1:0': 'apac.deepseek.r1-v1:0',
-                    'amazon.nova-premier-v1:0': 'apac.amazon.nova-premier-v1:0',
-                    'amazon.titan-image-generator-v1:0': 'apac.amazon.titan-image-generator-v1:0',
-                    'amazon.titan-embed-image-v1:0': 'apac.amazon.titan-embed-image-v1:0',
-                    'stability.stable-diffusion-xl-v1:0': 'apac.stability.stable-diffusion-xl-v1:0',
-                    'mistral.pixtral-large-2502-v1:0': 'apac.mistral.pixtral-large-2502-v1:0',
-                    'cohere.embed-english-v3:0:512': 'apac.cohere.embed-english-v3:0:512',
-                    'cohere.embed-multilingual-v3:0:512': 'apac.cohere.embed-multilingual-v3:0:512',
-                    'amazon.nova-canvas-v1:0': 'apac.amazon.nova-canvas-v1:0',
-                    'amazon.nova-reel-v1:0': 'apac.amazon.nova-reel-v1:0',
-                    'amazon.nova-reel-v1:1': 'apac.amazon.nova-reel-v1:1',
-                    'amazon.nova-sonic-v1:0': 'apac.amazon.nova-sonic-v1:0',
-                    'anthropic.claude-3-opus-20240229-v1:0': 'apac.anthropic.claude-3-opus-20240229-v1:0',
-                    'anthropic.claude-opus-4-20250514-v1:0': 'apac.anthropic.claude-opus-4-20250514-v1:0'
-                }
-            elif self.region == 'us-east-1':
-                cross_region_mapping = {
-                    'amazon.nova-pro-v1:0': 'us.amazon.nova-pro-v1:0',
-                    'amazon.nova-lite-v1:0': 'us.amazon.nova-lite-v1:0',
-                    'amazon.nova-micro-v1:0': 'us.amazon.nova-micro-v1:0',
-                    'anthropic.claude-3-sonnet-20240229-v1:0': 'us.anthropic.claude-3-sonnet-20240229-v1:0',
-                    'anthropic.claude-3-5-sonnet-20241022-v2:0': 'us.anthropic.claude-3-5-sonnet-20241022-v2:0',
-                    'anthropic.claude-3-7-sonnet-20250219-v1:0': 'us.anthropic.claude-3-7-sonnet-20250219-v1:0',
-                    'anthropic.claude-sonnet-4-20250514-v1:0': 'us.anthropic.claude-sonnet-4-20250514-v1:0',
-                    'anthropic.claude-3-5-haiku-20241022-v1:0': 'us.anthropic.claude-3-5-haiku-20241022-v1:0',
-                    'meta.llama3-1-8b-instruct-v1:0': 'us.meta.llama3-1-8b-instruct-v1:0',
-                    'meta.llama3-1-70b-instruct-v1:0': 'us.meta.llama3-1-70b-instruct-v1:0',
-                    'meta.llama3-2-11b-instruct-v1:0': 'us.meta.llama3-2-11b-instruct-v1:0',
-                    'meta.llama3-2-90b-instruct-v1:0': 'us.meta.llama3-2-90b-instruct-v1:0',
-                    'meta.llama3-2-1b-instruct-v1:0': 'us.meta.llama3-2-1b-instruct-v1:0',
-                    'meta.llama3-2-3b-instruct-v1:0': 'us.meta.llama3-2-3b-instruct-v1:0',
-                    'meta.llama3-3-70b-instruct-v1:0': 'us.meta.llama3-3-70b-instruct-v1:0',
-                    'meta.llama4-scout-17b-instruct-v1:0': 'us.meta.llama4-scout-17b-instruct-v1:0',
-                    'meta.llama4-maverick-17b-instruct-v1:0': 'us.meta.llama4-maverick-17b-instruct-v1:0',
-                    'deepseek.r1-v1:0': 'us.deepseek.r1-v1:0',
-                    'amazon.nova-premier-v1:0': 'us.amazon.nova-premier-v1:0',
-                    'amazon.titan-image-generator-v1:0': 'us.amazon.titan-image-generator-v1:0',
-                    'amazon.titan-embed-image-v1:0': 'us.amazon.titan-embed-image-v1:0',
-                    'stability.stable-diffusion-xl-v1:0': 'us.stability.stable-diffusion-xl-v1:0',
-                    'mistral.pixtral-large-2502-v1:0': 'us.mistral.pixtral-large-2502-v1:0',
-                    'cohere.embed-english-v3:0:512': 'us.cohere.embed-english-v3:0:512',
-                    'cohere.embed-multilingual-v3:0:512': 'us.cohere.embed-multilingual-v3:0:512',
-                    'amazon.nova-canvas-v1:0': 'us.amazon.nova-canvas-v1:0',
-                    'amazon.nova-reel-v1:0': 'us.amazon.nova-reel-v1:0',
-                    'amazon.nova-reel-v1:1': 'us.amazon.nova-reel-v1:1',
-                    'amazon.nova-sonic-v1:0': 'us.amazon.nova-sonic-v1:0',
-                    'anthropic.claude-3-opus-20240229-v1:0': 'us.anthropic.claude-3-opus-20240229-v1:0',
-                    'anthropic.claude-opus-4-20250514-v1:0': 'us.anthropic.claude-opus-4-20250514-v1:0'
+            paginator = self.client.get_paginator('list_inference_profiles')
+            for page in paginator.paginate(typeEquals='SYSTEM_DEFINED'):
+                for profile in page['inferenceProfileSummaries']:
+                    if profile.get('status', 'ACTIVE') != 'ACTIVE':
+                        continue
+                    profile_id = profile['inferenceProfileId']
+                    prefix = profile_id.split('.', 1)[0]
+                    if prefix == geography:
+                        rank = 0
+                    elif prefix == 'global':
+                        rank = 1
+                    else:
+                        continue
+                    for model in profile['models']:
+                        model_id = model['modelArn'].split('/', 1)[-1]
+                        if model_id not in candidates or rank < candidates[model_id][0]:
+                            candidates[model_id] = (rank, profile_id)
+        except (BotoCoreError, ClientError) as e:
+            if previous is not None:
+                print(f"Inference profile 목록 가져오기 실패 (이전 색인 사용): {e}")
+                return previous
+            print(f"Inference profile 목록 가져오기 실패 (기본 목록 사용): {e}")
+            return self._static_profiles()
+        
+        profiles = {model_id: profile_id for model_id, (_, profile_id) in candidates.items()}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'updated': time.time(), 'profiles': profiles}, f, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Inference profile 캐시 저장 실패: {e}")
+        return profiles
+    
+    def _static_profiles(self):
+        geography = STATIC_PROFILE_REGIONS.get(self.region)
+        if geography is None:
+            # 다른 리전에서는 cross-region 사용 안함
+            return {}
+        models = STATIC_PROFILE_MODELS | STATIC_PROFILE_EXTRA_MODELS.get(geography, frozenset())
+        return {model_id: f"{geography}.{model_id}" for model_id in models}
+
+
+class ModelCatalog:
+    """리전별 파운데이션 모델 카탈로그를 디스크에 저장하고 네트워크 호출 없이 조회합니다.
+    
+    모델마다 프로바이더, 입력/출력 모달리티, 추론 유형, 수명 주기 상태, 스트리밍 지원 여부를
+    저장하고, 필드 값별 색인으로 query()에 답합니다. 유효 기간이 지나면 목록을 다시 받아
+    요약 해시가 같으면 확인 시각만 갱신하고, 달라진 경우에만 바뀐 모델을 반영합니다.
+    같은 리전을 처리하는 모든 계정과 다음 실행이 캐시를 공유합니다. 계정마다 다른 모델 사용 가능
+    여부(get_foundation_model_availability 결과)도 계정 ID별로 같은 유효 기간 동안 저장합니다.
+    """
+    
+    # 캐시 파일별 카탈로그 (같은 프로세스에서 같은 리전을 처리하는 모든 인스턴스가 공유)
+    _shared = {}
+    _shared_lock = threading.Lock()
+    
+    # query()로 조회할 수 있는 필드 (여러 값을 가지는 필드는 값마다 색인)
+    INDEXED_FIELDS = ('provider', 'input', 'output', 'inference', 'lifecycle', 'streaming')
+    
+    def __init__(self, client, region, cache_dir=CACHE_DIR, ttl=MODEL_CATALOG_TTL):
+        self.client = client
+        self.region = region
+        self.path = os.path.join(cache_dir, f"models-{region}.json")
+        self.ttl = ttl
+    
+    def models(self):
+        """카탈로그의 모델 ID를 list_foundation_models 순서로 반환합니다."""
+        return list(self._catalog()['order'])
+    
+    def get(self, model_id):
+        """모델 정보(provider, name, input, output, inference, lifecycle, streaming)를 반환합니다."""
+        return self._catalog()['models'].get(model_id)
+    
+    def query(self, provider=None, input_modality=None, output_modality=None,
+              inference_type=None, lifecycle=None, streaming=None):
+        """조건을 모두 만족하는 모델 ID를 반환합니다.
+        
+        예: query(inference_type='ON_DEMAND', output_modality='TEXT')
+        """
+        catalog = self._catalog()
+        conditions = [
+            ('provider', provider),
+            ('input', input_modality),
+            ('output', output_modality),
+            ('inference', inference_type),
+            ('lifecycle', lifecycle),
+            ('streaming', streaming),
+        ]
+        matches = None
+        for field, value in conditions:
+            if value is None:
+                continue
+            ids = catalog['index'].get((field, value), frozenset())
+            matches = ids if matches is None else matches & ids
+        if matches is None:
+            return list(catalog['order'])
+        return [model_id for model_id in catalog['order'] if model_id in matches]
+    
+    def refresh(self):
+        """유효 기간과 관계없이 카탈로그와 자격 증명별 모델 사용 가능 여부를 다시 확인합니다."""
+        with self._shared_lock:
+            previous = self._load_cached()
+            if previous is not None:
+                previous['availability'] = {}
+            self._shared[self.path] = self._refresh(previous)
+    
+    def availability(self, identity):
+        """자격 증명의 저장된 모델별 사용 불가 이유 {모델 ID: 이유 또는 None}를 반환합니다.
+        
+        유효 기간이 지났거나 저장된 결과가 없으면 빈 dict를 반환합니다.
+        """
+        entry = self._catalog().get('availability', {}).get(identity)
+        if entry is None or time.time() - entry['checked'] > self.ttl:
+            return {}
+        return dict(entry['models'])
+    
+    def record_availability(self, identity, reasons):
+        """확인한 모델별 사용 불가 이유를 자격 증명의 저장 항목에 합쳐 저장합니다.
+        
+        항목의 확인 시각은 처음 확인한 시각으로 유지해, 유효 기간이 지나면 모두 다시 확인합니다.
+        """
+        self._catalog()
+        with self._shared_lock:
+            catalog = self._shared[self.path]
+            availability = dict(catalog.get('availability', {}))
+            entry = availability.get(identity)
+            if entry is None or time.time() - entry['checked'] > self.ttl:
+                entry = {'checked': time.time(), 'models': {}}
+            availability[identity] = {'checked': entry['checked'], 'models': dict(entry['models'], **reasons)}
+            catalog['availability'] = availability
+            self._store(catalog)
+    
+    def _catalog(self):
+        catalog = self._shared.get(self.path)
+        if catalog is None:
+            with self._shared_lock:
+                catalog = self._shared.get(self.path)
+                if catalog is None:
+                    catalog = self._load_cached()
+                    if catalog is None or time.time() - catalog['checked'] > self.ttl:
+                        catalog = self._refresh(catalog)
+                    self._shared[self.path] = catalog
+        return catalog
+    
+    def _load_cached(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return self._indexed(cached)
+    
+    @classmethod
+    def _indexed(cls, cached):
+        """저장된 카탈로그에 필드 값별 색인을 붙입니다."""
+        index = {}
+        for model_id in cached['order']:
+            model = cached['models'][model_id]
+            for field in cls.INDEXED_FIELDS:
+                values = model[field] if isinstance(model[field], list) else [model[field]]
+                for value in values:
+                    index.setdefault((field, value), set()).add(model_id)
+        cached['index'] = {key: frozenset(ids) for key, ids in index.items()}
+        return cached
+    
+    @staticmethod
+    def _summary(model):
+        return {
+            'provider': model.get('providerName'),
+            'name': model.get('modelName'),
+            'input': model.get('inputModalities', []),
+            'output': model.get('outputModalities', []),
+            'inference': model.get('inferenceTypesSupported', []),
+            'lifecycle': model.get('modelLifecycle', {}).get('status', 'ACTIVE'),
+            'streaming': bool(model.get('responseStreamingSupported', False)),
+        }
+    
+    def _refresh(self, previous):
+        """list_foundation_models 결과를 이전 카탈로그와 비교해 바뀐 경우에만 저장합니다.
+        
+        목록을 받지 못하면 이전 카탈로그를 그대로 사용하고, 이전 카탈로그도 없으면
+        예외를 다시 발생시킵니다.
+        """
+        try:
+            response = self.client.list_foundation_models()
+        except (BotoCoreError, ClientError) as e:
+            if previous is None:
+                raise
+            print(f"모델 목록 확인 실패 (캐시 사용): {e}")
+            return previous
+        
+        models = {}
+        order = []
+        for model in response['modelSummaries']:
+            model_id = model['modelId']
+            if model_id not in models:
+                order.append(model_id)
+            models[model_id] = self._summary(model)
+        digest = hashlib.sha256(
+            json.dumps([order, models], sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        
+        if previous is not None and previous.get('digest') == digest:
+            # 변경 없음: 확인 시각만 갱신
+            catalog = previous
+        else:
+            if previous is not None:
+                old = previous['models']
+                # 바뀌지 않은 모델은 이전 항목을 그대로 재사용
+                models = {
+                    model_id: old[model_id] if old.get(model_id) == model else model
+                    for model_id, model in models.items()
                 }
-            else:
-                # 다른 리전에서는 cross-region 사용 안함
-                cross_region_mapping = {}
+            catalog = {
+                'digest': digest,
+                'order': order,
+                'models': models,
+                'availability': previous.get('availability', {}) if previous is not None else {},
+            }
+        catalog['checked'] = time.time()
+        return self._indexed(self._store(catalog))
+    
+    def _store(self, catalog):
+        """카탈로그를 캐시 파일에 저장하고 저장한 항목(색인 제외)을 반환합니다."""
+        stored = {key: catalog[key] for key in ('checked', 'digest', 'order', 'models')}
+        stored['availability'] = catalog.get('availability', {})
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(stored, f, separators=(',', ':'), sort_keys=True)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"모델 카탈로그 캐시 저장 실패: {e}")
+        return stored
+
+
+class AsyncJobTracker:
+    """start_async_invoke 작업을 등록받아 백그라운드 스레드에서 한꺼번에 상태를 확인합니다.
+    
+    대기 중인 작업은 list_async_invokes 페이지 조회로 일괄 확인하고, 목록에 없는 작업만
+    get_async_invoke로 개별 확인합니다. 상태 변화가 없으면 확인 간격을 늘리고, 작업이
+    끝나거나 새 작업이 등록되면 다시 줄입니다. 결과는 작업 요약(dict)을 담은 Future로 전달됩니다.
+    하위 클래스는 조회 API와 끝난 상태를 바꿔 다른 종류의 작업을 같은 방식으로 추적합니다.
+    """
+    
+    # 일괄 조회 페이지네이터와 결과 키, 개별 조회 API와 인자, 작업 식별자 키
+    LIST_OPERATION = ('list_async_invokes', 'asyncInvokeSummaries')
+    GET_OPERATION = ('get_async_invoke', 'invocationArn')
+    ID_KEY = 'invocationArn'
+    FINAL_STATUSES = frozenset(['Completed', 'Failed'])
+    
+    def __init__(self, client, initial_interval=ASYNC_POLL_INITIAL_INTERVAL,
+                 max_interval=ASYNC_POLL_MAX_INTERVAL, backoff=ASYNC_POLL_BACKOFF,
+                 timeout=ASYNC_JOB_TIMEOUT):
+        self.client = client
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.timeout = timeout
+        self._jobs = {}
+        self._condition = threading.Condition()
+        self._interval = initial_interval
+        self._next_poll = 0
+        self._thread = None
+    
+    def register(self, invocation_arn, callback=None, submitted=None):
+        """작업을 등록하고 끝난 상태(FINAL_STATUSES) 또는 시간 초과 시 결과가 설정될 Future를 반환합니다.
+        
+        이전 실행에서 시작한 작업을 다시 추적할 때는 submitted에 시작 시각(UTC datetime)을 넘깁니다.
+        """
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        
+        with self._condition:
+            self._jobs[invocation_arn] = {
+                'future': future,
+                'submitted': submitted or datetime.now(timezone.utc),
+                'deadline': time.monotonic() + self.timeout,
+                'summary': {self.ID_KEY: invocation_arn, 'status': 'InProgress'},
+            }
+            # 새 작업은 짧은 간격부터 다시 확인
+            self._interval = self.initial_interval
+            self._next_poll = min(
+                self._next_poll or float('inf'),
+                time.monotonic() + self.initial_interval
+            )
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='async-job-tracker', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return future
+    
+    def pending_count(self):
+        """완료되지 않은 작업 수를 반환합니다."""
+        with self._condition:
+            return len(self._jobs)
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if not self._jobs:
+                        self._thread = None
+                        self._next_poll = 0
+                        return
+                    delay = self._next_poll - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                jobs = dict(self._jobs)
             
-            # Cross-region 모델은 inference profile ID 사용
-            actual_model_id = cross_region_mapping.get(model_id, model_id)
+            try:
+                changed = self._poll(jobs)
+            except Exception as e:
+                # 추적 스레드가 죽어 Future가 영원히 대기하지 않도록 모든 작업에 오류 전달
+                self._fail_all(e)
+                continue
             
-            if 'claude' in model_id.lower():
-                body = json.dumps({
-                    "messages": [{"role": "user", "content": "Hello"}],
-                    "max_tokens": 10,
-                    "anthropic_version": "bedrock-2023-05-31"
-                })
-            elif 'nova' in model_id.lower():
-                if 'canvas' in model_id.lower():
-                    body = json.dumps({
-                        "taskType": "TEXT_IMAGE",
-                        "textToImageParams": {
-                            "text": "Hello world"
-                        },
-                        "imageGenerationConfig": {
-                            "numberOfImages": 1,
-                            "height": 512,
-                            "width": 512
-                        }
-                    })
-                elif 'reel' in model_id.lower():
-                    # Nova Reel은 비동기 호출 사용
-                    return self.send_nova_reel_async(model_id)
-                elif 'sonic' in model_id.lower():
-                    # Nova Sonic은 스트리밍 API 필요
-                    print(f"- {model_id}: 스트리밍 API 필요 (스킵)")
-                    return False
-                else:
-                    body = json.dumps({
-                        "messages": [
-                            {
-                                "role": "user",
-                                "content": [
-                                    {"text": "Hello"}
-                                ]
-                            }
-                        ],
-                        "inferenceConfig": {
-                            "max_new_tokens": 10
-                        }
-                    })
-            elif 'titan-embed' in model_id.lower():
-                body = json.dumps({
-                    "inputText": "Hello world"
-                })
-            elif 'marengo-embed' in model_id.lower():
-                # TwelveLabs 모델은 비동기 호출 사용
-                return self.send_async_token(model_id)
-            elif 'titan' in model_id.lower():
-                if 'image-generator' in model_id.lower():
-                    body = json.dumps({
-                        "taskType": "TEXT_IMAGE",
-                        "textToImageParams": {
-                            "text": "Hello world"
-                        },
-                        "imageGenerationConfig": {
-                            "numberOfImages": 1,
-                            "height": 512,
-                            "width": 512
-                        }
-                    })
+            with self._condition:
+                if changed:
+                    self._interval = self.initial_interval
                 else:
-                    body = json.dumps({
-                        "inputText": "Hello",
-                        "textGenerationConfig": {"maxTokenCount": 10}
-                    })
-            elif 'llama' in model_id.lower():
-                body = json.dumps({
-                    "prompt": "Hello",
-                    "max_gen_len": 10,
-                    "temperature": 0.1
-                })
-            elif 'jamba' in model_id.lower():
-                body = json.dumps({
-                    "messages": [{"role": "user", "content": "Hello"}],
-                    "max_tokens": 10
-                })
-            elif 'cohere' in model_id.lower():
-                if 'embed' in model_id.lower():
-                    body = json.dumps({
-                        "texts": ["Hello world"],
-                        "input_type": "search_document"
-                    })
-                elif 'command-r' in model_id.lower():
-                    body = json.dumps({
-                        "message": "Hello",
-                        "max_tokens": 10
-                    })
-                else:
-                    body = json.dumps({
-                        "prompt": "Hello",
-                        "max_tokens": 10
-                    })
-            elif 'stable-diffusion' in model_id.lower():
-                body = json.dumps({
-                    "text_prompts": [{"text": "Hello world"}],
-                    "cfg_scale": 10,
-                    "seed": 0,
-                    "steps": 50
-                })
-            elif 'deepseek' in model_id.lower():
-                body = json.dumps({
-                    "messages": [{"role": "user", "content": "Hello"}],
-                    "max_tokens": 10,
-                    "temperature": 0.1
-                })
-            elif 'pixtral' in model_id.lower():
-                body = json.dumps({
-                    "messages": [{"role": "user", "content": "Hello"}],
-                    "max_tokens": 10
-                })
+                    self._interval = min(self._interval * self.backoff, self.max_interval)
+                self._next_poll = time.monotonic() + self._interval
+    
+    def _fail_all(self, error):
+        with self._condition:
+            jobs, self._jobs = self._jobs, {}
+        for job in jobs.values():
+            job['future'].set_exception(error)
+    
+    def _poll(self, jobs):
+        """대기 중인 작업 상태를 확인하고 끝난 작업을 정리합니다. 끝난 작업이 있으면 True."""
+        summaries = self._fetch_summaries(jobs)
+        finished = {}
+        now = time.monotonic()
+        for invocation_arn, job in jobs.items():
+            result = summaries.get(invocation_arn)
+            if isinstance(result, Exception):
+                finished[invocation_arn] = result
+                continue
+            if result is not None:
+                job['summary'] = result
+            if job['summary']['status'] in self.FINAL_STATUSES or now >= job['deadline']:
+                finished[invocation_arn] = job['summary']
+        
+        with self._condition:
+            for invocation_arn in finished:
+                self._jobs.pop(invocation_arn, None)
+        
+        for invocation_arn, result in finished.items():
+            future = jobs[invocation_arn]['future']
+            if isinstance(result, Exception):
+                future.set_exception(result)
             else:
-                body = json.dumps({
-                    "prompt": "Hello",
-                    "max_tokens": 10
-                })
-            
-            self.bedrock.invoke_model(
-                modelId=actual_model_id,
-                body=body,
-                contentType='application/json'
+                future.set_result(result)
+        return bool(finished)
+    
+    def _fetch_summaries(self, jobs):
+        """작업 상태를 일괄 조회합니다. 개별 조회 중 복구할 수 없는 오류는 예외 객체로 담습니다."""
+        summaries = {}
+        # 시계 차이를 고려해 가장 오래된 작업보다 1분 앞부터 조회
+        since = min(job['submitted'] for job in jobs.values()) - timedelta(minutes=1)
+        list_operation, result_key = self.LIST_OPERATION
+        try:
+            paginator = self.client.get_paginator(list_operation)
+            for page in paginator.paginate(submitTimeAfter=since):
+                for summary in page[result_key]:
+                    if summary[self.ID_KEY] in jobs:
+                        summaries[summary[self.ID_KEY]] = summary
+        except (BotoCoreError, ClientError):
+            # 목록 조회 권한이 없거나 일시적 오류면 개별 조회로 대체
+            pass
+        
+        get_operation, parameter = self.GET_OPERATION
+        for invocation_arn in jobs:
+            if invocation_arn in summaries:
+                continue
+            try:
+                summaries[invocation_arn] = getattr(self.client, get_operation)(
+                    **{parameter: invocation_arn}
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ThrottlingException':
+                    summaries[invocation_arn] = e
+            except BotoCoreError:
+                # 네트워크 오류는 다음 확인 때 다시 시도
+                continue
+        return summaries
+
+
+class BatchJobTracker(AsyncJobTracker):
+    """create_model_invocation_job 배치 작업을 AsyncJobTracker와 같은 방식으로 추적합니다.
+    
+    배치 작업은 몇 시간씩 걸리므로 확인 간격과 제한 시간을 길게 잡습니다.
+    """
+    
+    LIST_OPERATION = ('list_model_invocation_jobs', 'invocationJobSummaries')
+    GET_OPERATION = ('get_model_invocation_job', 'jobIdentifier')
+    ID_KEY = 'jobArn'
+    FINAL_STATUSES = frozenset(['Completed', 'PartiallyCompleted', 'Failed', 'Stopped', 'Expired'])
+    
+    def __init__(self, client, initial_interval=BATCH_POLL_INITIAL_INTERVAL,
+                 max_interval=BATCH_POLL_MAX_INTERVAL, backoff=ASYNC_POLL_BACKOFF,
+                 timeout=BATCH_JOB_TIMEOUT):
+        super().__init__(client, initial_interval, max_interval, backoff, timeout)
+
+
+# 출력 파일 확장자별 앞부분 바이트 검사 (그 밖의 파일은 크기만 확인)
+OUTPUT_SIGNATURES = {
+    '.json': lambda head: head.lstrip()[:1] in (b'{', b'['),
+    '.mp4': lambda head: head[4:8] == b'ftyp',
+}
+
+
+class AsyncOutputCollector:
+    """완료된 비동기 작업의 S3 출력을 전체 다운로드 없이 확인하고 정리합니다.
+    
+    작업 출력 경로를 페이지 단위로 나열해 객체 수와 크기를 구하고, JSON/비디오 파일은
+    앞부분 OUTPUT_PROBE_BYTES만 ranged GET으로 읽어 형식을 확인합니다.
+    delete가 True이면 확인을 마친 객체를 모아 DeleteObjects로 한 번에 최대 1,000개씩 지웁니다.
+    """
+    
+    def __init__(self, client, delete=False):
+        self.client = client
+        self.delete = delete
+        self.deleted = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def output_location(summary):
+        """작업 요약에서 출력 (버킷, 키 접두사)를 구합니다."""
+        uri = summary.get('outputDataConfig', {}).get('s3OutputDataConfig', {}).get('s3Uri', '')
+        bucket, _, prefix = uri[len('s3://'):].partition('/')
+        # 요청한 출력 경로만 돌려주는 경우 작업 ID 하위 경로로 좁힘 (배치 작업은 jobArn)
+        invocation_id = (summary.get('invocationArn') or summary['jobArn']).rsplit('/', 1)[-1]
+        if invocation_id not in prefix:
+            prefix = f"{prefix.rstrip('/')}/{invocation_id}".lstrip('/')
+        return bucket, prefix.rstrip('/') + '/'
+    
+    def collect(self, summary):
+        """작업 출력을 확인하고 {'objects': 수, 'bytes': 크기 합계, 'error': 실패 사유 또는 None}을 반환합니다."""
+        bucket, prefix = self.output_location(summary)
+        objects = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            objects.extend(page.get('Contents', []))
+        
+        result = {'objects': len(objects), 'bytes': sum(obj['Size'] for obj in objects), 'error': None}
+        if not objects:
+            result['error'] = '출력 없음'
+            return result
+        for obj in objects:
+            result['error'] = self._check(bucket, obj)
+            if result['error']:
+                return result
+        if self.delete:
+            self.discard(bucket, [obj['Key'] for obj in objects])
+        return result
+    
+    def _check(self, bucket, obj):
+        name = obj['Key'].rsplit('/', 1)[-1]
+        if not obj['Size']:
+            return f"빈 출력 ({name})"
+        signature = OUTPUT_SIGNATURES.get(os.path.splitext(name)[1].lower())
+        if signature is None:
+            return None
+        response = self.client.get_object(
+            Bucket=bucket,
+            Key=obj['Key'],
+            Range=f"bytes=0-{OUTPUT_PROBE_BYTES - 1}"
+        )
+        body = response['Body']
+        try:
+            head = body.read(OUTPUT_PROBE_BYTES)
+        finally:
+            body.close()
+        return None if signature(head) else f"형식 오류 ({name})"
+    
+    def discard(self, bucket, keys):
+        """지울 객체 키를 모읍니다. DELETE_BATCH_SIZE개가 모일 때마다 바로 지우고, 나머지는 flush()에서 지웁니다."""
+        with self._lock:
+            pending = self._pending.setdefault(bucket, [])
+            pending.extend(keys)
+            batches = []
+            while len(pending) >= DELETE_BATCH_SIZE:
+                batches.append(pending[:DELETE_BATCH_SIZE])
+                del pending[:DELETE_BATCH_SIZE]
+        for batch in batches:
+            self._delete(bucket, batch)
+    
+    def _delete(self, bucket, keys):
+        response = self.client.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+        )
+        with self._lock:
+            self.deleted += len(keys) - len(response.get('Errors', []))
+    
+    def flush(self):
+        """지우려고 모아 둔 객체를 모두 지우고 지금까지 지운 객체 수를 반환합니다."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for bucket, keys in pending.items():
+            for start in range(0, len(keys), DELETE_BATCH_SIZE):
+                self._delete(bucket, keys[start:start + DELETE_BATCH_SIZE])
+        return self.deleted
+
+
+class JsonlUploader:
+    """JSON Lines 레코드를 전체를 메모리에 올리지 않고 S3에 올립니다.
+    
+    레코드를 part_size만큼 모을 때마다 멀티파트 업로드의 파트로 보내고, 파일 하나가
+    max_records개를 넘으면 다음 파일(part-00002.jsonl ...)로 나눕니다. 파트 크기를 채우지 못한
+    작은 파일은 put_object 한 번으로 올립니다.
+    """
+    
+    def __init__(self, client, bucket, prefix, part_size=MULTIPART_PART_SIZE,
+                 max_records=BATCH_MAX_RECORDS_PER_FILE):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.part_size = part_size
+        self.max_records = max_records
+        self.keys = []
+        self.records = 0
+        self.bytes = 0
+        self._buffer = bytearray()
+        self._file_records = 0
+        self._upload_id = None
+        self._parts = []
+    
+    def _key(self):
+        return f"{self.prefix}part-{len(self.keys) + 1:05d}.jsonl"
+    
+    def write(self, record):
+        if self._file_records >= self.max_records:
+            self._close_file()
+        line = json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n'
+        self._buffer += line
+        self._file_records += 1
+        self.records += 1
+        self.bytes += len(line)
+        if len(self._buffer) >= self.part_size:
+            self._upload_part()
+    
+    def _upload_part(self):
+        if self._upload_id is None:
+            self._upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket,
+                Key=self._key(),
+                ContentType='application/jsonl'
+            )['UploadId']
+        number = len(self._parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self._key(),
+            UploadId=self._upload_id,
+            PartNumber=number,
+            Body=bytes(self._buffer)
+        )
+        self._parts.append({'ETag': response['ETag'], 'PartNumber': number})
+        self._buffer = bytearray()
+    
+    def _close_file(self):
+        if not self._file_records:
+            return
+        key = self._key()
+        if self._upload_id is None:
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=bytes(self._buffer),
+                                   ContentType='application/jsonl')
+        else:
+            if self._buffer:
+                self._upload_part()
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=self._upload_id,
+                MultipartUpload={'Parts': self._parts}
+            )
+        self.keys.append(key)
+        self._reset()
+    
+    def _reset(self):
+        self._buffer = bytearray()
+        self._file_records = 0
+        self._upload_id = None
+        self._parts = []
+    
+    def close(self):
+        """남은 레코드를 올리고 올린 파일 키 목록을 반환합니다."""
+        self._close_file()
+        return self.keys
+    
+    def abort(self):
+        """진행 중인 멀티파트 업로드를 취소합니다 (올린 파트가 과금되지 않도록)."""
+        if self._upload_id is not None:
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=self._key(), UploadId=self._upload_id)
+            except (BotoCoreError, ClientError):
+                pass
+        self._reset()
+
+
+class TokenBucket:
+    """분당 할당량을 초당 보충 속도로 바꾼 토큰 버킷입니다.
+    
+    reserve()는 토큰을 미리 차감하고 기다려야 할 시간(초)을 반환해, 호출하는 쪽이
+    잠금 밖에서 기다리게 합니다. 잔량이 음수면 먼저 예약한 호출부터 차례로 풀립니다.
+    """
+    
+    def __init__(self, per_minute):
+        self.limit = per_minute / 60.0
+        self.rate = self.limit
+        self.capacity = max(1.0, self.limit * RATE_BURST_SECONDS)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def reserve(self, amount, now):
+        self._refill(now)
+        self.tokens -= amount
+        return max(0.0, -self.tokens / self.rate)
+    
+    def ready_in(self, now):
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+    
+    def slow_down(self):
+        self.rate = max(self.limit * THROTTLE_MIN_RATE_FACTOR, self.rate * THROTTLE_RATE_FACTOR)
+    
+    def speed_up(self):
+        # 성공할 때마다 할당량 쪽으로 조금씩 회복
+        self.rate = min(self.limit, self.rate * 1.1)
+
+
+class RateScheduler:
+    """(리전, 모델 또는 inference profile)별 RPM/TPM 토큰 버킷으로 호출 속도를 조절합니다.
+    
+    할당량은 리전별 {모델 ID 접두사: {'rpm': .., 'tpm': ..}} 형식이며 가장 긴 접두사가
+    적용됩니다. 할당량이 없는 모델은 제한하지 않고, 스로틀링이 발생하면 해당 모델의
+    속도를 낮춘 뒤 성공할 때마다 다시 올립니다.
+    """
+    
+    def __init__(self, quotas=None):
+        self.quotas = {}
+        self._buckets = {}
+        self._usage = {}
+        self._lock = threading.Lock()
+        for region, limits in (quotas or {}).items():
+            self.update(region, limits)
+    
+    def update(self, region, limits):
+        """리전 할당량을 추가합니다 ('*' 리전은 모든 리전에 적용). 이미 만든 버킷은 유지합니다."""
+        with self._lock:
+            self.quotas.setdefault(region, {}).update(limits)
+    
+    def quota(self, region, model_id):
+        """모델에 적용할 할당량을 반환합니다. 없으면 None.
+        
+        inference profile ID는 profile ID로 먼저 찾고, 없으면 권역 접두사를 뗀
+        기본 모델 ID로 찾습니다 (할당량 파일은 보통 기본 모델 ID 기준).
+        """
+        candidates = [model_id]
+        if base_model_id(model_id) != model_id:
+            candidates.append(base_model_id(model_id))
+        for candidate in candidates:
+            for section in (self.quotas.get(region, {}), self.quotas.get('*', {})):
+                matches = [prefix for prefix in section if candidate.startswith(prefix)]
+                if matches:
+                    return section[max(matches, key=len)]
+        return None
+    
+    def _buckets_for(self, key):
+        buckets = self._buckets.get(key)
+        if buckets is None:
+            quota = self.quota(*key) or {}
+            buckets = {unit: TokenBucket(quota[unit]) for unit in ('rpm', 'tpm') if quota.get(unit)}
+            self._buckets[key] = buckets
+        return buckets
+    
+    def estimate(self, key):
+        """호출당 예상 토큰 수 (마지막으로 확인한 사용량)."""
+        return self._usage.get(key, DEFAULT_TOKEN_ESTIMATE)
+    
+    def reserve(self, key, tokens):
+        """호출 한 번과 예상 토큰을 예약하고 기다려야 할 시간(초)을 반환합니다."""
+        with self._lock:
+            now = time.monotonic()
+            buckets = self._buckets_for(key)
+            delays = [0.0]
+            if 'rpm' in buckets:
+                delays.append(buckets['rpm'].reserve(1, now))
+            if 'tpm' in buckets:
+                delays.append(buckets['tpm'].reserve(tokens, now))
+            return max(delays)
+    
+    def acquire(self, key, tokens):
+        """예약한 호출 차례가 될 때까지 기다립니다."""
+        delay = self.reserve(key, tokens)
+        if delay:
+            time.sleep(delay)
+    
+    def ready_in(self, key):
+        """토큰을 쓰지 않고 다음 호출이 가능해질 때까지의 시간(초)을 반환합니다."""
+        with self._lock:
+            now = time.monotonic()
+            return max([0.0] + [bucket.ready_in(now) for bucket in self._buckets_for(key).values()])
+    
+    def settle(self, key, estimated, actual):
+        """호출 후 실제 토큰 사용량으로 예약량을 보정하고 다음 예상치로 기록합니다."""
+        with self._lock:
+            self._usage[key] = actual
+            buckets = self._buckets_for(key)
+            if 'rpm' in buckets:
+                buckets['rpm'].speed_up()
+            if 'tpm' in buckets:
+                buckets['tpm'].tokens -= actual - estimated
+                buckets['tpm'].speed_up()
+    
+    def throttled(self, key, attempt):
+        """스로틀링된 모델의 속도를 낮추고 다시 시도하기 전 대기 시간(초)을 반환합니다."""
+        with self._lock:
+            for bucket in self._buckets_for(key).values():
+                bucket.slow_down()
+        return THROTTLE_BACKOFF * (2 ** (attempt - 1))
+
+
+def load_quotas(path):
+    """모델별 할당량 파일(JSON)을 읽습니다.
+    
+    {"us-east-1": {"anthropic.claude-3-haiku": {"rpm": 1000, "tpm": 2000000}},
+     "*": {"meta.llama3": {"rpm": 200}}}
+    """
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _quota_name_key(name):
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
+
+def service_quota_limits(client, catalog, resolver):
+    """Service Quotas의 Bedrock 할당량을 {모델 또는 profile ID: {'rpm', 'tpm'}}로 바꿉니다.
+    
+    할당량 이름의 모델 이름을 모델 카탈로그의 "프로바이더 모델명" 또는 "모델명"과 맞춰 찾고,
+    cross-region 할당량은 해당 모델의 inference profile ID에 적용합니다.
+    """
+    names = {}
+    for model_id in catalog.models():
+        model = catalog.get(model_id)
+        if model.get('name'):
+            names.setdefault(_quota_name_key(model['name']), []).append(model_id)
+            names.setdefault(_quota_name_key(f"{model['provider']} {model['name']}"), []).append(model_id)
+    
+    limits = {}
+    paginator = client.get_paginator('list_service_quotas')
+    for page in paginator.paginate(ServiceCode='bedrock'):
+        for quota in page['Quotas']:
+            match = SERVICE_QUOTA_PATTERN.match(quota['QuotaName'])
+            if not match or not quota.get('Value'):
+                continue
+            unit = 'rpm' if match.group('unit').lower() == 'requests' else 'tpm'
+            for model_id in names.get(_quota_name_key(match.group('model')), []):
+                if match.group('scope').lower() == 'cross-region':
+                    model_id = resolver.resolve(model_id)
+                limits.setdefault(model_id, {})[unit] = quota['Value']
+    return limits
+
+
+class BedrockTokenSender:
+    def __init__(self, access_key, secret_key, region, cache_dir=CACHE_DIR, session=None, label=None,
+                 config=None, metrics=None, prices=None, stream=False, endpoint_url=None,
+                 probe='standard', quotas=None, service_quotas=False, journal=None, delete_outputs=False,
+                 converse=False):
+        self.region = region
+        # 요청 본문 설정 (PROBE_PROFILES 이름)
+        self.payloads = PAYLOAD_REGISTRIES[probe]
+        # converse가 True이면 텍스트 모델은 패밀리별 형식 대신 공통 Converse 요청 하나로 호출
+        self.converse_request = CONVERSE_REQUESTS[probe] if converse else None
+        # True이면 스트리밍을 지원하는 모델을 invoke_model_with_response_stream으로 호출
+        self.stream = stream
+        # 여러 리전을 처리할 때는 계정별 세션 하나를 공유 (세션 생성은 스레드 안전하지 않음)
+        if session is None:
+            session = boto3.session.Session(
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key
             )
+        self.session = session
+        self.label = label
+        # endpoint_url이 있으면 모든 클라이언트가 그 주소를 사용 (로컬 스텁 서버 등)
+        self.endpoint_url = endpoint_url
+        if endpoint_url:
+            # 다른 주소의 모델 목록과 형식 기록이 실제 Bedrock 캐시와 섞이지 않도록 분리
+            cache_dir = os.path.join(cache_dir, 'endpoints', re.sub(r'[^A-Za-z0-9.-]+', '_', endpoint_url))
+        # 클라이언트는 처음 사용할 때 만듦 (S3/STS는 비동기 모델이 있을 때만 사용)
+        self.bedrock = LazyClient(
+            session, 'bedrock-runtime',
+            region_name=region,
+            endpoint_url=endpoint_url,
+            config=config or runtime_config()
+        )
+        self.bedrock_client = LazyClient(session, 'bedrock', region_name=region, endpoint_url=endpoint_url)
+        self.s3_client = LazyClient(
+            session, 's3',
+            region_name=region,
+            endpoint_url=endpoint_url,
+            # 사용자 지정 주소에서는 버킷 이름을 호스트 대신 경로에 넣음
+            config=Config(s3={'addressing_style': 'path'}) if endpoint_url else None
+        )
+        self.sts_client = LazyClient(session, 'sts', region_name=region, endpoint_url=endpoint_url)
+        self.s3_bucket = None
+        # 비동기 작업 출력 확인 (delete_outputs가 True이면 확인 후 삭제)
+        self.output_collector = AsyncOutputCollector(self.s3_client, delete=delete_outputs)
+        self.job_tracker = AsyncJobTracker(self.bedrock)
+        self.batch_tracker = BatchJobTracker(self.bedrock_client)
+        self.format_cache = FormatCache.shared(os.path.join(cache_dir, 'formats.json'))
+        self.profile_resolver = InferenceProfileResolver(self.bedrock_client, region, cache_dir)
+        self.model_catalog = ModelCatalog(self.bedrock_client, region, cache_dir)
+        self._output = threading.local()
+        # 스로틀링은 실패와 따로 집계 (동시 실행 수를 Bedrock 할당량에 맞추는 데 사용)
+        self.stats = {'throttled': 0, 'retry_attempts': 0, 'backoffs': 0}
+        # 모델별 호출 속도 제한 (quotas: 리전별 할당량, service_quotas: Service Quotas 값 사용 여부)
+        self.scheduler = RateScheduler(quotas)
+        self.service_quotas = service_quotas
+        self.metrics = metrics or ProbeMetrics()
+        self.prices = prices
+        self.throttled_models = set()
+        self._stats_lock = threading.Lock()
+        # 중단된 실행을 이어서 하기 위한 체크포인트 저널 (CheckpointJournal, 여러 대상이 공유 가능)
+        self.journal = journal
+        self._account_id = None
+    
+    def _count(self, key, amount=1):
+        if amount:
+            with self._stats_lock:
+                self.stats[key] += amount
+    
+    def _new_record(self, model_id, payload):
+        """모델 호출 기록을 새로 만듭니다."""
+        return {
+            'target': self.label,
+            'region': self.region,
+            'model_id': model_id,
+            'family': payload['family'],
+            'profile': None,
+            'mode': payload['mode'],
+            'status': None,
+            'format_index': None,
+            'attempts': 0,
+            'error_code': None,
+            'wall_ms': None,
+            'started_at': time.time(),
+            'input_tokens': None,
+            'output_tokens': None,
+            'cost_usd': None,
+            'ttft_ms': None,
+            'output_bytes': None,
+        }
+    
+    def _record_usage(self, record, usage):
+        """응답에서 읽은 토큰 사용량과 예상 비용을 호출 기록에 남깁니다."""
+        if usage is None:
+            return
+        record['input_tokens'], record['output_tokens'] = usage
+        record['cost_usd'] = estimate_cost(self.prices, record['model_id'], *usage)
+    
+    def _finish_record(self, record, started, status, error=None):
+        """호출 기록을 마무리하고 저장합니다."""
+        record['status'] = status
+        if error is not None:
+            record['error_code'] = error_code(error)
+        record['wall_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        self.metrics.add(record)
+        if self.journal is not None:
+            # 네트워크 오류나 자격 증명 만료로 인한 실패는 다음 실행에서 다시 시도
+            self.journal.record_result(record, final=error is None or not is_transient_error(error))
+    
+    def _failure_status(self, error):
+        return 'throttled' if is_throttling_error(error) else 'failed'
+    
+    def _failure_message(self, model_id, error, message):
+        """실패 메시지를 반환합니다. 스로틀링 오류는 실패와 따로 집계하고 메시지를 바꿉니다."""
+        if not is_throttling_error(error):
+            return message
+        with self._stats_lock:
+            self.stats['throttled'] += 1
+            self.throttled_models.add(model_id)
+        return f"⚠ {model_id}: 스로틀링 - {error_code(error)}"
+    
+    def _report_failure(self, model_id, error, message):
+        """실패 메시지를 출력합니다."""
+        self._emit(self._failure_message(model_id, error, message))
+    
+    def _print(self, message):
+        """대상 이름(label)이 있으면 앞에 붙여 출력합니다."""
+        if self.label:
+            body = message.lstrip('\n')
+            message = f"{message[:len(message) - len(body)]}[{self.label}] {body}"
+        print(message)
+    
+    def _emit(self, message):
+        """모델별 결과 메시지를 출력합니다. 동시 실행 중에는 작업 스레드의 버퍼에 모읍니다."""
+        lines = getattr(self._output, 'lines', None)
+        if lines is None:
+            self._print(message)
+        else:
+            lines.append(message)
+    
+    @contextmanager
+    def capture_output(self):
+        """이 스레드에서 출력할 모델별 결과 메시지를 출력하지 않고 모을 list를 돌려줍니다.
+        
+        비동기 작업의 완료 메시지는 블록을 나온 뒤에도 작업이 끝나면 같은 list에 추가됩니다.
+        """
+        lines = self._output.lines = []
+        try:
+            yield lines
+        finally:
+            self._output.lines = None
+    
+    def needs_output_bucket(self, models):
+        """S3 출력 버킷이 필요한 비동기 모델이 있는지 확인합니다."""
+        return any(self.payloads.lookup(model_id)['mode'] == 'async' for model_id in models)
+    
+    def client_timings(self):
+        """생성된 클라이언트의 {서비스 이름: 생성 시간(ms)}을 반환합니다."""
+        clients = (self.bedrock, self.bedrock_client, self.s3_client, self.sts_client)
+        return {client.service_name: client.created_ms for client in clients if client.created_ms is not None}
+    
+    def account_id(self):
+        """자격 증명의 AWS 계정 ID를 반환합니다. STS는 처음 한 번만 호출합니다."""
+        if self._account_id is None:
+            self._account_id = self.sts_client.get_caller_identity()['Account']
+        return self._account_id
+    
+    def credentials_label(self):
+        """자격 증명을 구분하는 이름을 반환합니다. STS는 호출하지 않습니다.
+        
+        고정 액세스 키는 키 ID를, 임시 자격 증명(역할, SSO 등)은 획득 방식과 프로필 이름을 사용합니다.
+        자격 증명이 없으면 None.
+        """
+        credentials = self.session.get_credentials()
+        if credentials is None:
+            return None
+        frozen = credentials.get_frozen_credentials()
+        if frozen.token is None:
+            return frozen.access_key
+        return f"{credentials.method}:{self.session.profile_name}"
+    
+    def setup_s3_bucket(self):
+        """계정 ID 기반으로 S3 버킷을 생성합니다."""
+        try:
+            account_id = self.account_id()
+            bucket_name = f"bedrock-output-{account_id}-{self.region}"
             
-            if actual_model_id != model_id:
-                print(f"✓ {model_id}: 성공 (cross-region: {actual_model_id})")
-            else:
-                print(f"✓ {model_id}: 성공")
-            return True
+            try:
+                self.s3_client.head_bucket(Bucket=bucket_name)
+                self._print(f"S3 버킷 사용: {bucket_name}")
+            except ClientError:
+                create_config = {}
+                if self.region != 'us-east-1':
+                    create_config['CreateBucketConfiguration'] = {'LocationConstraint': self.region}
+                
+                self.s3_client.create_bucket(
+                    Bucket=bucket_name,
+                    **create_config
+                )
+                self._print(f"S3 버킷 생성: {bucket_name}")
+                self._set_output_expiration(bucket_name)
             
+            self.s3_bucket = bucket_name
+            return bucket_name
         except ClientError as e:
-            # 모델별 대체 형식 시도
-            alternative_formats = []
-            
-            if 'nova' in model_id.lower():
-                if 'canvas' in model_id.lower():
-                    alternative_formats = [
-                        {
-                            "taskType": "TEXT_IMAGE",
-                            "textToImageParams": {"text": "Hello world"},
-                            "imageGenerationConfig": {"numberOfImages": 1, "height": 512, "width": 512}
-                        }
-                    ]
-                elif 'reel' in model_id.lower():
-                    alternative_formats = [
-                        {
-                            "taskType": "TEXT_VIDEO",
-                            "textToVideoParams": {"text": "Hello world"},
-                            "videoGenerationConfig": {"durationSeconds": 6, "fps": 24, "dimension": "1280x720"}
-                        }
-                    ]
-                elif 'sonic' in model_id.lower():
-                    alternative_formats = [
-                        {
-                            "text": "Hello world",
-                            "voice": "Matthew",
-                            "outputFormat": "mp3"
-                        }
-                    ]
-                else:
-                    alternative_formats = [
-                        {
-                            "messages": [{"role": "user", "content": [{"text": "Hello"}]}],
-                            "inferenceConfig": {"max_new_tokens": 10}
-                        },
-                        {
-                            "messages": [{"role": "user", "content": "Hello"}],
-                            "max_tokens": 10
-                        }
-                    ]
-                alternative_formats = [
+            self._print(f"S3 버킷 설정 실패: {e}")
+            return None
+    
+    def _set_output_expiration(self, bucket_name):
+        """새로 만든 버킷에 비동기 출력과 배치 입력/출력을 OUTPUT_RETENTION_DAYS일 뒤 지우는 수명 주기 규칙을 설정합니다.
+        
+        중단된 멀티파트 업로드의 파트도 하루 뒤 정리합니다.
+        기존 버킷은 사용자가 설정한 규칙을 덮어쓰지 않도록 건드리지 않습니다.
+        """
+        try:
+            self.s3_client.put_bucket_lifecycle_configuration(
+                Bucket=bucket_name,
+                LifecycleConfiguration={'Rules': [
                     {
-                        "messages": [{"role": "user", "content": [{"text": "Hello"}]}],
-                        "inferenceConfig": {"max_new_tokens": 10}
+                        'ID': 'bedrock-output-expiration',
+                        'Filter': {'Prefix': OUTPUT_PREFIX},
+                        'Status': 'Enabled',
+                        'Expiration': {'Days': OUTPUT_RETENTION_DAYS},
                     },
                     {
-                        "messages": [{"role": "user", "content": "Hello"}],
-                        "max_tokens": 10
-                    }
-                ]
-            elif 'llama' in model_id.lower():
-                if 'llama3-1' in model_id.lower() or 'llama3-2' in model_id.lower() or 'llama3-3' in model_id.lower() or 'llama4' in model_id.lower():
-                    alternative_formats = [
-                        {
-                            "messages": [{"role": "user", "content": "Hello"}],
-                            "max_tokens": 10,
-                            "temperature": 0.1
-                        },
-                        {
-                            "prompt": "<|begin_of_text|><|start_header_id|>user<|end_header_id|>\n\nHello<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n",
-                            "max_gen_len": 10
-                        }
-                    ]
-                else:
-                    alternative_formats = [
-                        {
-                            "prompt": "<|begin_of_text|><|start_header_id|>user<|end_header_id|>\n\nHello<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n",
-                            "max_gen_len": 10
-                        },
-                        {
-                            "messages": [{"role": "user", "content": "Hello"}],
-                            "max_tokens": 10
-                        }
-                    ]
-            elif 'jamba' in model_id.lower():
-                alternative_formats = [
-                    {
-                        "prompt": "Hello",
-                        "max_tokens": 10
-                    }
-                ]
-            elif 'deepseek' in model_id.lower():
-                alternative_formats = [
-                    {
-                        "prompt": "Hello",
-                        "max_tokens": 10,
-                        "temperature": 0.1
-                    }
-                ]
-            elif 'cohere' in model_id.lower() and 'embed' in model_id.lower():
-                alternative_formats = [
-                    {
-                        "texts": ["Hello world"],
-                        "input_type": "classification"
+                        'ID': 'bedrock-batch-expiration',
+                        'Filter': {'Prefix': BATCH_PREFIX},
+                        'Status': 'Enabled',
+                        'Expiration': {'Days': OUTPUT_RETENTION_DAYS},
+                        'AbortIncompleteMultipartUpload': {'DaysAfterInitiation': 1},
                     },
-                    {
-                        "texts": ["Hello world"]
-                    }
-                ]
-            elif 'command-r' in model_id.lower():
-                alternative_formats = [
-                    {
-                        "prompt": "Hello",
-                        "max_tokens": 10
-                    }
-                ]
-            
-            for alt_body in alternative_formats:
+                ]}
+            )
+        except ClientError as e:
+            self._print(f"S3 출력 보관 기간 설정 실패: {e.response['Error']['Code']}")
+    
+    def get_available_models(self):
+        """실제 호출 가능한 Bedrock 모델 ID를 가져옵니다.
+        
+        모델 카탈로그 정보로 프로비저닝 전용, 텍스트 입력 불가(전용 호출 방식이 있는 Nova Sonic 제외),
+        수명 종료 모델을 제외하고,
+        get_foundation_model_availability로 계정에서 사용할 수 없는 모델을 제외합니다.
+        """
+        try:
+            # 카탈로그 캐시가 유효하면 네트워크 호출 없이 목록을 만듦
+            catalog_models = self.model_catalog.models()
+        except (BotoCoreError, ClientError) as e:
+            self._print(f"모델 목록 가져오기 실패: {e}")
+            return []
+        
+        excluded = {}
+        candidates = []
+        for model_id in catalog_models:
+            reason = self._capability_gap(model_id, self.model_catalog.get(model_id))
+            if reason:
+                excluded[reason] = excluded.get(reason, 0) + 1
+            else:
+                candidates.append(model_id)
+        
+        availability = self._model_availability(candidates)
+        available_models = []
+        for model_id in candidates:
+            reason = availability.get(model_id)
+            if reason:
+                excluded[reason] = excluded.get(reason, 0) + 1
+            else:
+                available_models.append(model_id)
+        
+        if excluded:
+            details = ', '.join(f"{reason} {count}" for reason, count in sorted(excluded.items()))
+            self._print(f"호출 불가 모델 {sum(excluded.values())}개 제외 ({details})")
+        return available_models
+    
+    def _capability_gap(self, model_id, model):
+        """카탈로그 정보로 호출할 수 없는 이유를 반환합니다. 호출 가능하면 None."""
+        inference = set(model['inference'])
+        if not inference & CALLABLE_INFERENCE_TYPES:
+            return "프로비저닝 전용"
+        if 'ON_DEMAND' not in inference and self._resolve_model_id(model_id) == model_id:
+            # inference profile로만 호출 가능한데 이 리전에서 쓸 profile이 없음
+            return "inference profile 없음"
+        if 'TEXT' not in model['input'] and self.payloads.lookup(model_id)['mode'] != 'stream':
+            # 요청 형식은 모두 텍스트 프롬프트를 사용 (양방향 스트리밍 모델은 전용 SDK로 점검)
+            return "텍스트 입력 미지원"
+        if model['lifecycle'] not in CALLABLE_LIFECYCLES:
+            return "수명 종료"
+        return None
+    
+    def _model_availability(self, model_ids):
+        """get_foundation_model_availability로 계정에서 사용할 수 없는 모델과 이유를 반환합니다.
+        
+        결과는 모델 카탈로그에 자격 증명별로 카탈로그와 같은 유효 기간 동안 저장하고, 저장된 결과가
+        없는 모델만 확인합니다. 권한이 없어 확인할 수 없으면 모든 모델을 사용 가능한 것으로 봅니다.
+        """
+        def check(model_id):
+            # (확인 여부, 사용 불가 이유): 일시적 오류는 사용 가능으로 보되 저장하지 않음
+            try:
+                response = self.bedrock_client.get_foundation_model_availability(modelId=model_id)
+            except ClientError as e:
+                if e.response['Error']['Code'] == 'AccessDeniedException':
+                    raise
+                return False, None
+            except BotoCoreError:
+                return False, None
+            if response['regionAvailability'] != 'AVAILABLE':
+                return True, "리전 미지원"
+            if response['authorizationStatus'] != 'AUTHORIZED':
+                return True, "권한 없음"
+            if response['entitlementAvailability'] != 'AVAILABLE':
+                return True, "모델 접근 미승인"
+            if response['agreementAvailability']['status'] != 'AVAILABLE':
+                return True, "약관 미동의"
+            return True, None
+        
+        if not model_ids:
+            return {}
+        # 리전별 카탈로그 파일에 자격 증명별로 저장 (STS 계정 조회 없이 구분)
+        identity = self.credentials_label()
+        cached = self.model_catalog.availability(identity) if identity else {}
+        missing = [model_id for model_id in model_ids if model_id not in cached]
+        checked = {}
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(AVAILABILITY_WORKERS, len(missing))) as executor:
+                futures = [executor.submit(check, model_id) for model_id in missing]
                 try:
-                    self.bedrock.invoke_model(
-                        modelId=actual_model_id,
-                        body=json.dumps(alt_body),
-                        contentType='application/json'
-                    )
-                    if actual_model_id != model_id:
-                        print(f"✓ {model_id}: 성공 (cross-region: {actual_model_id})")
-                    else:
-                        print(f"✓ {model_id}: 성공")
-                    return True
-                except ClientError:
-                    continue
-            
-
-            
-            # 실제 접근 불가능한 모델만 스킵
-            if 'premier:mm' in model_id.lower():
-                print(f"- {model_id}: 접근 권한 없음 (스킵)")
-                return False
-            
-            print(f"✗ {model_id}: 실패 - {e.response['Error']['Code']}")
-            return False
+                    results = [future.result() for future in futures]
+                except ClientError as e:
+                    for future in futures:
+                        future.cancel()
+                    self._print(f"모델 사용 가능 여부 확인 불가 (전체 시도): {e.response['Error']['Code']}")
+                    return {}
+            checked = {model_id: reason for model_id, (known, reason) in zip(missing, results) if known}
+            if identity and checked:
+                self.model_catalog.record_availability(identity, checked)
+        return {model_id: cached[model_id] if model_id in cached else checked.get(model_id) for model_id in model_ids}
     
-    def send_async_token(self, model_id):
-        """비동기 모델 호출 (TwelveLabs)"""
-        if not self.s3_bucket:
-            print(f"✗ {model_id}: S3 버킷 설정 필요")
+    def _supports_streaming(self, model_id, payload):
+        """스트리밍 호출을 사용할지 판단합니다 (레지스트리와 카탈로그 모두 지원해야 함)."""
+        if not (self.stream and payload['streaming']):
             return False
+        try:
+            model = self.model_catalog.get(model_id)
+        except (BotoCoreError, ClientError):
+            model = None
+        return model is None or model['streaming']
+    
+    def load_service_quotas(self):
+        """Service Quotas의 모델별 RPM/TPM 할당량을 스케줄러에 추가합니다.
         
+        할당량 파일에 이미 있는 모델은 파일 값을 유지합니다.
+        """
         try:
-            model_input = {
-                "inputType": "text",
-                "inputText": "Hello world"
+            client = LazyClient(
+                self.session, 'service-quotas',
+                region_name=self.region,
+                endpoint_url=self.endpoint_url
+            )
+            limits = service_quota_limits(client, self.model_catalog, self.profile_resolver)
+        except (BotoCoreError, ClientError) as e:
+            self._print(f"Service Quotas 할당량 가져오기 실패 (제한 없이 진행): {e}")
+            return 0
+        configured = self.scheduler.quotas.get(self.region, {})
+        limits = {model_id: quota for model_id, quota in limits.items() if model_id not in configured}
+        self.scheduler.update(self.region, limits)
+        return len(limits)
+    
+    def _resolve_model_id(self, model_id):
+        """Cross-region 모델은 inference profile ID로 변환합니다."""
+        return self.profile_resolver.resolve(model_id)
+    
+    def _rate_key(self, model_id):
+        """호출 속도 제한 키 (리전, 실제로 호출하는 모델 또는 profile ID)를 반환합니다.
+        
+        비동기 작업은 기본 모델 ID로 시작하므로 profile ID로 변환하지 않습니다.
+        """
+        if self.payloads.lookup(model_id)['mode'] == 'async':
+            return (self.region, model_id)
+        return (self.region, self._resolve_model_id(model_id))
+    
+    def _async_output_config(self):
+        """비동기 호출 결과를 저장할 S3 출력 설정을 반환합니다."""
+        return {
+            "s3OutputDataConfig": {
+                "s3Uri": f"s3://{self.s3_bucket}/{OUTPUT_PREFIX}"
             }
-            
-            response = self.bedrock.start_async_invoke(
-                modelId=model_id,
-                modelInput=model_input,
-                outputDataConfig={
-                    "s3OutputDataConfig": {
-                        "s3Uri": f"s3://{self.s3_bucket}/bedrock-output/"
-                    }
-                }
+        }
+    
+    def _success_message(self, model_id, actual_model_id, ttft_ms=None):
+        """동기 호출 성공 메시지를 만듭니다."""
+        details = []
+        if actual_model_id != model_id:
+            details.append(f"cross-region: {actual_model_id}")
+        if ttft_ms is not None:
+            details.append(f"첫 토큰 {ttft_ms:.0f}ms")
+        if details:
+            return f"✓ {model_id}: 성공 ({', '.join(details)})"
+        return f"✓ {model_id}: 성공"
+    
+    def _invoke_stream(self, model_id, body, record):
+        """invoke_model_with_response_stream으로 호출하고 첫 청크를 받으면 스트림을 닫습니다.
+        
+        첫 청크까지의 시간을 record['ttft_ms']에 남깁니다. 스트림 중간의 오류 이벤트는
+        EventStreamError(ClientError)로 발생합니다.
+        """
+        started = time.perf_counter()
+        response = self.bedrock.invoke_model_with_response_stream(
+            modelId=model_id,
+            body=body,
+            contentType='application/json'
+        )
+        stream = response['body']
+        try:
+            for event in stream:
+                if 'chunk' in event:
+                    record['ttft_ms'] = round((time.perf_counter() - started) * 1000, 1)
+                    break
+        finally:
+            # 나머지 생성 결과는 받지 않음
+            stream.close()
+        return response
+    
+    def _invoke(self, model_id, body, streaming, record):
+        """패밀리별 요청 본문으로 호출합니다."""
+        if streaming:
+            return self._invoke_stream(model_id, body, record)
+        return self.bedrock.invoke_model(
+            modelId=model_id,
+            body=body,
+            contentType='application/json'
+        )
+    
+    def _converse(self, model_id, streaming, record):
+        """공통 Converse 요청으로 호출합니다. 스트리밍이면 첫 텍스트 조각을 받고 스트림을 닫습니다."""
+        if not streaming:
+            return self.bedrock.converse(modelId=model_id, **self.converse_request)
+        
+        started = time.perf_counter()
+        response = self.bedrock.converse_stream(modelId=model_id, **self.converse_request)
+        stream = response['stream']
+        try:
+            for event in stream:
+                if 'contentBlockDelta' in event:
+                    record['ttft_ms'] = round((time.perf_counter() - started) * 1000, 1)
+                    break
+        finally:
+            stream.close()
+        return response
+    
+    def _throttle_delay(self, rate_key, error, throttles):
+        """호출이 ClientError로 실패한 뒤 같은 요청을 다시 시도하기 전 대기 시간(초)을 반환합니다.
+        
+        botocore 재시도 횟수를 집계하고, 스로틀링이 아니거나 이미 THROTTLE_RETRIES번
+        다시 시도했으면 None을 반환합니다.
+        """
+        self._count('retry_attempts', retry_attempts(error.response))
+        if not is_throttling_error(error) or throttles >= THROTTLE_RETRIES:
+            return None
+        self._count('backoffs')
+        return self.scheduler.throttled(rate_key, throttles + 1)
+    
+    def _invoke_scheduled(self, rate_key, record, invoke):
+        """할당량 차례를 기다려 invoke()를 호출하고 (응답, 예약한 토큰 수)를 반환합니다.
+        
+        botocore 재시도 후에도 스로틀링되면 모델 속도를 낮추고 같은 요청으로
+        THROTTLE_RETRIES번까지 대기 후 다시 시도합니다. 그래도 스로틀링되면 예외를 다시 발생시킵니다.
+        """
+        throttles = 0
+        while True:
+            estimate = self.scheduler.estimate(rate_key)
+            self.scheduler.acquire(rate_key, estimate)
+            record['attempts'] += 1
+            try:
+                response = invoke()
+            except ClientError as e:
+                delay = self._throttle_delay(rate_key, e, throttles)
+                if delay is None:
+                    raise
+                throttles += 1
+                time.sleep(delay)
+                continue
+            self._count('retry_attempts', retry_attempts(response))
+            return response, estimate
+    
+    async def _sonic_call(self, model_id, record, started):
+        """Nova Sonic에 양방향 스트리밍으로 텍스트 한 턴을 보내고 (성공 여부, 결과 메시지)를 반환합니다."""
+        if not bedrock_sonic.available():
+            self._finish_record(record, started, 'skipped')
+            return False, f"- {model_id}: 양방향 스트리밍 SDK 필요 (스킵)"
+        
+        record['profile'] = model_id
+        record['attempts'] = 1
+        credentials = self.session.get_credentials()
+        if credentials is None:
+            self._finish_record(record, started, 'failed', NoCredentialsError())
+            return False, f"✗ {model_id}: 실패 - 자격 증명 없음"
+        credentials = credentials.get_frozen_credentials()
+        try:
+            ttft_ms = await bedrock_sonic.probe(
+                credentials.access_key,
+                credentials.secret_key,
+                credentials.token,
+                self.region,
+                model_id,
+                endpoint_url=self.endpoint_url
             )
-            
-            invocation_arn = response['invocationArn']
-            
-            # 상태 확인 (최대 60초 대기)
-            for _ in range(20):
-                status_response = self.bedrock.get_async_invoke(
-                    invocationArn=invocation_arn
-                )
-                status = status_response['status']
-                
-                if status == 'Completed':
-                    print(f"✓ {model_id}: 성공 (비동기)")
-                    return True
-                elif status == 'Failed':
-                    print(f"✗ {model_id}: 실패 (비동기)")
-                    return False
-                
-                time.sleep(3)
-            
-            print(f"- {model_id}: 비동기 작업 진행중 (스킵)")
-            return False
-            
-        except ClientError as e:
-            print(f"✗ {model_id}: 비동기 호출 실패 - {e.response['Error']['Code']}")
+        except Exception as e:
+            # 실험적 SDK는 botocore 예외 대신 자체 예외를 사용
+            self._finish_record(record, started, 'failed', e)
+            return False, f"✗ {model_id}: 실패 - {type(e).__name__}"
+        
+        if ttft_ms is None:
+            self._finish_record(record, started, 'failed')
+            return False, f"✗ {model_id}: 실패 - 응답 없음"
+        record['ttft_ms'] = ttft_ms
+        self._finish_record(record, started, 'success')
+        return True, self._success_message(model_id, model_id, ttft_ms)
+    
+    def send_sonic_token(self, model_id, record, started):
+        """Nova Sonic에 양방향 스트리밍으로 텍스트 한 턴을 보냅니다."""
+        success, message = asyncio.run(self._sonic_call(model_id, record, started))
+        self._emit(message)
+        return success
+    
+    def _uses_converse(self, payload):
+        """공통 Converse 요청으로 호출할 모델인지 확인합니다 (Converse 모드의 동기 텍스트 모델)."""
+        return self.converse_request is not None and payload['modality'] == 'text' and payload['mode'] == 'sync'
+    
+    def _payload_attempts(self, model_id, payload):
+        """시도할 요청 순서를 형식 번호 목록으로 반환합니다. None은 공통 Converse 요청입니다.
+        
+        이전 실행에서 성공한 형식부터 시도하고, 실패하면 나머지 대체 형식을 시도합니다.
+        """
+        attempts = [None] if self._uses_converse(payload) else []
+        return attempts + self.format_cache.order(self.region, model_id, payload)
+    
+    def _attempt_failed(self, model_id, payload, index, error, first_error):
+        """요청 형식 하나가 실패했을 때 다음 형식으로 넘어갈지 판단하고, 보고할 오류를 반환합니다.
+        
+        다른 형식을 시도해도 소용없는 오류(스로틀링, Converse의 ValidationException이 아닌 오류)는
+        그대로 다시 발생시킵니다.
+        """
+        code = error.response['Error']['Code']
+        if index is None:
+            # Converse를 지원하지 않는 모델(ValidationException)만 패밀리별 형식으로 다시 호출
+            if code != 'ValidationException':
+                raise error
+            return first_error
+        if code == 'ValidationException' and index == self.format_cache.get(self.region, model_id, payload):
+            self.format_cache.invalidate(self.region, model_id)
+        if is_throttling_error(error):
+            # 스로틀링은 요청 형식 문제가 아니므로 대체 형식을 시도하지 않음
+            raise error
+        # 처음 시도한 형식의 오류를 실패 사유로 보고
+        return first_error or error
+    
+    def _attempt_succeeded(self, model_id, payload, index, record):
+        """성공한 요청 형식을 호출 기록과 형식 캐시에 남깁니다."""
+        if index is None:
+            record['mode'] = 'converse'
+        else:
+            self.format_cache.record(self.region, model_id, payload, index)
+    
+    def _invoke_payload(self, model_id, payload, streaming, record, rate_key):
+        """모델을 호출하고 (응답, 예약한 토큰 수, 성공한 형식 번호)를 반환합니다.
+        
+        Converse로 호출했으면 형식 번호는 None입니다. Converse를 지원하지 않는 모델
+        (ValidationException)과 텍스트가 아닌 모델은 패밀리별 요청 형식을 사용합니다.
+        실패하면 보고할 ClientError가 발생합니다. 시간 초과 등 BotoCoreError는 요청 형식 문제가
+        아니므로 대체 형식을 시도하지 않고 그대로 발생합니다.
+        """
+        error = None
+        for index in self._payload_attempts(model_id, payload):
+            if index is None:
+                invoke = functools.partial(self._converse, model_id, streaming, record)
+            else:
+                invoke = functools.partial(self._invoke, model_id, payload['bodies'][index], streaming, record)
+            try:
+                response, estimate = self._invoke_scheduled(rate_key, record, invoke)
+            except ClientError as e:
+                error = self._attempt_failed(model_id, payload, index, e, error)
+                continue
+            self._attempt_succeeded(model_id, payload, index, record)
+            return response, estimate, index
+        raise error
+    
+    def _prepare_call(self, model_id, payload, record):
+        """동기 호출 대상을 정해 기록에 남기고 (실제 모델 ID, 스트리밍 여부, 속도 제한 키)를 반환합니다."""
+        actual_model_id = self._resolve_model_id(model_id)
+        record['profile'] = actual_model_id
+        return actual_model_id, self._supports_streaming(model_id, payload), self._rate_key(model_id)
+    
+    def _record_success(self, model_id, actual_model_id, record, started, rate_key, estimate, index, usage):
+        """성공한 호출의 사용량으로 예약량을 보정하고 기록을 마무리한 뒤 결과 메시지를 반환합니다."""
+        self._record_usage(record, usage)
+        if record['input_tokens'] is not None:
+            self.scheduler.settle(rate_key, estimate, record['input_tokens'] + record['output_tokens'])
+        else:
+            self.scheduler.settle(rate_key, estimate, estimate)
+        record['format_index'] = index
+        self._finish_record(record, started, 'success')
+        return self._success_message(model_id, actual_model_id, record['ttft_ms'])
+    
+    def _record_failure(self, model_id, record, started, error):
+        """실패한 호출의 기록을 마무리하고 결과 메시지를 반환합니다."""
+        # 실제 접근 불가능한 모델만 스킵
+        if 'premier:mm' in model_id.lower():
+            self._finish_record(record, started, 'skipped', error)
+            return f"- {model_id}: 접근 권한 없음 (스킵)"
+        self._finish_record(record, started, self._failure_status(error), error)
+        return self._failure_message(model_id, error, f"✗ {model_id}: 실패 - {error_code(error)}")
+    
+    def send_token_to_model(self, model_id, wait=True):
+        """특정 모델에 토큰을 보냅니다.
+        
+        wait가 False이면 비동기 모델은 완료를 기다리지 않고 Future를 반환합니다.
+        """
+        payload = self.payloads.lookup(model_id)
+        if payload['mode'] == 'async':
+            if payload['family'] == 'nova-reel':
+                # Nova Reel은 비동기 호출 사용
+                return self.send_nova_reel_async(model_id, wait)
+            # TwelveLabs 모델은 비동기 호출 사용
+            return self.send_async_token(model_id, wait)
+        record = self._new_record(model_id, payload)
+        started = time.perf_counter()
+        if payload['mode'] == 'stream':
+            # Nova Sonic은 양방향 스트리밍 API 필요
+            return self.send_sonic_token(model_id, record, started)
+        
+        actual_model_id, streaming, rate_key = self._prepare_call(model_id, payload, record)
+        try:
+            response, estimate, index = self._invoke_payload(actual_model_id, payload, streaming, record, rate_key)
+        except (BotoCoreError, ClientError) as e:
+            # 시간 초과, 연결 오류도 이 모델만 실패로 기록하고 나머지 모델은 계속 호출
+            self._emit(self._record_failure(model_id, record, started, e))
             return False
+        
+        usage = None
+        if not streaming:
+            # 스트리밍 호출은 첫 청크에서 멈추므로 사용량이 집계되지 않음
+            usage = converse_usage(response) if index is None else read_usage(response, payload['usage'])
+        self._emit(self._record_success(model_id, actual_model_id, record, started, rate_key, estimate, index, usage))
+        return True
+    
+    def send_async_token(self, model_id, wait=True):
+        """비동기 모델 호출 (TwelveLabs)"""
+        return self._send_async(model_id, wait)
     
-    def send_nova_reel_async(self, model_id):
+    def send_nova_reel_async(self, model_id, wait=True):
         """비동기 Nova Reel 모델 호출"""
+        return self._send_async(model_id, wait)
+    
+    def _begin_async(self, model_id):
+        """비동기 작업 호출 기록을 만들고 (기록, 시작 시각, 이전 실행의 작업, 건너뛴 이유)를 반환합니다.
+        
+        이전 실행에서 시작한 작업이 체크포인트에 있으면 (작업 ARN, 제출 시각)을 반환하며, 이 작업은
+        새로 시작하지 않고 다시 추적합니다. S3 버킷이 없으면 기록을 마무리하고 건너뛴 이유를 반환합니다.
+        """
+        payload = self.payloads.lookup(model_id)
+        record = self._new_record(model_id, payload)
+        record['profile'] = model_id
+        started = time.perf_counter()
         if not self.s3_bucket:
-            print(f"✗ {model_id}: S3 버킷 설정 필요")
+            self._finish_record(record, started, 'skipped')
+            return record, started, None, f"✗ {model_id}: S3 버킷 설정 필요"
+        
+        record['format_index'] = 0
+        previous = self.journal.job(self.label, self.region, model_id) if self.journal else None
+        if previous is not None:
+            return record, started, (previous['invocation_arn'], datetime.fromisoformat(previous['submitted'])), None
+        record['attempts'] = 1
+        return record, started, None, None
+    
+    def _async_request(self, model_id):
+        """start_async_invoke 요청 인자를 반환합니다."""
+        return {
+            'modelId': model_id,
+            'modelInput': self.payloads.lookup(model_id)['formats'][0],
+            'outputDataConfig': self._async_output_config(),
+        }
+    
+    def _job_started(self, model_id, response, submitted):
+        """시작한 비동기 작업을 체크포인트에 남기고 작업 ARN을 반환합니다."""
+        self._count('retry_attempts', retry_attempts(response))
+        invocation_arn = response['invocationArn']
+        if self.journal is not None:
+            self.journal.record_job(self.label, self.region, model_id, invocation_arn, submitted)
+        return invocation_arn
+    
+    def _job_start_failed(self, model_id, record, started, error):
+        """비동기 작업을 시작하지 못한 호출의 기록을 마무리하고 결과 메시지를 반환합니다."""
+        if isinstance(error, ClientError):
+            self._count('retry_attempts', retry_attempts(error.response))
+        self._finish_record(record, started, self._failure_status(error), error)
+        return self._failure_message(model_id, error, f"✗ {model_id}: 비동기 호출 실패 - {error_code(error)}")
+    
+    def _send_async(self, model_id, wait=True):
+        """start_async_invoke로 작업을 시작하고 작업 추적기에 등록합니다.
+        
+        wait가 False이면 기다리지 않고 성공 여부가 설정될 Future를 반환합니다.
+        완료 메시지는 호출 시점의 출력 버퍼에 기록됩니다.
+        """
+        record, started, job, skipped = self._begin_async(model_id)
+        if skipped:
+            self._emit(skipped)
             return False
+        if job is None:
+            # 비동기 작업은 응답에 사용량이 없으므로 호출 수(RPM)만 예약
+            self.scheduler.acquire(self._rate_key(model_id), 0)
+            submitted = datetime.now(timezone.utc)
+            try:
+                response = self.bedrock.start_async_invoke(**self._async_request(model_id))
+            except (BotoCoreError, ClientError) as e:
+                self._emit(self._job_start_failed(model_id, record, started, e))
+                return False
+            job = (self._job_started(model_id, response, submitted), submitted)
+        invocation_arn, submitted = job
+        
+        lines = getattr(self._output, 'lines', None)
+        result = Future()
         
+        def on_done(job):
+            success, message = False, None
+            try:
+                success, message = self._async_outcome(model_id, job, record, started)
+            except Exception as e:
+                # 결과 처리 중 예상하지 못한 오류(기록 파일 쓰기 실패 등)는 이 모델의 실패로 기록
+                message = f"✗ {model_id}: 비동기 결과 처리 실패 - {type(e).__name__}: {e}"
+                if record['status'] is None:
+                    self._finish_record(record, started, 'failed', e)
+            finally:
+                # 결과를 기다리는 스윕이 멈추지 않도록 항상 결과를 설정
+                if message is not None:
+                    if lines is None:
+                        self._print(message)
+                    else:
+                        lines.append(message)
+                result.set_result(success)
+        
+        self.job_tracker.register(invocation_arn, on_done, submitted)
+        if wait:
+            return result.result()
+        return result
+    
+    def flush_outputs(self):
+        """확인을 마치고 지우려고 모아 둔 비동기 출력을 삭제합니다."""
+        if not self.output_collector.delete:
+            return
         try:
-            model_input = {
-                "taskType": "TEXT_VIDEO",
-                "textToVideoParams": {
-                    "text": "Hello world"
-                },
-                "videoGenerationConfig": {
-                    "durationSeconds": 6,
-                    "fps": 24,
-                    "dimension": "1280x720"
-                }
-            }
-            
-            response = self.bedrock.start_async_invoke(
-                modelId=model_id,
-                modelInput=model_input,
-                outputDataConfig={
-                    "s3OutputDataConfig": {
-                        "s3Uri": f"s3://{self.s3_bucket}/bedrock-output/"
-                    }
-                }
-            )
-            
-            invocation_arn = response['invocationArn']
-            
-            # 상태 확인 (최대 60초 대기)
-            for _ in range(20):
-                status_response = self.bedrock.get_async_invoke(
-                    invocationArn=invocation_arn
+            deleted = self.output_collector.flush()
+        except (BotoCoreError, ClientError) as e:
+            self._print(f"비동기 출력 삭제 실패: {e}")
+            return
+        if deleted:
+            self._print(f"비동기 출력 {deleted}개 삭제")
+    
+    def _verify_output(self, model_id, summary, record=None):
+        """완료된 작업의 S3 출력을 확인하고 (상태, 성공 여부, 결과 메시지, 오류)를 반환합니다."""
+        try:
+            output = self.output_collector.collect(summary)
+        except (BotoCoreError, ClientError) as e:
+            # 출력 확인 권한이 없거나 일시적 오류면 작업 상태만으로 판단
+            return 'success', True, f"✓ {model_id}: 성공 (비동기, 출력 확인 불가 - {error_code(e)})", None
+        
+        if record is not None:
+            record['output_bytes'] = output['bytes']
+        if output['error']:
+            error = ClientError({'Error': {'Code': 'AsyncOutputInvalid'}}, 'GetObject')
+            return 'failed', False, f"✗ {model_id}: 출력 확인 실패 - {output['error']}", error
+        return 'success', True, (
+            f"✓ {model_id}: 성공 (비동기, 출력 {output['objects']}개 {format_size(output['bytes'])})"
+        ), None
+    
+    def _async_outcome(self, model_id, job, record=None, started=None):
+        """완료된 작업 추적 Future에서 (성공 여부, 결과 메시지)를 만듭니다.
+        
+        record가 있으면 작업 시작부터 완료까지의 시간으로 호출 기록을 마무리합니다.
+        """
+        error = job.exception()
+        if error is not None:
+            status, success = 'failed', False
+            if isinstance(error, (BotoCoreError, ClientError)):
+                message = f"✗ {model_id}: 비동기 호출 실패 - {error_code(error)}"
+            else:
+                message = f"✗ {model_id}: 비동기 호출 실패 - {error}"
+        else:
+            status = job.result()['status']
+            if status == 'Completed':
+                status, success, message, error = self._verify_output(model_id, job.result(), record)
+            elif status == 'Failed':
+                status, success, message = 'failed', False, f"✗ {model_id}: 실패 (비동기)"
+                error = ClientError({'Error': {'Code': 'AsyncInvokeFailed'}}, 'GetAsyncInvoke')
+            else:
+                status, success, message = 'pending', False, f"- {model_id}: 비동기 작업 진행중 (스킵)"
+        
+        if record is not None:
+            self._finish_record(record, started, status, error)
+        return success, message
+    
+    def _send_buffered(self, model_id, semaphores):
+        """작업 스레드에서 모델을 호출하고 출력 메시지를 모아 반환합니다."""
+        with self.capture_output() as lines:
+            # 할당량 차례가 올 때까지는 동시 실행 슬롯을 잡지 않고 기다림
+            delay = self.scheduler.ready_in(self._rate_key(model_id))
+            if delay:
+                time.sleep(delay)
+            with ExitStack() as stack:
+                for semaphore in semaphores:
+                    stack.enter_context(semaphore)
+                success = self.send_token_to_model(model_id, wait=False)
+        return success, lines
+    
+    def _send_concurrently(self, models, max_workers, family_limits=None, global_limit=None):
+        """작업자 풀로 모델을 동시에 호출하고, 결과는 모델 목록 순서대로 출력합니다.
+        
+        비동기 모델은 작업만 시작하고 추적기에 맡기므로 작업자를 붙잡지 않습니다.
+        global_limit은 여러 대상이 공유하는 전체 동시 호출 제한 세마포어입니다.
+        """
+        limits = dict(DEFAULT_FAMILY_LIMITS)
+        limits.update(family_limits or {})
+        semaphores = {
+            family: threading.BoundedSemaphore(limit)
+            for family, limit in limits.items()
+        }
+        
+        # 같은 패밀리 모델이 작업자를 독점하지 않도록 패밀리별로 번갈아 제출
+        queues = {}
+        for index, model_id in enumerate(models):
+            queues.setdefault(model_family(model_id), []).append(index)
+        submit_order = []
+        while queues:
+            for family in list(queues):
+                submit_order.append(queues[family].pop(0))
+                if not queues[family]:
+                    del queues[family]
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = [None] * len(models)
+            for index in submit_order:
+                model_id = models[index]
+                # 패밀리 제한을 먼저 잡고 전체 제한을 잡아 항상 같은 순서로 획득
+                limiters = [semaphores.get(model_family(model_id)), global_limit]
+                futures[index] = executor.submit(
+                    self._send_buffered,
+                    model_id,
+                    [limiter for limiter in limiters if limiter is not None]
                 )
-                status = status_response['status']
-                
-                if status == 'Completed':
-                    print(f"✓ {model_id}: 성공 (비동기)")
-                    return True
-                elif status == 'Failed':
-                    print(f"✗ {model_id}: 실패 (비동기)")
-                    return False
-                
-                time.sleep(3)
-            
-            print(f"- {model_id}: 비동기 작업 진행중 (스킵)")
-            return False
             
-        except ClientError as e:
-            print(f"✗ {model_id}: 비동기 호출 실패 - {e.response['Error']['Code']}")
-            return False
+            results = []
+            for future in futures:
+                success, lines = future.result()
+                if isinstance(success, Future):
+                    # 비동기 작업은 완료 메시지가 기록된 뒤 결과가 설정됨
+                    success = success.result()
+                for line in lines:
+                    self._print(line)
+                results.append(success)
+        except KeyboardInterrupt:
+            # Ctrl-C: 대기 중인 모델은 호출하지 않고 바로 중단 (실행 중인 호출만 마저 끝남)
+            executor.shutdown(wait=False, cancel_futures=True)
+            if self.journal is not None:
+                self.journal.close()
+            raise
+        executor.shutdown()
+        return results
+    
+    def _checkpointed(self, models):
+        """체크포인트 저널에서 이전 실행에 끝난 모델을 찾아 {모델 ID: 성공 여부}로 반환합니다.
+        
+        이전 호출 기록은 이번 실행의 호출 기록에 다시 포함되어 사용량과 결과 합계에 반영됩니다.
+        """
+        if self.journal is None:
+            return {}
+        done = {}
+        for model_id in models:
+            record = self.journal.result(self.label, self.region, model_id)
+            if record is not None:
+                done[model_id] = record['status'] == 'success'
+                self.metrics.add(record)
+        return done
     
-    def send_tokens_to_all_models(self):
-        """모든 모델에 토큰을 보냅니다."""
-        # S3 버킷 설정
-        self.setup_s3_bucket()
+    def send_tokens_to_all_models(self, max_workers=1, family_limits=None, global_limit=None,
+                                  list_models=True):
+        """모든 모델에 토큰을 보내고 모델별 결과 목록을 반환합니다.
         
+        max_workers가 1보다 크면 작업자 풀로 동시에 호출하며, family_limits로
+        패밀리별 동시 실행 수를 제한합니다 (예: {'anthropic': 4}).
+        """
         models = self.get_available_models()
         if not models:
-            print("사용 가능한 모델이 없습니다.")
-            return
+            self._print("사용 가능한 모델이 없습니다.")
+            return []
+        
+        # 비동기 모델의 결과를 저장할 S3 버킷 설정 (비동기 모델이 없으면 STS/S3 호출 생략)
+        if self.needs_output_bucket(models):
+            self.setup_s3_bucket()
+        
+        if self.service_quotas:
+            self._print(f"Service Quotas 할당량 {self.load_service_quotas()}개 적용")
         
-        print(f"\n호출 가능한 모델 목록 ({len(models)}개):")
-        for i, model_id in enumerate(models, 1):
-            print(f"{i}. {model_id}")
+        if list_models:
+            print(f"\n호출 가능한 모델 목록 ({len(models)}개):")
+            for i, model_id in enumerate(models, 1):
+                print(f"{i}. {model_id}")
+            
+            print(f"\n토큰 전송 시작...\n")
+        
+        done = self._checkpointed(models)
+        if done:
+            self._print(f"체크포인트: 이전 실행에서 끝난 {len(done)}개 모델 건너뜀")
+        remaining = [model_id for model_id in models if model_id not in done]
+        
+        # 순차 실행(max_workers=1)도 비동기 작업은 기다리지 않고 다음 모델로 진행
+        sent = dict(zip(remaining, self._send_concurrently(remaining, max_workers, family_limits, global_limit)))
+        results = [done[model_id] if model_id in done else sent[model_id] for model_id in models]
+        
+        self.format_cache.save()
+        self.flush_outputs()
         
-        print(f"\n토큰 전송 시작...\n")
+        success_count = sum(1 for success in results if success)
+        self._print(
+            f"\n완료: {success_count}/{len(models)} 모델 성공 "
+            f"(스로틀링 {self.stats['throttled']}개, 재시도 {self.stats['retry_attempts']}회, "
+            f"스로틀링 대기 {self.stats['backoffs']}회)"
+        )
+        if list_models:
+            print_usage(self.metrics)
+            print_slowest(self.metrics)
+            print_startup([self])
+        return [
+            {
+                'model_id': model_id,
+                'success': success,
+                'throttled': model_id in self.throttled_models,
+            }
+            for model_id, success in zip(models, results)
+        ]
+    
+    def _batch_inputs(self, prompts_path, models, max_tokens, bucket, run_prefix):
+        """모델별 배치 입력 파일을 S3에 올립니다.
         
-        success_count = 0
+        같은 요청 형식을 쓰는 모델은 입력 파일을 공유하므로 프롬프트 파일은 형식 수만큼만 읽습니다.
+        ({모델 ID: (입력 S3 URI, 형식 번호)}, 올린 키 목록, 레코드 수, 올린 크기)를 반환합니다.
+        """
+        groups = {}
         for model_id in models:
-            if self.send_token_to_model(model_id):
-                success_count += 1
+            payload = self.payloads.lookup(model_id)
+            index = self.format_cache.order(self.region, self._resolve_model_id(model_id), payload)[0]
+            template = payload['formats'][index]
+            if max_tokens is not None:
+                template = probe_body(template, {key: max_tokens for key in BATCH_TOKEN_KEYS})
+            group = groups.setdefault(json.dumps(template, sort_keys=True), (template, []))
+            group[1].append((model_id, index))
+        
+        inputs = {}
+        keys = []
+        records = size = 0
+        for number, (template, members) in enumerate(groups.values(), 1):
+            uploader = JsonlUploader(self.s3_client, bucket, f"{run_prefix}input/{number:03d}/")
+            try:
+                for record_id, item in read_prompts(prompts_path):
+                    if 'modelInput' in item:
+                        model_input = item['modelInput']
+                    else:
+                        model_input = prompt_body(template, item['prompt'])
+                    uploader.write({'recordId': record_id, 'modelInput': model_input})
+                keys.extend(uploader.close())
+            except Exception:
+                uploader.abort()
+                raise
+            records = uploader.records
+            size += uploader.bytes
+            for model_id, index in members:
+                inputs[model_id] = (f"s3://{bucket}/{uploader.prefix}", index)
+        return inputs, keys, records, size
+    
+    def _read_batch_output(self, model_id, summary, extractor, results_file=None):
+        """배치 작업 출력 JSON Lines를 스트리밍으로 읽어 레코드 수, 오류 수, 토큰 사용량을 집계합니다.
+        
+        results_file이 있으면 레코드별 결과를 한 줄씩 씁니다.
+        """
+        bucket, prefix = AsyncOutputCollector.output_location(summary)
+        counts = {'records': 0, 'errors': 0, 'bytes': 0, 'usage': None}
+        keys = []
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                keys.append(obj['Key'])
+                counts['bytes'] += obj['Size']
+        
+        for key in keys:
+            # 레코드 출력은 입력 파일 이름 + .out (manifest.json.out은 작업 요약)
+            if not key.endswith('.jsonl.out'):
+                continue
+            body = self.s3_client.get_object(Bucket=bucket, Key=key)['Body']
+            try:
+                for line in body.iter_lines(chunk_size=64 * 1024):
+                    if not line:
+                        continue
+                    item = json.loads(line)
+                    output = item.get('modelOutput')
+                    counts['records'] += 1
+                    if output is None:
+                        counts['errors'] += 1
+                    elif extractor is not None:
+                        try:
+                            usage = USAGE_EXTRACTORS[extractor](output)
+                        except (KeyError, TypeError, IndexError):
+                            usage = None
+                        if usage is not None:
+                            total = counts['usage'] or (0, 0)
+                            counts['usage'] = (total[0] + usage[0], total[1] + usage[1])
+                    if results_file is not None:
+                        result = {'model_id': model_id, 'recordId': item.get('recordId')}
+                        if output is None:
+                            result['error'] = item.get('error')
+                        else:
+                            result['modelOutput'] = output
+                        results_file.write(json.dumps(result, ensure_ascii=False) + '\n')
+            finally:
+                body.close()
+        if self.output_collector.delete:
+            self.output_collector.discard(bucket, keys)
+        return counts
+    
+    def _batch_outcome(self, model_id, payload, job, record, started, results_file=None):
+        """끝난 배치 작업 Future로 호출 기록을 마무리하고 (성공 여부, 레코드 수, 오류 수)를 반환합니다."""
+        error = job.exception()
+        records = errors = 0
+        if error is not None:
+            status = 'failed'
+            message = f"✗ {model_id}: 배치 작업 확인 실패 - {error_code(error)}"
+        elif job.result()['status'] not in BatchJobTracker.FINAL_STATUSES:
+            status = 'pending'
+            message = f"- {model_id}: 배치 작업 진행중 ({job.result()['jobArn']})"
+        elif job.result()['status'] not in ('Completed', 'PartiallyCompleted'):
+            summary = job.result()
+            status = 'failed'
+            error = ClientError({'Error': {'Code': f"BatchJob{summary['status']}"}}, 'GetModelInvocationJob')
+            message = f"✗ {model_id}: 배치 작업 {summary['status']} - {summary.get('message', '')}".rstrip(' -')
+        else:
+            try:
+                counts = self._read_batch_output(model_id, job.result(), payload['usage'], results_file)
+            except (BotoCoreError, ClientError, ValueError) as e:
+                status, error = 'failed', e
+                message = f"✗ {model_id}: 배치 출력 읽기 실패 - {error_code(e)}"
+            else:
+                records, errors = counts['records'], counts['errors']
+                record['output_bytes'] = counts['bytes']
+                self._record_usage(record, counts['usage'])
+                tokens = ''
+                if counts['usage'] is not None:
+                    tokens = f", 입력 {counts['usage'][0]}/출력 {counts['usage'][1]} 토큰"
+                if records and not errors:
+                    status = 'success'
+                    message = f"✓ {model_id}: 배치 완료 (레코드 {records}개{tokens})"
+                else:
+                    status = 'failed'
+                    error = ClientError({'Error': {'Code': 'BatchRecordErrors'}}, 'GetObject')
+                    message = f"✗ {model_id}: 배치 일부 실패 (레코드 {records}개 중 오류 {errors}개{tokens})"
+        self._finish_record(record, started, status, error)
+        self._emit(message)
+        return status == 'success', records, errors
+    
+    def send_batch(self, prompts_path, role_arn, models, max_tokens=None, results_path=None):
+        """프롬프트 파일 전체를 모델별 배치 추론 작업으로 보내고 모델별 결과 목록을 반환합니다.
+        
+        프롬프트를 모델의 요청 형식에 넣어 S3 출력 버킷에 JSON Lines로 올리고, 모델마다
+        create_model_invocation_job 작업을 만든 뒤 배치 작업 추적기로 완료를 기다립니다.
+        출력은 스트리밍으로 읽어 레코드별 오류와 토큰 사용량을 집계하고, results_path가 있으면
+        레코드별 결과를 그 파일(JSON Lines)에 씁니다. role_arn은 Bedrock이 버킷을 읽고 쓸 서비스 역할입니다.
+        """
+        batch_models = [
+            model_id for model_id in models
+            if self.payloads.lookup(model_id)['mode'] == 'sync'
+            and self.payloads.lookup(model_id)['modality'] in ('text', 'embedding')
+        ]
+        if len(batch_models) < len(models):
+            self._print(f"배치 추론 미지원 모델 {len(models) - len(batch_models)}개 제외 (이미지/비동기/양방향 스트리밍)")
+        if not batch_models:
+            self._print("배치 추론으로 보낼 모델이 없습니다.")
+            return []
+        bucket = self.s3_bucket or self.setup_s3_bucket()
+        if bucket is None:
+            return []
+        
+        run_id = f"{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}-{os.urandom(3).hex()}"
+        run_prefix = f"{BATCH_PREFIX}{run_id}/"
+        try:
+            inputs, input_keys, records, size = self._batch_inputs(
+                prompts_path, batch_models, max_tokens, bucket, run_prefix
+            )
+        except (OSError, ValueError, KeyError, BotoCoreError, ClientError) as e:
+            self._print(f"배치 입력 업로드 실패: {e}")
+            return []
+        self._print(
+            f"배치 입력 업로드: 레코드 {records}개, 요청 형식 {len(set(uri for uri, _ in inputs.values()))}개 "
+            f"({format_size(size)}, s3://{bucket}/{run_prefix})"
+        )
+        if records < BATCH_MIN_RECORDS:
+            self._print(f"⚠ 배치 작업은 작업당 레코드 {BATCH_MIN_RECORDS}개 이상이 필요할 수 있습니다 (현재 {records}개)")
+        
+        jobs = {}
+        for number, model_id in enumerate(batch_models, 1):
+            payload = self.payloads.lookup(model_id)
+            record = self._new_record(model_id, payload)
+            record['mode'] = 'batch'
+            record['attempts'] = 1
+            actual_model_id = record['profile'] = self._resolve_model_id(model_id)
+            input_uri, record['format_index'] = inputs[model_id]
+            started = time.perf_counter()
+            try:
+                job_arn = self.bedrock_client.create_model_invocation_job(
+                    jobName=f"token-sender-{run_id}-{number:04d}",
+                    roleArn=role_arn,
+                    modelId=actual_model_id,
+                    inputDataConfig={'s3InputDataConfig': {'s3Uri': input_uri, 's3InputFormat': 'JSONL'}},
+                    outputDataConfig={'s3OutputDataConfig': {'s3Uri': f"s3://{bucket}/{run_prefix}output/"}},
+                    timeoutDurationInHours=BATCH_JOB_TIMEOUT_HOURS
+                )['jobArn']
+            except (BotoCoreError, ClientError) as e:
+                self._finish_record(record, started, self._failure_status(e), e)
+                self._report_failure(model_id, e, f"✗ {model_id}: 배치 작업 생성 실패 - {error_code(e)}")
+                continue
+            jobs[self.batch_tracker.register(job_arn)] = (model_id, payload, record, started)
+        self._print(f"배치 작업 {len(jobs)}개 시작, 완료 대기 중...\n")
+        
+        results = {
+            model_id: {'model_id': model_id, 'success': False, 'records': 0, 'errors': 0}
+            for model_id in batch_models
+        }
+        results_file = open(results_path, 'w', encoding='utf-8') if results_path else None
+        try:
+            # 먼저 끝난 작업부터 출력을 읽음
+            for job in as_completed(jobs):
+                model_id, payload, record, started = jobs[job]
+                success, records, errors = self._batch_outcome(model_id, payload, job, record, started, results_file)
+                results[model_id].update(success=success, records=records, errors=errors)
+        finally:
+            if results_file is not None:
+                results_file.close()
+        
+        if self.output_collector.delete:
+            self.output_collector.discard(bucket, input_keys)
+        self.flush_outputs()
         
-        print(f"\n완료: {success_count}/{len(models)} 모델 성공")
+        success_count = sum(1 for result in results.values() if result['success'])
+        self._print(f"\n배치 완료: {success_count}/{len(batch_models)} 모델 성공")
+        return [results[model_id] for model_id in batch_models]
+
+
+def print_usage(metrics):
+    """실행 전체(여러 리전이면 리전별) 토큰 사용량과 예상 비용을 출력합니다."""
+    priced = any(record.get('cost_usd') is not None for record in metrics.records())
+    
+    def usage_line(label, group):
+        line = f"{label}: 입력 {group['input_tokens']}, 출력 {group['output_tokens']}"
+        if priced:
+            line += f", 예상 비용 ${group['cost_usd']:.6f}"
+        return line
+    
+    print("\n" + usage_line("토큰 사용량", metrics.totals()))
+    by_region = metrics.summary(('region',))
+    if len(by_region) > 1:
+        for (region,), group in sorted(by_region.items(), key=lambda item: str(item[0])):
+            print("  " + usage_line(region, group))
+
+
+def print_slowest(metrics, limit=5):
+    """p95 지연 시간이 가장 긴 모델을 출력합니다."""
+    slowest = metrics.slowest(limit)
+    if not slowest:
+        return
+    print("\n가장 느린 모델 (p95):")
+    for p95_ms, region, model_id, group in slowest:
+        print(f"  {model_id} [{region}]: p50 {group['p50_ms']:.0f}ms, p95 {p95_ms:.0f}ms")
+
+
+def print_startup(senders):
+    """모듈 로드 시간과 대상별로 생성한 클라이언트 수, 생성 시간 합계를 출력합니다."""
+    timings = [sender.client_timings() for sender in senders]
+    created = sum(len(timing) for timing in timings)
+    total_ms = sum(sum(timing.values()) for timing in timings)
+    line = f"\n시작 시간: 모듈 로드 {IMPORT_MS:.0f}ms, 클라이언트 {created}개 생성 {total_ms:.0f}ms"
+    if len(senders) == 1:
+        line += " (" + ", ".join(f"{name} {ms:.0f}ms" for name, ms in timings[0].items()) + ")"
+    print(line)
+
+
+def write_metrics(metrics, jsonl_path=None, csv_path=None, prometheus_path=None):
+    """호출 기록을 요청된 형식으로 저장합니다."""
+    if jsonl_path:
+        metrics.write_jsonl(jsonl_path)
+    if csv_path:
+        metrics.write_csv(csv_path)
+    if prometheus_path:
+        metrics.write_prometheus(prometheus_path)
+
+
+def load_targets(path):
+    """대상 파일(JSON)을 읽습니다.
+    
+    [{"name": "prod", "access_key": "...", "secret_key": "...", "regions": ["us-east-1", "eu-west-1"]},
+     {"name": "dev", "profile": "dev", "regions": ["ap-northeast-2"]}]
+    """
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def run_targets(targets, workers=4, max_concurrency=32, parallel_targets=16,
+                output_path=None, family_limits=None, config=None, metrics=None, prices=None,
+                stream=False, endpoint_url=None, probe='standard', quotas=None, service_quotas=False,
+                journal=None, delete_outputs=False, converse=False, cache_dir=CACHE_DIR):
+    """여러 계정 × 리전을 병렬로 처리하고 결과를 하나로 모아 반환합니다.
+    
+    계정마다 boto3 세션 하나를 만들어 모든 리전이 공유하고, 리전별 클라이언트의 연결 풀은
+    해당 대상의 모든 호출이 재사용합니다. max_concurrency는 모든 대상의 동시 호출 수 합계
+    상한입니다. output_path가 있으면 결과를 JSON Lines로 저장합니다.
+    config는 bedrock-runtime 클라이언트 전송 설정입니다 (기본 runtime_config()).
+    metrics를 넘기면 모든 대상의 호출 기록이 그 인스턴스에 모입니다.
+    stream이 True이면 스트리밍을 지원하는 모델을 첫 청크까지만 스트리밍으로 호출합니다.
+    endpoint_url이 있으면 모든 AWS 호출을 그 주소로 보냅니다 (bedrock_stub_server.py 등).
+    probe는 요청 본문 설정 이름입니다 (PROBE_PROFILES, 'cheapest'는 최소 비용 요청).
+    quotas는 리전별 모델 할당량(load_quotas 형식)이고, service_quotas가 True이면 대상마다
+    Service Quotas 값을 더해 계정 × 리전별로 호출 속도를 조절합니다.
+    journal(CheckpointJournal)은 모든 대상이 공유하며, 대상 이름과 리전으로 모델 결과를 구분합니다.
+    delete_outputs가 True이면 확인을 마친 비동기 작업 출력을 S3에서 지웁니다.
+    converse가 True이면 텍스트 모델을 공통 Converse 요청 하나로 호출합니다.
+    cache_dir은 모델 목록, inference profile, 요청 형식 캐시를 저장할 디렉터리입니다.
+    """
+    global_limit = threading.BoundedSemaphore(max_concurrency)
+    metrics = metrics or ProbeMetrics()
+    
+    # 세션과 클라이언트 생성은 스레드 안전하지 않으므로 실행 전에 순서대로 준비
+    senders = []
+    for index, target in enumerate(targets, 1):
+        account = target.get('name') or f"account-{index}"
+        session = boto3.session.Session(
+            aws_access_key_id=target.get('access_key'),
+            aws_secret_access_key=target.get('secret_key'),
+            aws_session_token=target.get('session_token'),
+            profile_name=target.get('profile')
+        )
+        for region in target['regions']:
+            sender = BedrockTokenSender(
+                None, None, region,
+                cache_dir=cache_dir,
+                session=session,
+                label=f"{account}/{region}",
+                config=config,
+                metrics=metrics,
+                prices=prices,
+                stream=stream,
+                endpoint_url=endpoint_url,
+                probe=probe,
+                quotas=quotas,
+                service_quotas=service_quotas,
+                journal=journal,
+                delete_outputs=delete_outputs,
+                converse=converse
+            )
+            senders.append((account, region, sender))
+    
+    def sweep(sender):
+        return sender.send_tokens_to_all_models(
+            max_workers=workers,
+            family_limits=family_limits,
+            global_limit=global_limit,
+            list_models=False
+        )
+    
+    print(f"\n{len(senders)}개 대상 토큰 전송 시작...\n")
+    
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, min(parallel_targets, len(senders)))) as executor:
+        futures = [executor.submit(sweep, sender) for _, _, sender in senders]
+        for (account, region, sender), future in zip(senders, futures):
+            try:
+                target_results = future.result()
+            except Exception as e:
+                print(f"[{account}/{region}] 실행 실패: {e}")
+                results.append({
+                    'account': account,
+                    'region': region,
+                    'model_id': None,
+                    'success': False,
+                    'error': str(e),
+                })
+                continue
+            for result in target_results:
+                results.append(dict(result, account=account, region=region))
+    
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + '\n')
+    
+    success_count = sum(1 for result in results if result['success'])
+    throttled_count = sum(1 for result in results if result.get('throttled'))
+    print(
+        f"\n전체 완료: {success_count}/{len(results)} 모델 성공, "
+        f"스로틀링 {throttled_count}개 ({len(senders)}개 대상)"
+    )
+    print_usage(metrics)
+    print_slowest(metrics)
+    print_startup([sender for _, _, sender in senders])
+    return results
+
+def family_limit(value):
+    """--family-limits 값 '패밀리=동시 실행 수'를 (패밀리, 동시 실행 수)로 바꿉니다."""
+    family, _, limit = value.partition('=')
+    if not family or not limit.isdigit() or int(limit) < 1:
+        raise argparse.ArgumentTypeError(f"'패밀리=동시 실행 수' 형식이어야 합니다 (예: anthropic=4): {value}")
+    return family, int(limit)
+
 
 def main():
-    # 사용자 입력 받기
-    access_key = input("AWS Access Key ID: ")
-    secret_key = input("AWS Secret Access Key: ")
-    region = input("AWS Region (예: us-east-1): ")
-    
-    # 토큰 전송 실행
-    sender = BedrockTokenSender(access_key, secret_key, region)
-    sender.send_tokens_to_all_models()
+    parser = argparse.ArgumentParser(description="Bedrock 모델 토큰 전송")
+    parser.add_argument('--targets', help="여러 계정/리전 대상 파일 (JSON)")
+    parser.add_argument('--workers', type=int, help="대상별 동시 실행 수 (없으면 단일 대상 실행 시 입력 받음)")
+    parser.add_argument('--family-limits', nargs='+', type=family_limit, metavar='FAMILY=N',
+                        help="패밀리(프로바이더)별 동시 실행 제한 (예: anthropic=4 twelvelabs=2)")
+    parser.add_argument('--max-concurrency', type=int, default=32, help="전체 동시 호출 수 상한")
+    parser.add_argument('--parallel-targets', type=int, default=16, help="동시에 처리할 대상 수")
+    parser.add_argument('--output', help="결과를 저장할 JSON Lines 파일")
+    parser.add_argument('--metrics-jsonl', help="모델별 호출 기록을 저장할 JSON Lines 파일")
+    parser.add_argument('--metrics-csv', help="모델별 호출 기록을 저장할 CSV 파일")
+    parser.add_argument('--prometheus', help="Prometheus 텍스트 형식 지표를 저장할 파일")
+    parser.add_argument('--prices', help="모델별 1,000 토큰당 가격 파일 (JSON, 예상 비용 계산용)")
+    parser.add_argument('--stream', action='store_true',
+                        help="스트리밍 지원 모델은 첫 청크까지만 받는 스트리밍 호출 사용 (첫 토큰 시간 기록)")
+    parser.add_argument('--probe', choices=sorted(PROBE_PROFILES), default='standard',
+                        help="요청 본문 설정 (cheapest: 출력 1토큰, 최소 이미지 크기 등 최소 비용 요청)")
+    parser.add_argument('--converse', action='store_true',
+                        help="텍스트 모델은 패밀리별 형식 대신 공통 Converse 요청 하나로 호출 (모델당 1회 왕복)")
+    parser.add_argument('--quotas', help="모델별 RPM/TPM 할당량 파일 (JSON)")
+    parser.add_argument('--service-quotas', action='store_true', help="Service Quotas의 모델별 할당량으로 호출 속도 조절")
+    parser.add_argument('--checkpoint', help="진행 상황을 기록할 체크포인트 파일 (JSON Lines, 같은 파일로 다시 실행하면 이어서 진행)")
+    parser.add_argument('--delete-outputs', action='store_true', help="확인을 마친 비동기 작업 출력을 S3에서 삭제")
+    parser.add_argument('--batch', help="배치 추론으로 보낼 프롬프트 파일 (JSON Lines, 모델마다 create_model_invocation_job 작업 하나)")
+    parser.add_argument('--batch-role-arn', help="배치 작업이 S3 버킷을 읽고 쓸 때 사용할 서비스 역할 ARN")
+    parser.add_argument('--batch-models', nargs='+', help="배치 추론으로 보낼 모델 ID 접두사 (기본: 지원하는 모든 모델)")
+    parser.add_argument('--batch-max-tokens', type=int, help="배치 요청의 최대 출력 토큰 수 (기본: 요청 설정 값)")
+    parser.add_argument('--batch-results', help="레코드별 배치 결과를 저장할 JSON Lines 파일")
+    parser.add_argument('--endpoint-url', help="모든 AWS 호출을 보낼 주소 (예: 로컬 스텁 서버 http://127.0.0.1:8787)")
+    parser.add_argument('--max-pool-connections', type=int, help="bedrock-runtime 연결 풀 크기 (기본 50)")
+    parser.add_argument('--retry-mode', choices=['adaptive', 'standard', 'legacy'], help="재시도 모드 (기본 adaptive)")
+    parser.add_argument('--max-attempts', type=int, help="최대 재시도 횟수 (기본 5)")
+    parser.add_argument('--connect-timeout', type=float, help="연결 제한 시간(초) (기본 5)")
+    parser.add_argument('--read-timeout', type=float, help="응답 제한 시간(초) (기본 120)")
+    args = parser.parse_args()
+    if args.batch and (args.targets or args.checkpoint):
+        parser.error("--batch는 --targets, --checkpoint와 함께 사용할 수 없습니다")
+    if args.batch and not args.batch_role_arn:
+        parser.error("--batch에는 --batch-role-arn이 필요합니다")
+    
+    config = runtime_config(
+        max_pool_connections=args.max_pool_connections,
+        retry_mode=args.retry_mode,
+        max_attempts=args.max_attempts,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout
+    )
+    
+    metrics = ProbeMetrics()
+    prices = load_prices(args.prices) if args.prices else None
+    quotas = load_quotas(args.quotas) if args.quotas else None
+    journal = CheckpointJournal(args.checkpoint) if args.checkpoint else None
+    family_limits = dict(args.family_limits) if args.family_limits else None
+    
+    try:
+        if args.targets:
+            run_targets(
+                load_targets(args.targets),
+                workers=args.workers or 4,
+                family_limits=family_limits,
+                max_concurrency=args.max_concurrency,
+                parallel_targets=args.parallel_targets,
+                output_path=args.output,
+                config=config,
+                metrics=metrics,
+                prices=prices,
+                stream=args.stream,
+                endpoint_url=args.endpoint_url,
+                probe=args.probe,
+                quotas=quotas,
+                service_quotas=args.service_quotas,
+                journal=journal,
+                delete_outputs=args.delete_outputs,
+                converse=args.converse
+            )
+            write_metrics(metrics, args.metrics_jsonl, args.metrics_csv, args.prometheus)
+            return
+        
+        # 사용자 입력 받기
+        access_key = input("AWS Access Key ID: ")
+        secret_key = input("AWS Secret Access Key: ")
+        region = input("AWS Region (예: us-east-1): ")
+        workers = args.workers
+        if workers is None and not args.batch:
+            workers = int(input("동시 실행 수 (기본 1): ").strip() or 1)
+        
+        # 토큰 전송 실행
+        sender = BedrockTokenSender(
+            access_key, secret_key, region,
+            config=config,
+            metrics=metrics,
+            prices=prices,
+            stream=args.stream,
+            endpoint_url=args.endpoint_url,
+            probe=args.probe,
+            quotas=quotas,
+            service_quotas=args.service_quotas,
+            journal=journal,
+            delete_outputs=args.delete_outputs,
+            converse=args.converse
+        )
+        if args.batch:
+            models = sender.get_available_models()
+            if args.batch_models:
+                models = [model_id for model_id in models if model_id.startswith(tuple(args.batch_models))]
+            results = sender.send_batch(
+                args.batch, args.batch_role_arn, models,
+                max_tokens=args.batch_max_tokens,
+                results_path=args.batch_results
+            )
+            print_usage(metrics)
+        else:
+            results = sender.send_tokens_to_all_models(max_workers=workers, family_limits=family_limits)
+        
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                for result in results:
+                    f.write(json.dumps(dict(result, region=region), ensure_ascii=False) + '\n')
+        
+        write_metrics(metrics, args.metrics_jsonl, args.metrics_csv, args.prometheus)
+    finally:
+        if journal is not None:
+            journal.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bedrock_stub_server import BedrockStub, simulated_models, start_server  # noqa: E402
+
+
+@pytest.fixture
+def stub():
+    """로컬 스텁 서버를 띄우는 함수를 반환합니다. 테스트가 끝나면 서버를 모두 종료합니다.
+    
+    start(models=10, behavior=None, overrides=None) -> (BedrockStub, 엔드포인트 URL)
+    """
+    servers = []
+    
+    def start(models=10, behavior=None, overrides=None, seed=0):
+        if isinstance(models, int):
+            models = simulated_models(models)
+        behavior = dict({'latency_ms': 1, 'async_duration': 0.2}, **(behavior or {}))
+        bedrock_stub = BedrockStub(models, behavior, overrides, seed=seed)
+        server, endpoint_url = start_server(bedrock_stub)
+        servers.append(server)
+        return bedrock_stub, endpoint_url
+    
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+
+from bedrock_async_engine import AsyncBedrockTokenSender, run_sweeps
+from bedrock_stub_server import simulated_models
+from bedrock_token_sender import runtime_config
+
+
+def test_async_job_releases_concurrency_slot_while_waiting(stub, tmp_path):
+    # 비동기 작업 모델(TwelveLabs)을 목록 맨 앞에 두고 동시 호출 수 1로 실행
+    models = simulated_models(10)
+    _, endpoint_url = stub(models=models[9:] + models[:9], behavior={'async_duration': 1})
+    
+    async def sweep():
+        engine = AsyncBedrockTokenSender(
+            'AKIASTUB', 'stub', 'us-east-1',
+            max_concurrency=1,
+            endpoint_url=endpoint_url,
+            cache_dir=str(tmp_path)
+        )
+        async with engine:
+            return await engine.send_tokens_to_all_models(), engine.sender
+    
+    success_count, sender = asyncio.run(sweep())
+    assert success_count == 10
+    # 작업을 기다리는 동안 다른 모델이 모두 호출되어 비동기 작업 기록이 마지막에 끝남
+    finished = [record['model_id'] for record in sender.metrics.records()]
+    assert finished[-1] == models[9]['modelId']
+
+
+def test_throttle_retries_are_counted_like_the_sync_sender(stub, tmp_path):
+    _, endpoint_url = stub(models=1, behavior={'throttle_rate': 1.0})
+    
+    async def sweep():
+        engine = AsyncBedrockTokenSender(
+            'AKIASTUB', 'stub', 'us-east-1',
+            endpoint_url=endpoint_url,
+            config=runtime_config(retry_mode='standard', max_attempts=2),
+            cache_dir=str(tmp_path)
+        )
+        engine.sender.scheduler.throttled = lambda key, attempt: 0
+        async with engine:
+            return await engine.send_tokens_to_all_models(), engine.sender
+    
+    success_count, sender = asyncio.run(sweep())
+    assert success_count == 0
+    record = sender.metrics.records()[0]
+    assert record['status'] == 'throttled'
+    assert record['attempts'] == 4
+    # 호출 4번마다 botocore가 두 번씩 재시도 (retries의 max_attempts는 재시도 횟수)
+    assert sender.stats['retry_attempts'] == 8
+    assert sender.stats['backoffs'] == 3
+
+
+def test_run_sweeps_processes_every_target(stub, tmp_path):
+    _, endpoint_url = stub(models=4)
+    targets = [('AKIASTUB', 'stub', region) for region in ('us-east-1', 'us-west-2')]
+    assert asyncio.run(run_sweeps(targets, endpoint_url=endpoint_url, cache_dir=str(tmp_path))) == [4, 4]
+
+
+def test_profile_index_and_format_cache_file_io_run_off_the_event_loop(stub, tmp_path):
+    _, endpoint_url = stub(models=4)
+    on_loop = {'profiles': [], 'save': []}
+    
+    def watch(name, function):
+        def wrapper(*args, **kwargs):
+            on_loop[name].append(threading.current_thread() is threading.main_thread())
+            return function(*args, **kwargs)
+        return wrapper
+    
+    async def sweep():
+        engine = AsyncBedrockTokenSender(
+            'AKIASTUB', 'stub', 'us-east-1',
+            endpoint_url=endpoint_url,
+            cache_dir=str(tmp_path)
+        )
+        sender = engine.sender
+        sender.profile_resolver.profiles = watch('profiles', sender.profile_resolver.profiles)
+        sender.format_cache.save = watch('save', sender.format_cache.save)
+        async with engine:
+            return await engine.send_tokens_to_all_models()
+    
+    assert asyncio.run(sweep()) == 4
+    # 처음 불러오는 조회(list_inference_profiles)와 저장은 스레드 풀에서 실행
+    assert on_loop['profiles'][0] is False
+    assert on_loop['save'] == [False]
@@ -0,0 +1,70 @@
+from bedrock_token_sender import BedrockTokenSender, CheckpointJournal, runtime_config
+
+
+def run(endpoint_url, tmp_path, journal_path, config=None):
+    journal = CheckpointJournal(str(journal_path))
+    sender = BedrockTokenSender(
+        'AKIASTUB', 'stub', 'us-east-1',
+        cache_dir=str(tmp_path),
+        endpoint_url=endpoint_url,
+        config=config or runtime_config(retry_mode='standard', max_attempts=0),
+        journal=journal
+    )
+    sender.scheduler.throttled = lambda key, attempt: 0
+    try:
+        return sender.send_tokens_to_all_models(max_workers=4, list_models=False)
+    finally:
+        journal.close()
+
+
+def test_resume_skips_finished_models_and_retries_throttled(stub, tmp_path):
+    bedrock_stub, endpoint_url = stub(models=6, overrides={'meta.': {'throttle_rate': 1.0}})
+    journal_path = tmp_path / 'sweep.jsonl'
+    first = run(endpoint_url, tmp_path, journal_path)
+    assert [result['success'] for result in first] == [True, False, True, True, True, True]
+    
+    # 스로틀링된 모델만 다시 호출
+    bedrock_stub.overrides = {}
+    bedrock_stub.reset_counts()
+    second = run(endpoint_url, tmp_path, journal_path)
+    assert all(result['success'] for result in second)
+    assert bedrock_stub.requests['InvokeModel'] == 1
+    
+    bedrock_stub.reset_counts()
+    third = run(endpoint_url, tmp_path, journal_path)
+    assert all(result['success'] for result in third)
+    assert 'InvokeModel' not in bedrock_stub.requests
+
+
+def test_resume_retries_models_that_timed_out(stub, tmp_path):
+    bedrock_stub, endpoint_url = stub(models=4, overrides={'meta.': {'latency_ms': 2000}})
+    journal_path = tmp_path / 'sweep.jsonl'
+    config = runtime_config(retry_mode='standard', max_attempts=0, read_timeout=0.5)
+    first = run(endpoint_url, tmp_path, journal_path, config)
+    assert [result['success'] for result in first] == [True, False, True, True]
+    
+    # 네트워크가 돌아온 뒤 다시 실행하면 시간 초과된 모델만 호출
+    bedrock_stub.overrides = {}
+    bedrock_stub.reset_counts()
+    second = run(endpoint_url, tmp_path, journal_path, config)
+    assert all(result['success'] for result in second)
+    assert bedrock_stub.requests['InvokeModel'] == 1
+
+
+def test_resume_tracks_started_async_job_instead_of_starting_again(stub, tmp_path):
+    bedrock_stub, endpoint_url = stub(models=10)
+    journal_path = tmp_path / 'sweep.jsonl'
+    marengo = 'twelvelabs.marengo-embed-sim-00009-v1:0'
+    
+    # 작업을 시작만 하고 완료를 기다리지 않은 채 중단
+    journal = CheckpointJournal(str(journal_path))
+    sender = BedrockTokenSender('AKIASTUB', 'stub', 'us-east-1', cache_dir=str(tmp_path),
+                                endpoint_url=endpoint_url, journal=journal)
+    sender.setup_s3_bucket()
+    sender.send_token_to_model(marengo, wait=False)
+    journal.close()
+    assert bedrock_stub.requests['StartAsyncInvoke'] == 1
+    
+    results = run(endpoint_url, tmp_path, journal_path)
+    assert all(result['success'] for result in results)
+    assert bedrock_stub.requests['StartAsyncInvoke'] == 1
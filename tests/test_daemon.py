@@ -0,0 +1,56 @@
+import threading
+import time
+
+from bedrock_daemon import ProbeDaemon
+from bedrock_token_sender import BedrockTokenSender
+
+
+def daemon_for(endpoint_url, tmp_path, **options):
+    sender = BedrockTokenSender('AKIASTUB', 'stub', 'us-east-1', cache_dir=str(tmp_path), endpoint_url=endpoint_url)
+    return ProbeDaemon(sender, **options)
+
+
+def test_catalog_refresh_also_refreshes_inference_profiles(stub, tmp_path):
+    bedrock_stub, endpoint_url = stub(models=4)
+    daemon = daemon_for(endpoint_url, tmp_path)
+    daemon.refresh_models(force=False)
+    bedrock_stub.reset_counts()
+    
+    daemon.refresh_models()
+    assert bedrock_stub.requests['ListInferenceProfiles'] == 1
+    assert bedrock_stub.requests['ListFoundationModels'] == 1
+
+
+def test_refresh_loop_survives_errors(stub, tmp_path):
+    _, endpoint_url = stub(models=4)
+    daemon = daemon_for(endpoint_url, tmp_path, catalog_interval=0.05)
+    calls = []
+    
+    def refresh_models():
+        calls.append(time.monotonic())
+        raise RuntimeError('boom')
+    
+    daemon.refresh_models = refresh_models
+    thread = threading.Thread(target=daemon._refresh_loop)
+    thread.start()
+    try:
+        time.sleep(0.3)
+        assert thread.is_alive()
+        assert len(calls) >= 2
+    finally:
+        daemon._stop.set()
+        thread.join()
+
+
+def test_probe_logs_captured_output_including_async_completion(stub, tmp_path):
+    _, endpoint_url = stub(models=10)
+    daemon = daemon_for(endpoint_url, tmp_path)
+    daemon.sender.setup_s3_bucket()
+    logged = []
+    daemon._log = logged.append
+    finished = threading.Event()
+    daemon._finished = lambda model_id: finished.set()
+    
+    daemon._probe('twelvelabs.marengo-embed-sim-00009-v1:0')
+    assert finished.wait(10)
+    assert [line.split(':')[0] for line in logged] == ['✓ twelvelabs.marengo-embed-sim-00009-v1']
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from bedrock_async_engine import AsyncBedrockTokenSender
+from bedrock_token_sender import BedrockTokenSender, CheckpointJournal, runtime_config
+
+
+def test_read_timeout_fails_only_the_slow_model(stub, tmp_path):
+    # meta 모델만 응답 제한 시간보다 늦게 응답
+    _, endpoint_url = stub(models=4, overrides={'meta.': {'latency_ms': 2000}})
+    sender = BedrockTokenSender(
+        'AKIASTUB', 'stub', 'us-east-1',
+        cache_dir=str(tmp_path),
+        endpoint_url=endpoint_url,
+        config=runtime_config(read_timeout=0.5, max_attempts=1)
+    )
+    results = sender.send_tokens_to_all_models(max_workers=4, list_models=False)
+    
+    assert {result['model_id']: result['success'] for result in results} == {
+        'anthropic.claude-sim-00000-v1:0': True,
+        'meta.llama3-sim-00001-instruct-v1:0': False,
+        'amazon.nova-sim-00002-v1:0': True,
+        'mistral.mistral-sim-00003-v1:0': True,
+    }
+    failed = [record for record in sender.metrics.records() if record['status'] != 'success']
+    assert [(record['model_id'], record['status'], record['error_code']) for record in failed] == [
+        ('meta.llama3-sim-00001-instruct-v1:0', 'failed', 'ReadTimeoutError'),
+    ]
+
+
+def test_async_engine_uses_transport_config_and_isolates_timeouts(stub, tmp_path):
+    _, endpoint_url = stub(models=4, overrides={'meta.': {'latency_ms': 2000}})
+    config = runtime_config(read_timeout=0.5, max_attempts=1)
+    
+    async def sweep():
+        engine = AsyncBedrockTokenSender(
+            'AKIASTUB', 'stub', 'us-east-1',
+            endpoint_url=endpoint_url,
+            config=config,
+            cache_dir=str(tmp_path)
+        )
+        async with engine:
+            return await engine.send_tokens_to_all_models(), engine.sender
+    
+    success_count, sender = asyncio.run(sweep())
+    assert success_count == 3
+    assert sender.bedrock.meta.config.read_timeout == 0.5
+    failed = [record for record in sender.metrics.records() if record['status'] != 'success']
+    assert [(record['model_id'], record['error_code']) for record in failed] == [
+        ('meta.llama3-sim-00001-instruct-v1:0', 'ReadTimeoutError'),
+    ]
+
+
+def test_unexpected_error_in_async_result_handling_does_not_hang_the_sweep(stub, tmp_path):
+    _, endpoint_url = stub(models=10)
+    sender = BedrockTokenSender('AKIASTUB', 'stub', 'us-east-1', cache_dir=str(tmp_path), endpoint_url=endpoint_url)
+    
+    def collect(summary):
+        raise KeyError('outputDataConfig')
+    
+    sender.output_collector.collect = collect
+    results = []
+    worker = threading.Thread(
+        target=lambda: results.extend(sender.send_tokens_to_all_models(max_workers=4, list_models=False)),
+        daemon=True
+    )
+    worker.start()
+    worker.join(30)
+    assert not worker.is_alive()
+    
+    failed = [result['model_id'] for result in results if not result['success']]
+    assert failed == ['twelvelabs.marengo-embed-sim-00009-v1:0']
+    record = [record for record in sender.metrics.records() if record['model_id'] == failed[0]][0]
+    assert (record['status'], record['error_code']) == ('failed', 'KeyError')
+
+
+def test_keyboard_interrupt_cancels_queued_models(stub, tmp_path):
+    _, endpoint_url = stub(models=20, behavior={'latency_ms': 500})
+    journal = CheckpointJournal(str(tmp_path / 'sweep.jsonl'))
+    sender = BedrockTokenSender('AKIASTUB', 'stub', 'us-east-1', cache_dir=str(tmp_path),
+                                endpoint_url=endpoint_url, journal=journal)
+    closed = []
+    close = journal.close
+    journal.close = lambda: (closed.append(True), close())
+    
+    def interrupt(message):
+        raise KeyboardInterrupt
+    
+    sender._print = interrupt
+    models = [model_id for model_id in sender.model_catalog.models() if 'marengo' not in model_id]
+    started = time.perf_counter()
+    with pytest.raises(KeyboardInterrupt):
+        sender._send_concurrently(models, max_workers=2)
+    # 대기 중인 모델을 모두 호출할 때까지 기다리지 않음 (모두 호출하면 약 4.5초)
+    assert time.perf_counter() - started < 2.5
+    assert closed == [True]
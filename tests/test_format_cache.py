@@ -0,0 +1,73 @@
+import json
+import os
+import threading
+
+from bedrock_token_sender import PAYLOADS, FormatCache, run_targets
+
+
+def test_save_merges_entries_written_by_other_instances(tmp_path):
+    path = str(tmp_path / 'formats.json')
+    payload = PAYLOADS.lookup('meta.llama3-8b-instruct-v1:0')
+    first = FormatCache(path)
+    second = FormatCache(path)
+    first.record('us-east-1', 'meta.llama3-8b-instruct-v1:0', payload, 1)
+    second.record('eu-west-1', 'meta.llama3-8b-instruct-v1:0', payload, 2)
+    first.save()
+    second.save()
+    
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    assert entries['us-east-1|meta.llama3-8b-instruct-v1:0']['index'] == 1
+    assert entries['eu-west-1|meta.llama3-8b-instruct-v1:0']['index'] == 2
+
+
+def test_invalidate_removes_entry_on_disk(tmp_path):
+    path = str(tmp_path / 'formats.json')
+    payload = PAYLOADS.lookup('meta.llama3-8b-instruct-v1:0')
+    cache = FormatCache(path)
+    cache.record('us-east-1', 'meta.llama3-8b-instruct-v1:0', payload, 1)
+    cache.save()
+    
+    other = FormatCache(path)
+    other.invalidate('us-east-1', 'meta.llama3-8b-instruct-v1:0')
+    other.save()
+    assert FormatCache(path).get('us-east-1', 'meta.llama3-8b-instruct-v1:0', payload) is None
+
+
+def test_concurrent_saves_keep_every_entry(tmp_path):
+    path = str(tmp_path / 'formats.json')
+    payload = PAYLOADS.lookup('meta.llama3-8b-instruct-v1:0')
+    caches = [FormatCache(path) for _ in range(8)]
+    for number, cache in enumerate(caches):
+        cache.record(f"region-{number}", 'meta.llama3-8b-instruct-v1:0', payload, 1)
+    threads = [threading.Thread(target=cache.save) for cache in caches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    with open(path, encoding='utf-8') as f:
+        assert len(json.load(f)) == 8
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+def test_shared_returns_one_instance_per_path(tmp_path):
+    path = str(tmp_path / 'formats.json')
+    assert FormatCache.shared(path) is FormatCache.shared(path)
+    assert FormatCache.shared(path) is not FormatCache.shared(str(tmp_path / 'other.json'))
+
+
+def test_multi_region_run_keeps_formats_for_every_region(stub, tmp_path, capsys):
+    # 첫 번째 요청 형식을 거부해 모든 모델이 대체 형식을 기록하게 함
+    _, endpoint_url = stub(models=6, behavior={'validation_formats': 1})
+    regions = ['us-east-1', 'us-west-2', 'eu-west-1']
+    targets = [{'name': 'stub', 'access_key': 'AKIASTUB', 'secret_key': 'stub', 'regions': regions}]
+    run_targets(targets, workers=4, endpoint_url=endpoint_url, cache_dir=str(tmp_path))
+    
+    formats_path = next(
+        os.path.join(root, name) for root, _, names in os.walk(tmp_path) for name in names
+        if name == 'formats.json'
+    )
+    with open(formats_path, encoding='utf-8') as f:
+        entries = json.load(f)
+    assert {key.split('|', 1)[0] for key in entries} == set(regions)
@@ -0,0 +1,53 @@
+from bedrock_stub_server import simulated_models
+from bedrock_token_sender import BedrockTokenSender
+
+
+def sender_for(endpoint_url, tmp_path):
+    return BedrockTokenSender('AKIASTUB', 'stub', 'us-east-1', cache_dir=str(tmp_path), endpoint_url=endpoint_url)
+
+
+def test_availability_is_cached_with_the_catalog(stub, tmp_path):
+    bedrock_stub, endpoint_url = stub(models=6)
+    first = sender_for(endpoint_url, tmp_path).get_available_models()
+    assert bedrock_stub.requests['GetFoundationModelAvailability'] == 6
+    
+    bedrock_stub.reset_counts()
+    second = sender_for(endpoint_url, tmp_path).get_available_models()
+    assert second == first
+    assert 'GetFoundationModelAvailability' not in bedrock_stub.requests
+    assert 'ListFoundationModels' not in bedrock_stub.requests
+
+
+def test_forced_refresh_checks_availability_again(stub, tmp_path):
+    bedrock_stub, endpoint_url = stub(models=6)
+    sender = sender_for(endpoint_url, tmp_path)
+    sender.get_available_models()
+    
+    bedrock_stub.reset_counts()
+    sender.model_catalog.refresh()
+    sender.get_available_models()
+    assert bedrock_stub.requests['GetFoundationModelAvailability'] == 6
+
+
+def test_speech_input_model_with_dedicated_call_is_kept(stub, tmp_path):
+    models = simulated_models(2)
+    models.append(dict(models[0], modelId='amazon.nova-sonic-v1:0', inputModalities=['SPEECH']))
+    models.append(dict(models[0], modelId='amazon.titan-image-sim-v1:0', inputModalities=['IMAGE']))
+    _, endpoint_url = stub(models=models)
+    available = sender_for(endpoint_url, tmp_path).get_available_models()
+    assert 'amazon.nova-sonic-v1:0' in available
+    assert 'amazon.titan-image-sim-v1:0' not in available
+
+
+def test_sync_only_sweep_does_not_call_sts(stub, tmp_path):
+    bedrock_stub, endpoint_url = stub(models=9)
+    sender = sender_for(endpoint_url, tmp_path)
+    results = sender.send_tokens_to_all_models(max_workers=4)
+    assert len(results) == 9
+    assert 'GetCallerIdentity' not in bedrock_stub.requests
+    assert sender.sts_client.created_ms is None
+    assert sender.s3_client.created_ms is None
+    
+    bedrock_stub.reset_counts()
+    sender_for(endpoint_url, tmp_path).get_available_models()
+    assert 'GetFoundationModelAvailability' not in bedrock_stub.requests
@@ -0,0 +1,14 @@
+import json
+
+from bedrock_token_sender import PAYLOAD_REGISTRIES
+
+
+def image_config(model_id):
+    body = json.loads(PAYLOAD_REGISTRIES['cheapest'].lookup(model_id)['bodies'][0])
+    return body['textToImageParams']['text'], body['imageGenerationConfig']
+
+
+def test_cheapest_image_size_follows_family():
+    assert image_config('amazon.nova-canvas-v1:0') == ("Hi", {'numberOfImages': 1, 'height': 320, 'width': 320})
+    # Titan Image Generator는 정해진 해상도만 허용
+    assert image_config('amazon.titan-image-generator-v2:0') == ("Hi", {'numberOfImages': 1, 'height': 512, 'width': 512})
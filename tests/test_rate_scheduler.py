@@ -0,0 +1,32 @@
+from bedrock_token_sender import BedrockTokenSender, RateScheduler
+
+
+def test_profile_id_uses_base_model_quota():
+    scheduler = RateScheduler({'us-east-1': {'anthropic.claude-3-haiku': {'rpm': 1000}}})
+    assert scheduler.quota('us-east-1', 'us.anthropic.claude-3-haiku-20240307-v1:0') == {'rpm': 1000}
+    assert scheduler.quota('us-east-1', 'anthropic.claude-3-haiku-20240307-v1:0') == {'rpm': 1000}
+    assert scheduler.quota('eu-west-1', 'eu.anthropic.claude-3-haiku-20240307-v1:0') is None
+
+
+def test_profile_quota_takes_precedence_over_base_model_quota():
+    scheduler = RateScheduler({
+        '*': {'anthropic.claude-3-haiku': {'rpm': 100}},
+        'us-east-1': {'us.anthropic.claude-3-haiku': {'rpm': 1000}},
+    })
+    assert scheduler.quota('us-east-1', 'us.anthropic.claude-3-haiku-20240307-v1:0') == {'rpm': 1000}
+    assert scheduler.quota('us-west-2', 'us.anthropic.claude-3-haiku-20240307-v1:0') == {'rpm': 100}
+
+
+def test_rate_key_matches_the_invoked_model(tmp_path):
+    sender = BedrockTokenSender('AKIASTUB', 'stub', 'us-east-1', cache_dir=str(tmp_path))
+    sender.profile_resolver._shared[sender.profile_resolver.path] = {
+        'anthropic.claude-3-haiku-20240307-v1:0': 'us.anthropic.claude-3-haiku-20240307-v1:0',
+        'twelvelabs.marengo-embed-2-7-v1:0': 'us.twelvelabs.marengo-embed-2-7-v1:0',
+    }
+    assert sender._rate_key('anthropic.claude-3-haiku-20240307-v1:0') == (
+        'us-east-1', 'us.anthropic.claude-3-haiku-20240307-v1:0'
+    )
+    # 비동기 작업은 기본 모델 ID로 시작
+    assert sender._rate_key('twelvelabs.marengo-embed-2-7-v1:0') == (
+        'us-east-1', 'twelvelabs.marengo-embed-2-7-v1:0'
+    )
@@ -0,0 +1,26 @@
+import asyncio
+import time
+
+import boto3
+
+import bedrock_sonic
+from bedrock_token_sender import BedrockTokenSender
+
+
+def test_missing_credentials_fail_the_sonic_probe_cleanly(monkeypatch, tmp_path):
+    for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SESSION_TOKEN', 'AWS_PROFILE'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('AWS_SHARED_CREDENTIALS_FILE', str(tmp_path / 'credentials'))
+    monkeypatch.setenv('AWS_CONFIG_FILE', str(tmp_path / 'config'))
+    monkeypatch.setenv('AWS_EC2_METADATA_DISABLED', 'true')
+    # SDK 설치 여부와 관계없이 자격 증명 확인까지 진행
+    monkeypatch.setattr(bedrock_sonic, 'available', lambda: True)
+    
+    sender = BedrockTokenSender(None, None, 'us-east-1', cache_dir=str(tmp_path), session=boto3.session.Session())
+    model_id = 'amazon.nova-sonic-v1:0'
+    record = sender._new_record(model_id, sender.payloads.lookup(model_id))
+    success, message = asyncio.run(sender._sonic_call(model_id, record, time.perf_counter()))
+    
+    assert success is False
+    assert message == f"✗ {model_id}: 실패 - 자격 증명 없음"
+    assert (record['status'], record['error_code']) == ('failed', 'NoCredentialsError')